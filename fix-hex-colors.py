@@ -3,62 +3,221 @@
 Auto-fix hex color notation in JSON files.
 Converts 0xHEXVALUE to decimal integers.
 
-Usage: python3 fix-hex-colors.py <json-file>
+Only numeric value tokens are rewritten: hex-looking text inside strings
+(notes, descriptions) is left alone, and every other byte of the file is
+preserved, so a fix produces a minimal diff instead of reformatting the
+whole document. Files are scanned through mmap and replaced atomically
+(temp file + rename); several files are processed in parallel. Maps that
+are links into story-geometry/store/ are written through asset_store.py, so
+the shared object is replaced rather than edited in place. Directory walks
+skip the store's objects and visit each linked file once.
+
+Usage:
+    python3 fix-hex-colors.py <json-file> [--dry-run]
+    python3 fix-hex-colors.py test-maps story-geometry 'maps/**/*.json' [--jobs N]
 """
 
+import glob
 import json
+import mmap
+import os
 import sys
 import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-def fix_hex_colors(filepath, dry_run=False):
-    """Convert hex colors to decimal in JSON file."""
+# Strings are matched whole so hex inside them is skipped; anything else
+# that looks like a hex literal is a bare (invalid JSON) number token.
+TOKEN_PATTERN = re.compile(rb'"(?:[^"\\]|\\.)*"|(?P<hex>-?0[xX](?P<digits>[0-9a-fA-F]+))', re.S)
+STORY_GEOMETRY = Path(__file__).resolve().parent / 'story-geometry'
+
+
+def find_hex_tokens(buf):
+    """[(start, end, decimal bytes)] for every hex number token in buf."""
+    edits = []
+    for match in TOKEN_PATTERN.finditer(buf):
+        if match.start('hex') < 0:
+            continue
+        value = int(match.group('digits'), 16)
+        if match.group('hex').startswith(b'-'):
+            value = -value
+        edits.append((match.start('hex'), match.end('hex'), str(value).encode()))
+    return edits
+
+
+def _spliced(buf, edits):
+    """Chunks of buf with edits applied."""
+    pos = 0
+    for start, end, replacement in edits:
+        yield buf[pos:start]
+        yield replacement
+        pos = end
+    yield buf[pos:]
+
+
+def _asset_store():
+    """story-geometry/asset_store.py (imported on demand)."""
+    if str(STORY_GEOMETRY) not in sys.path:
+        sys.path.insert(0, str(STORY_GEOMETRY))
+    import asset_store
+    return asset_store
+
+
+def _store_ref(filepath):
+    """asset_store module if filepath is a link owned by a store ref, else None."""
+    if not os.path.islink(filepath):
+        return None
+    store = _asset_store()
+    return store if store.ref_for_path(filepath) is not None else None
+
+
+def _is_store_object(path):
+    """A file in story-geometry/store/objects (reached through its ref links instead)."""
+    return path.parent.name == 'objects' and path.parent.parent.name == 'store'
+
+
+def _write_atomic(filepath, buf, edits):
+    """Write buf with edits spliced in to a temp file, validate, rename over."""
+    store = _store_ref(filepath)
+    if store is not None:
+        blob = b''.join(_spliced(buf, edits))
+        json.loads(blob)
+        store.write_bytes(filepath, blob)
+        return
+
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.fix-hex-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in _spliced(buf, edits):
+                out.write(chunk)
 
-    # Read file
-    with open(filepath, 'r') as f:
-        content = f.read()
+        # Validate it's now valid JSON before touching the original
+        with open(tmp_path, 'rb') as f:
+            json.load(f)
 
-    # Find all hex values
-    hex_pattern = r'0x([0-9a-fA-F]+)'
-    hex_matches = re.findall(hex_pattern, content)
+        os.chmod(tmp_path, os.stat(filepath).st_mode & 0o7777)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
-    if not hex_matches:
-        return 0, "No hex values found"
 
-    # Convert hex to decimal
-    def hex_to_dec(match):
-        hex_val = match.group(1)
-        dec_val = int(hex_val, 16)
-        return str(dec_val)
+def fix_hex_colors(filepath, dry_run=False):
+    """Convert hex colors to decimal in JSON file, preserving formatting."""
 
-    # Replace all hex values
-    new_content = re.sub(hex_pattern, hex_to_dec, content)
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0, "No hex values found"
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            edits = find_hex_tokens(buf)
 
-    # Validate it's now valid JSON
-    try:
-        data = json.loads(new_content)
-    except json.JSONDecodeError as e:
-        return 0, f"Error: Still invalid JSON after conversion: {e}"
+            if not edits:
+                return 0, "No hex values found"
+
+            try:
+                if dry_run:
+                    json.loads(b''.join(_spliced(buf, edits)))
+                    return len(edits), "Dry run - would convert but not saving"
+                _write_atomic(filepath, buf, edits)
+            except json.JSONDecodeError as e:
+                return 0, f"Error: Still invalid JSON after conversion: {e}"
 
-    if dry_run:
-        return len(hex_matches), "Dry run - would convert but not saving"
+    return len(edits), "Fixed and saved"
 
-    # Write back formatted JSON
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
 
-    return len(hex_matches), "Fixed and saved"
+def _fix_worker(filepath, dry_run):
+    try:
+        count, message = fix_hex_colors(filepath, dry_run)
+    except OSError as e:
+        return filepath, 0, f"Error: {e}"
+    return filepath, count, message
+
+
+def expand_paths(args):
+    """
+    Files as given; globs expand (** allowed); directories expand to *.json
+    minus asset-store objects. Paths resolving to the same file (links to
+    one store object) are kept once.
+    """
+    paths = []
+    for arg in args:
+        if any(ch in arg for ch in '*?['):
+            matches = sorted(glob.glob(arg, recursive=True))
+            paths.extend(m for m in matches if not Path(m).is_dir() and not _is_store_object(Path(m)))
+            if not matches:
+                paths.append(arg)
+        elif Path(arg).is_dir():
+            paths.extend(sorted(str(p) for p in Path(arg).rglob('*.json') if not _is_store_object(p)))
+        else:
+            paths.append(arg)
+    seen = set()
+    unique = []
+    for path in paths:
+        real = os.path.realpath(path)
+        if real not in seen:
+            seen.add(real)
+            unique.append(path)
+    return unique
+
+
+def bulk_main(paths, dry_run=False, jobs=None):
+    """Fix many files across a process pool. Returns True if all succeeded."""
+    all_ok = True
+    todo = []
+    for filepath in paths:
+        if Path(filepath).exists():
+            todo.append(filepath)
+        else:
+            print(f"❌ Error: File not found: {filepath}")
+            all_ok = False
+
+    changed = 0
+    converted = 0
+    if todo:
+        workers = jobs or min(len(todo), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_fix_worker, fp, dry_run) for fp in todo]
+            for future in as_completed(futures):
+                filepath, count, message = future.result()
+                if message.startswith('Error'):
+                    print(f"❌ {filepath}: {message}")
+                    all_ok = False
+                elif count > 0:
+                    print(f"✓ {filepath}: {count} hex values → decimal")
+                    changed += 1
+                    converted += count
+
+    verb = "would convert" if dry_run else "converted"
+    print(f"\n{len(todo)} files scanned, {changed} {verb} ({converted} values)")
+    return all_ok
+
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 fix-hex-colors.py <json-file> [--dry-run]")
+    args = sys.argv[1:]
+    dry_run = '--dry-run' in args
+    jobs = None
+    if '--jobs' in args:
+        i = args.index('--jobs')
+        jobs = int(args[i + 1])
+        del args[i:i + 2]
+    args = [a for a in args if a != '--dry-run']
+
+    if not args:
+        print("Usage: python3 fix-hex-colors.py <json-file|dir|glob>... [--dry-run] [--jobs N]")
         print("\nExample:")
         print("  python3 fix-hex-colors.py test-maps/my-test.json")
         print("  python3 fix-hex-colors.py test-maps/my-test.json --dry-run")
+        print("  python3 fix-hex-colors.py test-maps story-geometry")
+        print("  python3 fix-hex-colors.py 'test-maps/**/*.json' --jobs 8")
         sys.exit(1)
 
-    filepath = Path(sys.argv[1])
-    dry_run = '--dry-run' in sys.argv
+    paths = expand_paths(args)
+    if len(paths) != 1 or len(args) != 1 or Path(args[0]).is_dir():
+        sys.exit(0 if bulk_main(paths, dry_run, jobs) else 1)
+
+    filepath = Path(paths[0])
 
     if not filepath.exists():
         print(f"❌ Error: File not found: {filepath}")
@@ -68,6 +227,10 @@ def main():
 
     count, message = fix_hex_colors(filepath, dry_run)
 
+    if message.startswith('Error'):
+        print(f"❌ {message}")
+        sys.exit(1)
+
     if count > 0:
         print(f"✓ Converted {count} hex values to decimal")
         print(f"  {message}")
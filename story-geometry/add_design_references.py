@@ -1,5 +1,7 @@
 import json
 
+from heightmap import save_map
+
 # Update river with design reference
 with open('story-geometry/river-meandered.json', 'r') as f:
     river = json.load(f)
@@ -10,8 +12,7 @@ river['notes']['design_sources'] = [
     'RIVER-DESIGN-PATTERN.md (requirements and baseline)'
 ]
 
-with open('story-geometry/river-meandered.json', 'w') as f:
-    json.dump(river, f, indent=2)
+save_map(river, None, 'story-geometry/river-meandered.json')
 
 # Update ruins with design reference
 with open('story-geometry/ruins-complete.json', 'r') as f:
@@ -23,8 +24,7 @@ ruins['notes']['design_sources'] = [
     'MAP-DESIGN-CONCEPTS.md (ruins architecture)'
 ]
 
-with open('story-geometry/ruins-complete.json', 'w') as f:
-    json.dump(ruins, f, indent=2)
+save_map(ruins, None, 'story-geometry/ruins-complete.json')
 
 # Update bridge with design reference
 with open('story-geometry/bridge-over-forest-floor.json', 'r') as f:
@@ -46,7 +46,6 @@ bridge['notes']['missing'] = [
     'Structural supports visible from below'
 ]
 
-with open('story-geometry/bridge-over-forest-floor.json', 'w') as f:
-    json.dump(bridge, f, indent=2)
+save_map(bridge, None, 'story-geometry/bridge-over-forest-floor.json')
 
 print("Added design references to all JSON files")
@@ -1,11 +1,9 @@
-import json
+from heightmap import save_map
+from voxel_grid import load_map
 
 # Read current ruins
-with open('story-geometry/ruins-complete.json', 'r') as f:
-    ruins = json.load(f)
-
-# Current ruins voxels
-ruins_voxels = ruins['voxels']
+ruins, ruins_grid = load_map('story-geometry/ruins-complete.json')
+original_count = len(ruins_grid)
 
 # Add scattered grass around sides (sparse with air gaps)
 scattered_grass = []
@@ -57,11 +55,11 @@ print(f"  South side: ~{len([g for g in scattered_grass if g['z'] > 6])}")
 print(f"  East side: ~{len([g for g in scattered_grass if g['x'] > 24])}")
 print(f"  Front buffer: ~{len([g for g in scattered_grass if 12 <= g['x'] < 16])}")
 
-# Combine with ruins
-all_voxels = ruins_voxels + scattered_grass
+# Combine with ruins (grass never overwrites existing structure)
+for g in scattered_grass:
+    ruins_grid.add_if_empty(g['x'], g['y'], g['z'], g['color'])
 
 # Update ruins file
-ruins['voxels'] = all_voxels
 ruins['description'] = "Rotated ruins with scattered grass on sides. Grass disperses focus across environment."
 ruins['notes']['scattered_grass'] = {
     'count': len(scattered_grass),
@@ -71,12 +69,10 @@ ruins['notes']['scattered_grass'] = {
     'purpose': 'Disperse focus away from strict bridge-to-ruins pipeline'
 }
 
-with open('story-geometry/ruins-complete.json', 'w') as f:
-    json.dump(ruins, f, indent=2)
-
-with open('test-maps/ruins-test.json', 'w') as f:
-    json.dump(ruins, f, indent=2)
+save_map(ruins, ruins_grid,
+         'story-geometry/ruins-complete.json',
+         'test-maps/ruins-test.json')
 
-print(f"Updated ruins: {len(all_voxels)} total voxels")
-print(f"  Original ruins: {len(ruins_voxels)}")
-print(f"  Scattered grass: {len(scattered_grass)}")
+print(f"Updated ruins: {len(ruins_grid)} total voxels")
+print(f"  Original ruins: {original_count}")
+print(f"  Scattered grass: {len(ruins_grid) - original_count}")
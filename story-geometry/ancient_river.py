@@ -1,79 +1,15 @@
-import json
-import math
-
-# Read bridge structure
-with open('story-geometry/bridge-over-forest-floor.json', 'r') as f:
-    bridge_data = json.load(f)
-
-bridge_voxels = [v for v in bridge_data['voxels'] 
-                 if v['color'] == 11184810 or (v['color'] == 9127187 and v['y'] >= 1)]
+from river_gen import ANCIENT_RIVER, river_grid
+from heightmap import save_map
 
 # Create ancient, dramatically meandering river
-# This river has been here for centuries - mature curves, approaching oxbow
-ancient_river = []
+# This river has been here for centuries - mature curves, approaching oxbow.
+# River flows Z: -18 to +18 around X: 5 (middle of bridge); compound sine
+# meander, wider on the outside of bends, deep channel in the center and
+# sparse edges. Parameters live in river_gen.ANCIENT_RIVER.
+ancient_river = river_grid(ANCIENT_RIVER)
 
-# River flows Z: -18 to +18 (extended range)
-for z in range(-18, 19):
-    # Dramatic meander using compound sine waves (more natural/ancient)
-    # Primary curve + secondary variation = complex meandering
-    primary_curve = 3.5 * math.sin(z * 0.25)  # Large, slow curves
-    secondary_curve = 1.2 * math.sin(z * 0.6)  # Smaller variations
-    x_offset = int(primary_curve + secondary_curve)
-    
-    # River center around X: 5 (middle of bridge)
-    river_center_x = 5 + x_offset
-    
-    # Width varies with curve intensity (wider on outside of bends)
-    # More dramatic curves = wider river (erosion over time)
-    curve_intensity = abs(primary_curve)
-    base_width = 5  # Base width
-    curve_width = int(curve_intensity * 0.8)  # Extra width from curves
-    total_half_width = base_width + curve_width
-    
-    # Create river width
-    for x_var in range(-total_half_width, total_half_width + 1):
-        x = river_center_x + x_var
-        
-        # Skip bridge support areas
-        if (x == 0 or x == 11) and -1 <= z <= 1:
-            continue
-        
-        # Keep river from going too far from bridge area
-        if x < -2 or x > 13:
-            continue
-        
-        # Depth variation - deeper in center, shallower at edges
-        distance_from_center = abs(x_var)
-        if distance_from_center > total_half_width - 2:
-            y = 0  # Very shallow edges
-        elif distance_from_center > total_half_width - 4:
-            y = -1  # Shallow
-        else:
-            y = -2 if distance_from_center < 2 else -1  # Deep channel in center
-        
-        # Sparse pattern - not every voxel filled (natural gaps)
-        # More filled in center, sparser at edges
-        if distance_from_center < 3:
-            fill_chance = True  # Always fill center
-        elif distance_from_center < 6:
-            fill_chance = (x + z) % 2 == 0  # Half filled
-        else:
-            fill_chance = (x + z) % 3 == 0  # Sparse edges
-        
-        if fill_chance:
-            # Color variation - greens and browns scattered naturally
-            color_choice = (x * 7 + z * 11) % 5
-            if color_choice < 2:
-                color = 2263842  # Green (forest vegetation)
-            else:
-                color = 9127187  # Brown (mud/sediment)
-            
-            ancient_river.append({
-                'x': x,
-                'y': y,
-                'z': z,
-                'color': color
-            })
+base_width = ANCIENT_RIVER['half_width']
+curve_width = int(ANCIENT_RIVER['meanders'][0][0] * ANCIENT_RIVER['width_gain'])
 
 print(f"Created ancient river: {len(ancient_river)} voxels")
 print(f"Dramatic meandering with compound curves")
@@ -87,7 +23,6 @@ river_only = {
     'category': 'story-geometry',
     'playerStart': {'x': 0, 'y': 1, 'z': 0},
     'goal': {'x': 11, 'y': 1, 'z': 0},
-    'voxels': ancient_river,
     'notes': {
         'age': 'Ancient - centuries old, mature meandering',
         'flow_direction': 'Perpendicular to bridge (Z axis)',
@@ -107,10 +42,8 @@ river_only = {
     }
 }
 
-with open('story-geometry/river-meandered.json', 'w') as f:
-    json.dump(river_only, f, indent=2)
-
-with open('test-maps/river-meandered.json', 'w') as f:
-    json.dump(river_only, f, indent=2)
+save_map(river_only, ancient_river,
+         'story-geometry/river-meandered.json',
+         'test-maps/river-meandered.json', heightmap=True)
 
 print("Saved ancient river to river-meandered.json")
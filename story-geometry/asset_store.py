@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for map documents that live at more than one path.
+
+Several maps are written both to story-geometry/ (for review) and to
+test-maps/ (for the browser). Writing two copies doubles the I/O, and the
+copies drifted apart: one had the design notes, the other the baked
+heightmap. The store keeps each distinct document once, named by the
+sha256 of its bytes, and every path of a named ref is a relative symlink
+to that object:
+
+    story-geometry/store/objects/<sha256>.json   immutable map documents
+    story-geometry/store/refs.json               {"version": 1, "refs": {
+        "complete-scene": {"object": "<sha256>",
+                           "paths": ["story-geometry/complete-scene.json",
+                                     "test-maps/complete-scene.json"]}, ...}}
+
+    story-geometry/complete-scene.json -> store/objects/<sha256>.json
+    test-maps/complete-scene.json      -> ../story-geometry/store/objects/<sha256>.json
+
+Reading needs nothing special: open() and fetch() follow the symlinks.
+Writes go through write_json() (save_map() calls it). For a ref path it
+stores the object once, repoints the ref's paths and drops the previous
+object when nothing references it. For any path it skips the write when
+the bytes are unchanged. Writing through a ref path with a plain open()
+would change the object in place; `check` reports that (an object whose
+hash no longer matches its name). Tools that write other bytes (restored
+build outputs, fix-hex-colors.py) use write_bytes(), which never writes
+through a link: an untracked path is replaced by a plain file.
+
+Ref updates hold an exclusive lock on store/refs.lock and re-read refs.json
+under it, and refs.json is replaced atomically, so parallel writers
+(build_graph.py runs independent nodes concurrently) cannot lose each
+other's updates or read a half-written file.
+
+Paths in refs.json are relative to the repo root.
+
+Usage:
+    python3 story-geometry/asset_store.py track <name> <path> [<path> ...]
+    python3 story-geometry/asset_store.py check
+    python3 story-geometry/asset_store.py stats
+"""
+
+import hashlib
+import json
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+from profiling import stage
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+STORE_DIR = Path(__file__).resolve().parent / 'store'
+OBJECTS_DIR = STORE_DIR / 'objects'
+REFS_FILE = STORE_DIR / 'refs.json'
+LOCK_FILE = STORE_DIR / 'refs.lock'
+REFS_VERSION = 1
+
+
+def encode(data):
+    """Bytes of a map document as every tool writes it (indent=2)."""
+    return json.dumps(data, indent=2).encode()
+
+
+def object_path(sha):
+    return OBJECTS_DIR / f"{sha}.json"
+
+
+def _repo_path(path):
+    """Path relative to the repo root, as written in refs.json (no symlink resolution)."""
+    absolute = Path(os.path.abspath(path))
+    try:
+        return absolute.relative_to(REPO_ROOT).as_posix()
+    except ValueError:
+        return None
+
+
+def load_refs():
+    if not REFS_FILE.exists():
+        return {}
+    with open(REFS_FILE, 'r') as f:
+        refs = json.load(f)
+    if refs.get('version') != REFS_VERSION:
+        raise ValueError(f"{REFS_FILE}: unsupported refs version {refs.get('version')}")
+    return refs['refs']
+
+
+def _replace(path, blob):
+    """Write blob to a temp file beside path and rename it over path."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(blob)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def locked():
+    """Hold the store's exclusive lock (blocks other processes updating refs)."""
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_FILE, 'a') as lock:
+        try:
+            import fcntl
+        except ImportError:  # Windows: lock the file's first byte instead
+            import msvcrt
+            lock.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after 10 seconds
+                    pass
+            try:
+                yield
+            finally:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def save_refs(refs):
+    """Write refs.json atomically (call with the lock held)."""
+    text = json.dumps({'version': REFS_VERSION, 'refs': dict(sorted(refs.items()))}, indent=2)
+    if REFS_FILE.exists() and REFS_FILE.read_text() == text:
+        return False
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    _replace(REFS_FILE, text.encode())
+    return True
+
+
+def ref_for_path(path, refs=None):
+    """Name of the ref that owns path, or None."""
+    rel = _repo_path(path)
+    for name, ref in (load_refs() if refs is None else refs).items():
+        if rel in ref['paths']:
+            return name
+    return None
+
+
+def put(blob):
+    """Store bytes as an object unless present. Returns (sha, written)."""
+    sha = hashlib.sha256(blob).hexdigest()
+    target = object_path(sha)
+    if target.exists():
+        return sha, False
+    OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    _replace(target, blob)
+    return sha, True
+
+
+def _link(rel_path, sha):
+    """Point a repo path at an object with a relative symlink. Returns True if changed."""
+    path = REPO_ROOT / rel_path
+    target = os.path.relpath(object_path(sha), path.parent)
+    if path.is_symlink() and os.readlink(path) == target:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.link")
+    if tmp.is_symlink() or tmp.exists():
+        tmp.unlink()
+    os.symlink(target, tmp)
+    os.replace(tmp, path)
+    return True
+
+
+def _prune(sha, refs):
+    """Delete an object no ref points at."""
+    if sha and all(ref['object'] != sha for ref in refs.values()):
+        path = object_path(sha)
+        if path.exists():
+            path.unlink()
+
+
+def _save(refs, name, blob):
+    """save() with the lock held and refs freshly loaded."""
+    ref = refs[name]
+    sha, written = put(blob)
+    previous = ref['object']
+    ref['object'] = sha
+    for rel_path in ref['paths']:
+        written |= _link(rel_path, sha)
+    written |= save_refs(refs)
+    if previous != sha:
+        _prune(previous, refs)
+    return written
+
+
+def save(name, blob):
+    """Point ref name at blob and relink its paths. Returns True if anything was written."""
+    with locked():
+        return _save(load_refs(), name, blob)
+
+
+def write_bytes(path, blob):
+    """
+    Write bytes to path: through the store when path belongs to a ref,
+    skipped when the file already holds them, otherwise replaced atomically
+    (a symlink is replaced, never written through). Returns True if
+    anything was written.
+    """
+    name = ref_for_path(path)
+    if name is not None:
+        return save(name, blob)
+    path = Path(path)
+    if path.exists() and path.read_bytes() == blob:
+        return False
+    _replace(path, blob)
+    return True
+
+
+def write_json(path, data):
+    """
+    Write a JSON document (indent=2) to path: through the store when path
+    belongs to a ref, skipped when the file already holds these bytes.
+    Returns True if anything was written.
+    """
+    with stage('encode'):
+        blob = encode(data)
+    with stage('write'):
+        return write_bytes(path, blob)
+
+
+def track(name, paths):
+    """
+    Create or extend ref name over paths. The first path's current content
+    becomes the object; the others are replaced by links to it.
+    """
+    rel_paths = [_repo_path(p) for p in paths]
+    if None in rel_paths:
+        raise ValueError("Tracked paths must be inside the repository")
+    with locked():
+        refs = load_refs()
+        for rel in rel_paths:
+            owner = ref_for_path(REPO_ROOT / rel, refs)
+            if owner not in (None, name):
+                raise ValueError(f"{rel} already belongs to ref {owner}")
+        blob = (REPO_ROOT / rel_paths[0]).read_bytes()
+        ref = refs.setdefault(name, {'object': None, 'paths': []})
+        ref['paths'] = ref['paths'] + [p for p in rel_paths if p not in ref['paths']]
+        return _save(refs, name, blob)
+
+
+def check():
+    """Problems with the store, as a list of strings (empty if consistent)."""
+    problems = []
+    refs = load_refs()
+    for sha_path in sorted(OBJECTS_DIR.glob('*.json')) if OBJECTS_DIR.exists() else []:
+        if hashlib.sha256(sha_path.read_bytes()).hexdigest() != sha_path.stem:
+            problems.append(f"object {sha_path.name} was modified in place")
+        if all(ref['object'] != sha_path.stem for ref in refs.values()):
+            problems.append(f"object {sha_path.name} is not referenced")
+    for name, ref in sorted(refs.items()):
+        if not object_path(ref['object']).exists():
+            problems.append(f"{name}: object {ref['object']} is missing")
+        for rel_path in ref['paths']:
+            path = REPO_ROOT / rel_path
+            expected = os.path.relpath(object_path(ref['object']), path.parent)
+            if not path.is_symlink():
+                problems.append(f"{name}: {rel_path} is a file, not a link to the store")
+            elif os.readlink(path) != expected:
+                problems.append(f"{name}: {rel_path} points at {os.readlink(path)}")
+    return problems
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ('track', 'check', 'stats') or (args[0] == 'track' and len(args) < 3):
+        print("Usage: python3 story-geometry/asset_store.py <track <name> <path>...|check|stats>")
+        print("\nExample:")
+        print("  python3 story-geometry/asset_store.py track complete-scene test-maps/complete-scene.json "
+              "story-geometry/complete-scene.json")
+        print("  python3 story-geometry/asset_store.py check")
+        sys.exit(1)
+
+    command = args[0]
+    try:
+        if command == 'track':
+            name, paths = args[1], args[2:]
+            written = track(name, paths)
+            sha = load_refs()[name]['object']
+            print(f"✓ {name} → {sha[:12]} ({len(load_refs()[name]['paths'])} paths"
+                  f"{', updated' if written else ', unchanged'})")
+        elif command == 'check':
+            problems = check()
+            for problem in problems:
+                print(f"❌ {problem}")
+            if problems:
+                sys.exit(1)
+            print(f"✓ {len(load_refs())} refs consistent")
+        else:
+            refs = load_refs()
+            stored = sum(object_path(r['object']).stat().st_size for r in refs.values())
+            linked = sum(object_path(r['object']).stat().st_size * len(r['paths']) for r in refs.values())
+            for name, ref in sorted(refs.items()):
+                print(f"  {name}: {ref['object'][:12]} {object_path(ref['object']).stat().st_size} bytes "
+                      f"× {len(ref['paths'])} paths")
+            print(f"✓ {len(refs)} refs, {stored} bytes stored for {linked} bytes of paths")
+    except (OSError, ValueError, KeyError) as error:
+        print(f"❌ {error}")
+        sys.exit(1)
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the map tooling hot paths, with result history and a
+regression gate.
+
+Each benchmark runs at 1K, 100K and 1M voxels on fixed, seeded inputs
+built before the clock starts (map files come from stress_map.py):
+
+    validate   validate-test-json.py validate_json_file() on a map file
+    fix-hex    fix-hex-colors.py fix_hex_colors() on a map with ~10% hex colors
+               (file restored before each repeat, untimed)
+    compose    compose.compose() of floor + river + ruins layers that overlap,
+               like combine_all.py
+    river      river_gen.river_grid() with the ancient-river shape, lengthened
+    ruins      rotate + translate ruins plots (transform.Transform) and fill
+               sparse grass with add_if_empty(), like rotate_ruins.py and
+               add_grass_to_ruins.py
+    simulate   cutscene_sim.CutsceneSimulator: 8 characters x 200 actions over
+               a columnar stress map (load + run)
+
+The reported time is the best of --repeat runs. Results are appended to
+.bench-history.jsonl in the repo root (untracked, like .validate-cache.json):
+one JSON line per run with time, commit, host and {benchmark/size: seconds}.
+A benchmark regresses when it is slower than the median of its last
+HISTORY_WINDOW results on the same host by more than the threshold (default
+1.25x) and by at least NOISE_FLOOR seconds. Any regression exits 1.
+
+Usage:
+    python3 story-geometry/bench.py run
+    python3 story-geometry/bench.py run --sizes 1k,100k --only validate,compose --repeat 5
+    python3 story-geometry/bench.py run --threshold 1.5 --no-record
+    python3 story-geometry/bench.py history [benchmark/size]
+    python3 story-geometry/bench.py list
+"""
+
+import importlib.util
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from compose import compose, layer
+from cutscene_sim import CutsceneSimulator
+from river_gen import ANCIENT_RIVER, river_grid
+from stress_map import DEFAULTS as STRESS_DEFAULTS, write_map
+from transform import Transform
+from voxel_grid import VoxelGrid, pack_arrays, unpack_arrays
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+HISTORY_FILE = REPO_ROOT / '.bench-history.jsonl'
+HISTORY_WINDOW = 5
+DEFAULT_THRESHOLD = 1.25
+NOISE_FLOOR = 0.005  # seconds; smaller slowdowns are timer noise
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+SEED = 1234
+GREEN, BROWN, STONE = 2263842, 9127187, 11184810
+
+
+def _load_root_script(name):
+    """Import a hyphenated script from the repo root (validate-test-json.py, ...)."""
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), REPO_ROOT / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ----------------------------------------------------------------------
+# Fixed inputs
+# ----------------------------------------------------------------------
+
+def unique_cells(n, seed, spread=None, y_range=(0, 4)):
+    """n distinct (x, y, z) int arrays on a square area, seeded."""
+    rng = np.random.RandomState(seed)
+    spread = spread or max(8, int(np.sqrt(n / 2)) + 1)
+    keys = np.empty(0, dtype=np.int64)
+    while len(keys) < n:
+        m = 2 * (n - len(keys)) + 16
+        fresh = pack_arrays(rng.randint(-spread, spread, m), rng.randint(*y_range, m),
+                            rng.randint(-spread, spread, m))
+        keys = np.concatenate([keys, fresh])
+        _, first = np.unique(keys, return_index=True)
+        keys = keys[np.sort(first)]
+    return unpack_arrays(keys[:n])
+
+
+def stress_params(n, **overrides):
+    """stress_map.py parameters for the n-voxel bench map."""
+    return dict(STRESS_DEFAULTS, voxels=n, seed=SEED, **overrides)
+
+
+def ruins_plots(n, seed=SEED):
+    """Hollow 12x12 stone tower bases of height 4 with seeded gaps, ~n voxels."""
+    rng = np.random.RandomState(seed)
+    ring = [(x, z) for x in range(12) for z in range(12) if x in (0, 11) or z in (0, 11)]
+    plot = np.array([(x, y, z) for y in range(4) for x, z in ring])
+    plots = max(1, n // len(plot))
+    side = int(np.ceil(np.sqrt(plots)))
+    origin = np.array([(20 * (i % side), 0, 20 * (i // side)) for i in range(plots)])
+    cells = (origin[:, None, :] + plot[None, :, :]).reshape(-1, 3)
+    cells = cells[rng.rand(len(cells)) > 0.1]  # collapsed stones
+    return VoxelGrid.from_arrays(cells[:, 0], cells[:, 1], cells[:, 2], np.full(len(cells), STONE))
+
+
+# ----------------------------------------------------------------------
+# Benchmarks: setup(n, workdir) -> {'run': fn, 'prepare': fn (untimed, optional)}
+# ----------------------------------------------------------------------
+
+def bench_validate(n, workdir):
+    validator = _load_root_script('validate-test-json')
+    path = workdir / f"validate-{n}.json"
+    write_map(path, stress_params(n))
+    return {'run': lambda: validator.validate_json_file(str(path))}
+
+
+def bench_fix_hex(n, workdir):
+    fixer = _load_root_script('fix-hex-colors')
+    source = workdir / f"hex-{n}.json.orig"
+    write_map(source, stress_params(n, hex_every=10))
+    path = workdir / f"hex-{n}.json"
+    return {'prepare': lambda: shutil.copyfile(source, path),
+            'run': lambda: fixer.fix_hex_colors(str(path))}
+
+
+def bench_compose(n, workdir):
+    floor_x, _, floor_z = unique_cells(n // 2, SEED, y_range=(0, 1))
+    floor = VoxelGrid.from_arrays(floor_x, np.zeros(len(floor_x)), floor_z,
+                                  np.where((floor_x + floor_z) % 2 == 0, GREEN, BROWN))
+    # River and ruins overlap the floor and each other
+    rx, ry, rz = unique_cells(n // 4, SEED + 1, y_range=(-2, 1))
+    river = VoxelGrid.from_arrays(rx, ry, rz, np.full(len(rx), BROWN))
+    sx, sy, sz = unique_cells(n - n // 2 - n // 4, SEED + 2, y_range=(0, 3))
+    ruins = VoxelGrid.from_arrays(sx, sy, sz, np.full(len(sx), STONE))
+    layers = [layer('floor', floor), layer('river', river), layer('ruins', ruins)]
+    return {'run': lambda: compose(layers)}
+
+
+def bench_river(n, workdir):
+    params = dict(ANCIENT_RIVER, x_range=None, exclude=[], z_range=(0, 1000))
+    per_row = len(river_grid(params)) / 1000
+    params['z_range'] = (0, max(1, int(n / per_row)))
+    return {'run': lambda: river_grid(params)}
+
+
+def bench_ruins(n, workdir):
+    ruins = ruins_plots(n * 3 // 4)
+    low, high = ruins.bounds()
+    gx, gz = np.meshgrid(np.arange(low[0] - 4, high[0] + 5), np.arange(low[2] - 4, high[2] + 5), indexing='ij')
+    sparse = (gx * 3 + gz * 7) % 4 == 0
+    grass = list(zip(gx[sparse].tolist(), gz[sparse].tolist()))[:n - len(ruins)]
+    transform = Transform().rotate('y', 180).translate(3, 0, 0)
+
+    def run():
+        moved = transform.apply(ruins)
+        for x, z in grass:
+            moved.add_if_empty(x, 0, z, GREEN if (x + z) % 2 == 0 else BROWN)
+        return moved
+
+    return {'run': run}
+
+
+def bench_simulate(n, workdir):
+    path = workdir / f"simulate-{n}.json"
+    write_map(path, stress_params(n, characters=8, actions=200, columnar=True))
+    with open(path) as f:
+        data = json.load(f)
+    return {'run': lambda: CutsceneSimulator(data).run()}
+
+
+BENCHMARKS = {
+    'validate': bench_validate,
+    'fix-hex': bench_fix_hex,
+    'compose': bench_compose,
+    'river': bench_river,
+    'ruins': bench_ruins,
+    'simulate': bench_simulate,
+}
+
+
+# ----------------------------------------------------------------------
+# Running and history
+# ----------------------------------------------------------------------
+
+def measure(case, repeat):
+    """Best wall time of repeat runs."""
+    best = None
+    for _ in range(repeat):
+        if 'prepare' in case:
+            case['prepare']()
+        start = time.perf_counter()
+        case['run']()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def load_history():
+    if not HISTORY_FILE.exists():
+        return []
+    with open(HISTORY_FILE, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baseline(history, name, host):
+    """Median of the last HISTORY_WINDOW results for name on host, or None."""
+    values = [run['results'][name] for run in history if run.get('host') == host and name in run['results']]
+    return statistics.median(values[-HISTORY_WINDOW:]) if values else None
+
+
+def _commit():
+    result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=REPO_ROOT)
+    return result.stdout.strip() or None
+
+
+def run_suite(names, sizes, repeat, threshold, record):
+    """Run, compare with history, optionally record. Returns True if nothing regressed."""
+    history = load_history()
+    host = platform.node()
+    results = {}
+    ok = True
+    with tempfile.TemporaryDirectory(prefix='bench-') as tmp:
+        workdir = Path(tmp)
+        for size in sizes:
+            for name in names:
+                key = f"{name}/{size}"
+                case = BENCHMARKS[name](SIZES[size], workdir)
+                seconds = measure(case, repeat)
+                results[key] = round(seconds, 6)
+                base = baseline(history, key, host)
+                line = f"{key:<16} {seconds * 1000:10.1f}ms"
+                if base is None:
+                    print(f"- {line}  (no baseline)")
+                    continue
+                ratio = seconds / base if base else float('inf')
+                regressed = ratio > threshold and seconds - base > NOISE_FLOOR
+                ok &= not regressed
+                print(f"{'❌' if regressed else '✓'} {line}  (baseline {base * 1000:.1f}ms, {ratio:.2f}x"
+                      f"{f' > {threshold:.2f}x' if regressed else ''})")
+    if record:
+        entry = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': _commit(), 'host': host,
+                 'python': platform.python_version(), 'repeat': repeat, 'results': results}
+        with open(HISTORY_FILE, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+    return ok
+
+
+def _option(args, name, default=None):
+    if name not in args:
+        return default
+    i = args.index(name)
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ('run', 'history', 'list'):
+        print("Usage: python3 story-geometry/bench.py <run|history|list> [--sizes 1k,100k,1m] "
+              "[--only name,...] [--repeat N] [--threshold X] [--no-record]")
+        print("\nExample:")
+        print("  python3 story-geometry/bench.py run --sizes 1k,100k")
+        print("  python3 story-geometry/bench.py history validate/100k")
+        sys.exit(1)
+
+    command = args[0]
+    if command == 'list':
+        for name, setup in BENCHMARKS.items():
+            print(f"  {name:<10} {', '.join(f'{name}/{s}' for s in SIZES)}")
+        sys.exit(0)
+
+    if command == 'history':
+        host = platform.node()
+        wanted = args[1:]
+        for run in load_history():
+            results = {k: v for k, v in run['results'].items() if not wanted or k in wanted}
+            if results:
+                shown = ', '.join(f"{k} {v * 1000:.1f}ms" for k, v in results.items())
+                mark = '' if run.get('host') == host else f" [{run.get('host')}]"
+                print(f"  {run['time']} {run.get('commit') or '-'}{mark}: {shown}")
+        sys.exit(0)
+
+    record = '--no-record' not in args
+    args = [a for a in args if a != '--no-record']
+    sizes = _option(args, '--sizes', ','.join(SIZES)).split(',')
+    names = _option(args, '--only', ','.join(BENCHMARKS)).split(',')
+    repeat = int(_option(args, '--repeat', 3))
+    threshold = float(_option(args, '--threshold', DEFAULT_THRESHOLD))
+    unknown = [s for s in sizes if s not in SIZES] + [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        print(f"❌ Unknown size or benchmark: {', '.join(unknown)}")
+        sys.exit(1)
+
+    ok = run_suite(names, sizes, repeat, threshold, record)
+    print(f"\n{'✓ No regressions' if ok else '❌ Regressions'} (threshold {threshold:.2f}x"
+          f"{', recorded' if record else ''})")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
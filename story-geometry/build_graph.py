@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Incremental build graph for the story geometry.
+
+Each generator script is one node with explicit inputs and outputs. A
+node's cache key is the SHA-256 of its script, the shared modules it
+imports, its args, and the contents of its inputs. Nodes whose key is
+unchanged and whose outputs are intact are skipped. Nodes whose key was
+seen before have their outputs restored from the blob cache instead of
+re-running. Independent nodes run in parallel.
+
+Sources (hand-authored, not produced by any node):
+    story-geometry/bridge-over-forest-floor.json
+    story-geometry/ruins-complete.json   (edited in place by ruins-* nodes)
+    story-geometry/floating-ship.json    (snapshot, see below)
+
+Nodes that write one of their own inputs (the ruins-* chain) must be
+idempotent: keys are recorded against the settled tree after a build,
+so a second run over unchanged files is a no-op. rotate_ruins.py is NOT
+idempotent (it rotates again every run). It was a one-time migration that
+has already been applied, so it is deliberately not a node. Neither is
+save_floating_ship.py: floating-ship.json is a snapshot taken from an
+earlier bridge, and re-running it against today's bridge gives a different
+ship.
+
+Usage (from repo root):
+    python3 story-geometry/build_graph.py                  # build everything
+    python3 story-geometry/build_graph.py composite        # target + upstream
+    python3 story-geometry/build_graph.py --dry-run        # show what would run
+    python3 story-geometry/build_graph.py --force river    # ignore cache
+    python3 story-geometry/build_graph.py --jobs 4
+    python3 story-geometry/build_graph.py --force --profile /tmp/trace.json
+
+--profile runs every node under profiling.py (STORY_PROFILE) and collects
+their stages into one Chrome trace, then prints one summary line per node.
+Cached nodes do not run, so pair it with --force for a full picture.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+from asset_store import write_bytes
+from profiling import finish_trace, process_summaries, read_trace, start_trace
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCRIPT_DIR = 'story-geometry'
+CACHE_DIR = REPO_ROOT / '.build-cache'
+
+
+class Node:
+    """One generator run: script + args, reading inputs, writing outputs."""
+
+    def __init__(self, name, script, inputs=(), outputs=(), args=(), deps=()):
+        self.name = name
+        self.script = f'{SCRIPT_DIR}/{script}'
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.args = [str(a) for a in args]
+        # Local modules the script imports - part of the cache key
+        self.deps = [f'{SCRIPT_DIR}/{d}' for d in deps]
+
+    def __repr__(self):
+        return f'Node({self.name!r})'
+
+
+BRIDGE = 'story-geometry/bridge-over-forest-floor.json'
+RIVER = 'story-geometry/river-meandered.json'
+RUINS = 'story-geometry/ruins-complete.json'
+SCENE = 'story-geometry/complete-scene.json'
+SHIP = 'story-geometry/floating-ship.json'
+BAKED_MAPS = ['test-maps/river-meandered.json', 'test-maps/ruins-test.json',
+              'test-maps/floating-ship.json', 'test-maps/complete-scene.json']
+# The same refs (asset_store.py): baking a test-maps copy rewrites these too
+BAKED_LINKS = [RIVER, RUINS, SHIP, SCENE]
+MESHED_MAPS = BAKED_MAPS + ['test-maps/cutscene-act-1-2-3.json']
+
+# Declaration order matters only for nodes writing the same file: a node
+# reads the version produced by the closest earlier writer.
+NODES = [
+    Node('river', 'ancient_river.py',
+         outputs=[RIVER, 'test-maps/river-meandered.json'],
+         deps=['voxel_grid.py', 'heightmap.py', 'river_gen.py']),
+    Node('ruins-grass', 'add_grass_to_ruins.py',
+         inputs=[RUINS],
+         outputs=[RUINS, 'test-maps/ruins-test.json'],
+         deps=['voxel_grid.py', 'heightmap.py']),
+    Node('ruins-artifacts', 'expand_ruins.py',
+         inputs=[RUINS],
+         outputs=[RUINS, 'test-maps/ruins-test.json'],
+         deps=['voxel_grid.py', 'heightmap.py']),
+    Node('composite', 'combine_all.py',
+         inputs=[BRIDGE, RIVER, RUINS],
+         outputs=[SCENE, 'test-maps/complete-scene.json'],
+         deps=['voxel_grid.py', 'heightmap.py', 'compose.py']),
+    # Column heightmap sidecar for the maps the browser loads (idempotent)
+    Node('heightmaps', 'heightmap.py',
+         inputs=BAKED_MAPS, outputs=BAKED_MAPS + BAKED_LINKS,
+         args=['bake'] + BAKED_MAPS,
+         deps=['voxel_grid.py']),
+    # Merged per-color terrain meshes (<map>.glb) for the browser
+    Node('meshes', 'greedy_mesh.py',
+         inputs=MESHED_MAPS,
+         outputs=[m.replace('.json', '.glb') for m in MESHED_MAPS],
+         args=['build'] + MESHED_MAPS,
+         deps=['voxel_grid.py']),
+]
+
+
+# ----------------------------------------------------------------------
+# Graph
+# ----------------------------------------------------------------------
+
+def dependencies(nodes):
+    """{node name: set of upstream node names}"""
+    deps = {}
+    for i, node in enumerate(nodes):
+        upstream = set()
+        for path in set(node.inputs) | set(node.outputs):
+            # Closest earlier writer of this path
+            for prev in reversed(nodes[:i]):
+                if path in prev.outputs:
+                    upstream.add(prev.name)
+                    break
+        deps[node.name] = upstream
+    return deps
+
+
+def select(nodes, targets):
+    """Targets plus everything upstream of them (all nodes if no targets)."""
+    by_name = {n.name: n for n in nodes}
+    unknown = [t for t in targets if t not in by_name]
+    if unknown:
+        raise KeyError(f"Unknown node(s): {', '.join(unknown)}")
+    if not targets:
+        return list(nodes)
+    deps = dependencies(nodes)
+    wanted = set()
+    stack = list(targets)
+    while stack:
+        name = stack.pop()
+        if name not in wanted:
+            wanted.add(name)
+            stack.extend(deps[name])
+    return [n for n in nodes if n.name in wanted]
+
+
+# ----------------------------------------------------------------------
+# Content hashing and cache
+# ----------------------------------------------------------------------
+
+def file_hash(path):
+    full = REPO_ROOT / path
+    if not full.exists():
+        return None
+    h = hashlib.sha256()
+    with open(full, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def node_key(node):
+    h = hashlib.sha256()
+    h.update(node.name.encode())
+    for path in [node.script] + node.deps + node.inputs:
+        h.update(path.encode())
+        h.update((file_hash(path) or 'missing').encode())
+    h.update(json.dumps(node.args).encode())
+    return h.hexdigest()
+
+
+class Cache:
+    """
+    .build-cache/state.json: {node: {'key': ..., 'history': {key: {path: sha}}}}
+    .build-cache/objects/<sha>: output blobs
+    """
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = Path(root)
+        self.objects = self.root / 'objects'
+        self.state_path = self.root / 'state.json'
+        try:
+            with open(self.state_path, 'r') as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+
+    def save(self):
+        self.objects.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def is_current(self, node, key):
+        entry = self.state.get(node.name)
+        if not entry or entry.get('key') != key:
+            return False
+        outputs = entry['history'].get(key, {})
+        return all(file_hash(p) == sha for p, sha in outputs.items())
+
+    def restore(self, node, key):
+        """
+        Copy cached outputs for key back into the tree. True on success.
+        Outputs that are asset-store paths are restored through the store
+        (write_bytes), never by writing through their links.
+        """
+        entry = self.state.get(node.name)
+        outputs = entry and entry['history'].get(key)
+        if not outputs or set(outputs) != set(node.outputs):
+            return False
+        blobs = {p: self.objects / sha for p, sha in outputs.items()}
+        if not all(b.exists() for b in blobs.values()):
+            return False
+        for path, blob in blobs.items():
+            write_bytes(REPO_ROOT / path, blob.read_bytes())
+        return True
+
+    def record(self, node):
+        """Store node's current outputs under the key of the current tree."""
+        key = node_key(node)
+        outputs = {}
+        self.objects.mkdir(parents=True, exist_ok=True)
+        for path in node.outputs:
+            sha = file_hash(path)
+            if sha is None:
+                continue
+            blob = self.objects / sha
+            if not blob.exists():
+                shutil.copyfile(REPO_ROOT / path, blob)
+            outputs[path] = sha
+        entry = self.state.setdefault(node.name, {'key': None, 'history': {}})
+        entry['key'] = key
+        entry['history'][key] = outputs
+
+
+# ----------------------------------------------------------------------
+# Execution
+# ----------------------------------------------------------------------
+
+def run_node(node):
+    start = time.time()
+    result = subprocess.run(
+        [sys.executable, node.script] + node.args,
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    return result, time.time() - start
+
+
+def build(nodes, jobs=None, force=False, dry_run=False, cache=None):
+    """
+    Build nodes in dependency order. Returns {name: status} where status is
+    'up-to-date', 'restored', 'built', 'would-build', 'failed' or 'skipped'.
+    """
+    cache = cache or Cache()
+    deps = dependencies(nodes)
+    names = {n.name for n in nodes}
+    pending = {n.name: n for n in nodes}
+    waiting_on = {n.name: deps[n.name] & names for n in nodes}
+    status = {}
+
+    def ready():
+        return [pending[name] for name in list(pending)
+                if not waiting_on[name] - set(status)]
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        running = {}
+        while pending or running:
+            for node in ready():
+                del pending[node.name]
+                if any(status[d] in ('failed', 'skipped') for d in waiting_on[node.name]):
+                    status[node.name] = 'skipped'
+                    print(f"- {node.name}: skipped (upstream failed)")
+                    continue
+                key = node_key(node)
+                if not force and cache.is_current(node, key):
+                    status[node.name] = 'up-to-date'
+                    print(f"✓ {node.name}: up to date")
+                elif not force and cache.restore(node, key):
+                    status[node.name] = 'restored'
+                    print(f"✓ {node.name}: restored from cache")
+                elif dry_run:
+                    status[node.name] = 'would-build'
+                    print(f"▶ {node.name}: would run {node.script}")
+                else:
+                    print(f"▶ {node.name}: running {node.script}")
+                    running[pool.submit(run_node, node)] = node
+
+            if not running:
+                if pending and not ready():
+                    raise RuntimeError(f"Dependency cycle among: {', '.join(pending)}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                result, elapsed = future.result()
+                if result.returncode == 0:
+                    status[node.name] = 'built'
+                    print(f"✓ {node.name}: built in {elapsed:.2f}s")
+                else:
+                    status[node.name] = 'failed'
+                    print(f"❌ {node.name}: exit {result.returncode}")
+                    for line in result.stderr.strip().splitlines()[-5:]:
+                        print(f"   {line}")
+
+    if not dry_run:
+        # Record keys against the settled tree (see module docstring)
+        for node in nodes:
+            if status.get(node.name) in ('built', 'restored', 'up-to-date'):
+                cache.record(node)
+        cache.save()
+    return status
+
+
+def main():
+    args = sys.argv[1:]
+    force = '--force' in args
+    dry_run = '--dry-run' in args
+    jobs = None
+    if '--jobs' in args:
+        i = args.index('--jobs')
+        jobs = int(args[i + 1])
+        del args[i:i + 2]
+    profile = None
+    if '--profile' in args:
+        i = args.index('--profile')
+        profile = Path(args[i + 1]).resolve()
+        del args[i:i + 2]
+    targets = [a for a in args if not a.startswith('--')]
+
+    if '--help' in args:
+        print("Usage: python3 story-geometry/build_graph.py [--force] [--dry-run] [--jobs N] [--profile trace.json] [node...]")
+        print("\nNodes:")
+        deps = dependencies(NODES)
+        for node in NODES:
+            after = ', '.join(sorted(deps[node.name])) or '-'
+            print(f"  {node.name:16} {node.script:40} after: {after}")
+        sys.exit(0)
+
+    try:
+        nodes = select(NODES, targets)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        sys.exit(1)
+
+    if profile is not None:
+        start_trace(profile)
+        os.environ['STORY_PROFILE'] = str(profile)
+    status = build(nodes, jobs=jobs, force=force, dry_run=dry_run)
+    if profile is not None:
+        finish_trace(profile)
+        for line in process_summaries(read_trace(profile)):
+            print(line)
+        print(f"Trace: {profile}")
+    counts = {}
+    for s in status.values():
+        counts[s] = counts.get(s, 0) + 1
+    print('\n' + ', '.join(f"{v} {k}" for k, v in sorted(counts.items())))
+    sys.exit(1 if 'failed' in counts else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,28 @@
-import json
+from compose import compose, format_report, layer
+from heightmap import save_map
+from voxel_grid import load_map
 
 # Read bridge structure
-with open('story-geometry/bridge-over-forest-floor.json', 'r') as f:
-    bridge_data = json.load(f)
+bridge_data, bridge_grid = load_map('story-geometry/bridge-over-forest-floor.json')
 
 # Separate bridge voxels (just structure)
-bridge_voxels = [v for v in bridge_data['voxels'] 
-                 if v['color'] == 11184810 or (v['color'] == 9127187 and v['y'] >= 1)]
+bridge_voxels = bridge_grid.select(
+    (bridge_grid.color == 11184810) |
+    ((bridge_grid.color == 9127187) & (bridge_grid.y >= 1))
+)
 
 # Read meandered river
-with open('story-geometry/river-meandered.json', 'r') as f:
-    river_data = json.load(f)
+river_data, river_grid = load_map('story-geometry/river-meandered.json')
 
 # Read rotated ruins
-with open('story-geometry/ruins-complete.json', 'r') as f:
-    ruins_data = json.load(f)
+ruins_data, ruins_grid = load_map('story-geometry/ruins-complete.json')
 
-# Combine all
-combined = bridge_voxels + river_data['voxels'] + ruins_data['voxels']
+# Combine all (equal priority: later layers win where cells overlap)
+combined, overlaps = compose([
+    layer('bridge', bridge_voxels),
+    layer('river', river_grid),
+    layer('ruins', ruins_grid),
+])
 
 complete_scene = {
     'name': 'Bridge at Old Fort Crossing - Combined',
@@ -25,25 +30,24 @@ complete_scene = {
     'category': 'story-geometry',
     'playerStart': {'x': 0, 'y': 1, 'z': 0},
     'goal': {'x': 23, 'y': 2, 'z': 0},
-    'voxels': combined,
     'notes': {
         'components': {
             'bridge_structure': len(bridge_voxels),
-            'meandered_river': len(river_data['voxels']),
-            'ruins_with_buffer': len(ruins_data['voxels'])
+            'meandered_river': len(river_grid),
+            'ruins_with_buffer': len(ruins_grid)
         },
         'total_voxels': len(combined),
         'next_step': 'Assess empty spaces, then add scattered grass to ruins sides'
     }
 }
 
-with open('story-geometry/complete-scene.json', 'w') as f:
-    json.dump(complete_scene, f, indent=2)
-
-with open('test-maps/complete-scene.json', 'w') as f:
-    json.dump(complete_scene, f, indent=2)
+save_map(complete_scene, combined,
+         'story-geometry/complete-scene.json',
+         'test-maps/complete-scene.json', heightmap=True)
 
 print(f"Combined scene created: {len(combined)} voxels")
 print(f"  Bridge: {len(bridge_voxels)}")
-print(f"  River: {len(river_data['voxels'])}")
-print(f"  Ruins: {len(ruins_data['voxels'])}")
+print(f"  River: {len(river_grid)}")
+print(f"  Ruins: {len(ruins_grid)}")
+print("Overlaps:")
+print('\n'.join(format_report(overlaps)))
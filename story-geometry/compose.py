@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Scene composition: boolean operations over voxel layers with priority-based
+conflict resolution and an overlap report.
+
+A composition is an ordered list of layers applied to an (initially empty)
+scene. Each layer is a VoxelGrid plus an operation:
+
+    union       add the layer's cells. Where a cell is already in the
+                scene, the higher priority wins; ties go to the later layer
+                (same as VoxelGrid.extend()).
+    difference  remove the layer's cells from the scene (carving).
+    intersect   keep only scene cells that the layer also holds (masking).
+    paint       recolor scene cells that the layer also holds, without
+                adding cells. Cells owned by a higher priority keep their
+                color.
+
+The scene is kept as packed-key arrays sorted by key, so every operation is
+a sort-merge (np.intersect1d, stable argsort of two sorted runs) over whole
+arrays. Three million-voxel layers compose in about a second, most of it
+spent indexing the resulting VoxelGrid. Output rows come in first-seen
+order, the same order as extending a VoxelGrid layer by layer.
+
+    from compose import compose, layer, format_report
+
+    scene, report = compose([
+        layer('bridge', bridge_grid),
+        layer('river', river_grid),
+        layer('ruins', ruins_grid, priority=1),
+        layer('cellar', cellar_grid, op='difference'),
+    ])
+    print('\\n'.join(format_report(report)))
+
+Usage:
+    python3 story-geometry/compose.py <out.json> <op>:<map.json>[@priority] ...
+    python3 story-geometry/compose.py /tmp/scene.json union:story-geometry/river-meandered.json \\
+        union:story-geometry/ruins-complete.json@1
+"""
+
+import sys
+
+import numpy as np
+
+from profiling import stage
+from voxel_grid import VoxelGrid, load_map, save_map, unpack_arrays
+
+OPERATIONS = ('union', 'difference', 'intersect', 'paint')
+# Keys of the first layer's map that describe its own voxels, not the scene
+WHOLE_MAP_KEYS = ('voxels', 'heightmap')
+
+
+def layer(name, grid, op='union', priority=0):
+    """A composition step: {'name', 'grid', 'op', 'priority'}."""
+    if op not in OPERATIONS:
+        raise ValueError(f"Unknown operation {op!r} (choose from {', '.join(OPERATIONS)})")
+    return {'name': name, 'grid': grid, 'op': op, 'priority': priority}
+
+
+class _Scene:
+    """Unique packed keys (sorted) with color, winning priority, owner layer and first-seen order."""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.color = np.empty(0, dtype=np.int64)
+        self.priority = np.empty(0, dtype=np.int64)
+        self.owner = np.empty(0, dtype=np.int64)
+        self.seen = np.empty(0, dtype=np.int64)
+        self.next_seen = 0
+
+    def take(self, rows):
+        for name in ('keys', 'color', 'priority', 'owner', 'seen'):
+            setattr(self, name, getattr(self, name)[rows])
+
+    def to_grid(self):
+        order = np.argsort(self.seen, kind='stable')
+        xs, ys, zs = unpack_arrays(self.keys[order])
+        return VoxelGrid.from_arrays(xs, ys, zs, self.color[order])
+
+
+def _layer_arrays(grid):
+    """(keys, colors, first-seen offsets) of a grid, sorted by key."""
+    order = np.argsort(grid.keys, kind='stable')
+    return grid.keys[order], grid.color[order], order
+
+
+def _owner_counts(owner, names):
+    values, counts = np.unique(owner, return_counts=True)
+    return {names[v]: int(c) for v, c in zip(values.tolist(), counts.tolist())}
+
+
+def compose(layers):
+    """
+    Apply layers in order. Returns (VoxelGrid, report) where report has one
+    entry per layer: name, op, priority, cells, overlap (cells already in
+    the scene), conflicts (overlap with a different color), overlapWith
+    ({earlier layer: cells}), and for the result: added, removed, recolored,
+    kept (overlap that the layer lost on priority), scene (size after).
+    """
+    with stage('compose', voxels_in=sum(len(l['grid']) for l in layers)) as s:
+        grid, report = _compose(layers)
+        s.voxels_out = len(grid)
+    return grid, report
+
+
+def _compose(layers):
+    scene = _Scene()
+    names = [l['name'] for l in layers]
+    report = []
+
+    for index, step in enumerate(layers):
+        keys, colors, offsets = _layer_arrays(step['grid'])
+        priority = step['priority']
+        with stage('conflicts', voxels_in=len(keys)):
+            _, in_scene, in_layer = np.intersect1d(scene.keys, keys, assume_unique=True, return_indices=True)
+            conflicts = scene.color[in_scene] != colors[in_layer]
+        entry = {
+            'name': step['name'], 'op': step['op'], 'priority': priority,
+            'cells': len(keys), 'overlap': len(in_scene), 'conflicts': int(conflicts.sum()),
+            'overlapWith': _owner_counts(scene.owner[in_scene], names),
+            'added': 0, 'removed': 0, 'recolored': 0, 'kept': 0,
+        }
+
+        if step['op'] == 'union':
+            wins = scene.priority[in_scene] <= priority
+            entry['recolored'] = int((wins & conflicts).sum())
+            entry['kept'] = int((~wins).sum())
+            entry['added'] = len(keys) - len(in_scene)
+            # Overlapping cells: the layer takes over where it wins, the
+            # cell keeps its first-seen position either way
+            won = in_scene[wins]
+            scene.color[won] = colors[in_layer[wins]]
+            scene.priority[won] = priority
+            scene.owner[won] = index
+            fresh = np.ones(len(keys), dtype=bool)
+            fresh[in_layer] = False
+            all_keys = np.concatenate([scene.keys, keys[fresh]])
+            order = np.argsort(all_keys, kind='stable')
+            scene.keys = all_keys[order]
+            scene.color = np.concatenate([scene.color, colors[fresh]])[order]
+            scene.priority = np.concatenate([scene.priority, np.full(fresh.sum(), priority)])[order]
+            scene.owner = np.concatenate([scene.owner, np.full(fresh.sum(), index)])[order]
+            scene.seen = np.concatenate([scene.seen, scene.next_seen + offsets[fresh]])[order]
+            scene.next_seen += len(keys)
+        elif step['op'] == 'difference':
+            keep = np.ones(len(scene.keys), dtype=bool)
+            keep[in_scene] = False
+            entry['removed'] = len(in_scene)
+            scene.take(keep)
+        elif step['op'] == 'intersect':
+            entry['removed'] = len(scene.keys) - len(in_scene)
+            scene.take(np.sort(in_scene))
+        else:  # paint
+            wins = scene.priority[in_scene] <= priority
+            painted = in_scene[wins]
+            entry['recolored'] = int((wins & conflicts).sum())
+            entry['kept'] = int((~wins).sum())
+            scene.color[painted] = colors[in_layer[wins]]
+            scene.owner[painted] = index
+
+        entry['scene'] = len(scene.keys)
+        report.append(entry)
+
+    return scene.to_grid(), report
+
+
+def format_report(report):
+    """One line per layer, for printing."""
+    lines = []
+    for entry in report:
+        line = (f"  {entry['op']} {entry['name']} (priority {entry['priority']}): "
+                f"{entry['cells']} cells")
+        if entry['overlap']:
+            with_text = ', '.join(f"{name} {count}" for name, count in entry['overlapWith'].items())
+            line += f", {entry['overlap']} overlap ({with_text}), {entry['conflicts']} color conflicts"
+        changes = [f"{key} {entry[key]}" for key in ('added', 'removed', 'recolored', 'kept') if entry[key]]
+        if changes:
+            line += f" → {', '.join(changes)}"
+        lines.append(line + f" = {entry['scene']}")
+    return lines
+
+
+def _parse_layer_arg(text):
+    op, _, rest = text.partition(':')
+    path, _, priority = rest.partition('@')
+    return op, path, int(priority or 0)
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2:
+        print("Usage: python3 story-geometry/compose.py <out.json> <op>:<map.json>[@priority] ...")
+        print(f"  ops: {', '.join(OPERATIONS)}")
+        print("\nExample:")
+        print("  python3 story-geometry/compose.py /tmp/scene.json union:story-geometry/river-meandered.json "
+              "union:story-geometry/ruins-complete.json@1")
+        sys.exit(1)
+
+    out_path, header, layers = args[0], None, []
+    for text in args[1:]:
+        op, path, priority = _parse_layer_arg(text)
+        try:
+            data, grid = load_map(path)
+            layers.append(layer(path, grid, op, priority))
+        except (OSError, ValueError) as error:
+            print(f"❌ {text}: {error}")
+            sys.exit(1)
+        if header is None:
+            header = {k: v for k, v in data.items() if k not in WHOLE_MAP_KEYS}
+
+    scene, report = compose(layers)
+    print(f"✓ Composed {len(layers)} layers: {len(scene)} voxels")
+    print('\n'.join(format_report(report)))
+    save_map(header, scene, out_path)
+    print(f"  wrote {out_path}")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Compact cutscene action vocabulary and a lossless two-way compiler.
+
+Three compact forms sit alongside the existing move/wait/comment actions;
+each expands to exactly the single actions (one per tick) it replaces:
+
+    {"type": "path", "points": ["1,1,0", "12,1,0", "13,1,1"]}
+        The first point is one move. Each following point is reached in
+        single-cell steps from the previous one: every axis steps by +-1
+        until it reaches the point (diagonal first, then straight). Points
+        use the runtime's "x,y,z" key format so indent=2 JSON stays one
+        line per point.
+
+    {"type": "wait", "count": 4}            (any other keys, e.g. duration,
+        4 x {"type": "wait"}                 are copied to every wait)
+
+    {"type": "repeat", "times": 3, "actions": [...]}
+        the (compact) actions, three times over
+
+index.html expands these lazily in consumeNextActions(); cutscene_sim.py
+uses expand() below. compile_actions() only folds moves of the plain
+{"type": "move", "to": {"x", "y", "z"}} shape with integer coordinates,
+so expand(compile_actions(q)) == q for any queue.
+
+Usage:
+    python3 story-geometry/cutscene_actions.py compact test-maps/cutscene-act-1-2-3.json
+    python3 story-geometry/cutscene_actions.py expand test-maps/cutscene-act-1-2-3.json
+    python3 story-geometry/cutscene_actions.py check test-maps/cutscene-*.json
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from asset_store import write_json
+
+MAX_REPEAT_BLOCK = 8
+
+
+# ----------------------------------------------------------------------
+# Expansion
+# ----------------------------------------------------------------------
+
+def parse_point(text):
+    x, y, z = (int(v) for v in text.split(','))
+    return x, y, z
+
+
+def format_point(point):
+    return f"{point[0]},{point[1]},{point[2]}"
+
+
+def _sign(v):
+    return (v > 0) - (v < 0)
+
+
+def interpolate(start, end):
+    """Cells stepped through from start (excluded) to end (included)."""
+    d = [end[i] - start[i] for i in range(3)]
+    steps = max(abs(v) for v in d)
+    return [tuple(start[a] + _sign(d[a]) * min(i, abs(d[a])) for a in range(3))
+            for i in range(1, steps + 1)]
+
+
+def _move(cell):
+    return {'type': 'move', 'to': {'x': cell[0], 'y': cell[1], 'z': cell[2]}}
+
+
+def expand(actions):
+    """Yield single actions (one per tick) from a compact queue, lazily."""
+    for action in actions:
+        kind = action.get('type')
+        if kind == 'path':
+            previous = None
+            for text in action['points']:
+                point = parse_point(text)
+                if previous is None:
+                    yield _move(point)
+                else:
+                    for cell in interpolate(previous, point):
+                        yield _move(cell)
+                previous = point
+        elif kind == 'wait' and 'count' in action:
+            single = {k: v for k, v in action.items() if k != 'count'}
+            for _ in range(action['count']):
+                yield dict(single)
+        elif kind == 'repeat':
+            for _ in range(action['times']):
+                yield from expand(action['actions'])
+        else:
+            yield action
+
+
+def expanded_length(actions):
+    """Tick count of a compact queue without materializing it."""
+    total = 0
+    for action in actions:
+        kind = action.get('type')
+        if kind == 'path':
+            cells = [parse_point(p) for p in action['points']]
+            total += 1 + sum(max(abs(b[i] - a[i]) for i in range(3)) for a, b in zip(cells, cells[1:]))
+        elif kind == 'wait' and 'count' in action:
+            total += action['count']
+        elif kind == 'repeat':
+            total += action['times'] * expanded_length(action['actions'])
+        else:
+            total += 1
+    return total
+
+
+# ----------------------------------------------------------------------
+# Compilation
+# ----------------------------------------------------------------------
+
+def _plain_cell(action):
+    """(x, y, z) if action is a plain integer move, else None."""
+    if action.get('type') != 'move' or set(action) != {'type', 'to'}:
+        return None
+    to = action['to']
+    if not isinstance(to, dict) or list(to) != ['x', 'y', 'z']:
+        return None
+    if not all(type(to[k]) is int for k in ('x', 'y', 'z')):
+        return None
+    return to['x'], to['y'], to['z']
+
+
+class _PathBuilder:
+    """
+    Greedy path compaction in O(1) per move. A segment from anchor A
+    reproduces interpolate(A, B) exactly when every axis moves by the
+    same +-1 on each step from the start until it stops, and never
+    restarts; the longest axis then moves on every step.
+    """
+
+    def __init__(self, cell):
+        self.points = [cell]
+        self.moves = 1
+        self._restart(cell)
+
+    def _restart(self, anchor):
+        self.last = anchor
+        self.steps = 0
+        self.signs = [0, 0, 0]
+        self.moving = [True, True, True]
+
+    def _extends(self, cell):
+        delta = [cell[a] - self.last[a] for a in range(3)]
+        if not any(delta) or any(abs(v) > 1 for v in delta):
+            return False
+        for a in range(3):
+            if delta[a] and (not self.moving[a] or self.signs[a] not in (0, delta[a])):
+                return False
+        return True
+
+    def add(self, cell):
+        """Absorb one more move. False if it cannot continue this path."""
+        if not self._extends(cell):
+            if self.steps == 0:
+                return False
+            # Close the segment at the last cell and try a new one from there
+            self.points.append(self.last)
+            self._restart(self.last)
+            if not self._extends(cell):
+                return False
+        for a in range(3):
+            delta = cell[a] - self.last[a]
+            if delta:
+                self.signs[a] = delta
+            else:
+                self.moving[a] = False
+        self.last = cell
+        self.steps += 1
+        self.moves += 1
+        return True
+
+    def finish(self):
+        if self.steps:
+            self.points.append(self.last)
+        return {'type': 'path', 'points': [format_point(p) for p in self.points]}
+
+
+def _fold_moves_and_waits(actions):
+    out = []
+    path = None
+    first_move = None
+
+    def close_path():
+        nonlocal path, first_move
+        if path is not None:
+            out.append(path.finish() if path.moves > 1 else first_move)
+        path = None
+        first_move = None
+
+    for action in actions:
+        cell = _plain_cell(action)
+        if cell is not None:
+            if path is None or not path.add(cell):
+                close_path()
+                path = _PathBuilder(cell)
+                first_move = action
+            continue
+        close_path()
+
+        if action.get('type') == 'wait' and 'count' not in action:
+            previous = out[-1] if out else None
+            if previous is not None and previous.get('type') == 'wait':
+                base = {k: v for k, v in previous.items() if k != 'count'}
+                if base == action:
+                    out[-1] = dict(base, count=previous.get('count', 1) + 1)
+                    continue
+        out.append(action)
+    close_path()
+    return out
+
+
+def _fold_repeats(items):
+    out = []
+    i = 0
+    n = len(items)
+    while i < n:
+        best_len, best_times, best_saving = 1, 1, 0
+        for length in range(1, min(MAX_REPEAT_BLOCK, (n - i) // 2) + 1):
+            block = items[i:i + length]
+            times = 1
+            while items[i + times * length:i + (times + 1) * length] == block:
+                times += 1
+            # A repeat costs one entry on top of its block
+            saving = length * times - (length + 1)
+            if saving > best_saving:
+                best_len, best_times, best_saving = length, times, saving
+        if best_saving > 0:
+            out.append({'type': 'repeat', 'times': best_times, 'actions': items[i:i + best_len]})
+            i += best_len * best_times
+        else:
+            out.append(items[i])
+            i += 1
+    return out
+
+
+def compile_actions(actions):
+    """Compact an expanded queue. Lossless: list(expand(result)) == actions."""
+    return _fold_repeats(_fold_moves_and_waits(list(actions)))
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def _characters(data):
+    return (data.get('characterGroup') or {}).get('characters', [])
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('compact', 'expand', 'check'):
+        print("Usage: python3 story-geometry/cutscene_actions.py <compact|expand|check> <files>")
+        print("\nExample:")
+        print("  python3 story-geometry/cutscene_actions.py compact test-maps/cutscene-act-1-2-3.json")
+        print("  python3 story-geometry/cutscene_actions.py check test-maps/cutscene-*.json")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    all_ok = True
+
+    for filepath in sys.argv[2:]:
+        path = Path(filepath)
+        if not path.exists():
+            print(f"❌ {filepath}: File not found")
+            all_ok = False
+            continue
+        with open(path, 'r') as f:
+            data = json.load(f)
+        characters = _characters(data)
+        if not characters:
+            print(f"- {filepath}: no characterGroup")
+            continue
+
+        if command == 'check':
+            for character in characters:
+                queue = list(expand(character.get('actionQueue', [])))
+                if list(expand(compile_actions(queue))) != queue:
+                    print(f"❌ {filepath}: {character.get('id')} does not round-trip")
+                    all_ok = False
+                    break
+            else:
+                print(f"✓ {filepath}: round-trips")
+            continue
+
+        before = path.stat().st_size
+        entries_before = sum(len(c.get('actionQueue', [])) for c in characters)
+        for character in characters:
+            queue = list(expand(character.get('actionQueue', [])))
+            character['actionQueue'] = compile_actions(queue) if command == 'compact' else queue
+        entries_after = sum(len(c['actionQueue']) for c in characters)
+        write_json(path, data)
+        after = path.stat().st_size
+        print(f"✓ {filepath}: {entries_before} → {entries_after} actions, {before} → {after} bytes")
+
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
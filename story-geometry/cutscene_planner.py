@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Cooperative path planner for cutscenes: give each character a goal and get
+back collision-free actionQueues for its characterGroup.
+
+Characters are planned one at a time with space-time A* over the map's
+navgraph (walk, climb and fall edges). Every planned step is written into a
+reservation table, and later characters plan around it, so two characters
+never target the same cell in the same tick.
+
+The reservation rule follows index.html's CharacterCollisionStrategy, where
+a move is blocked if its target is another character's current position or
+another character's target this tick. Cells are therefore reserved one tick
+on either side: a character at cell C at tick t keeps everyone else out of
+C at ticks t-1, t and t+1. This also means nobody steps into a cell that is
+being vacated in the same tick, just as the runtime blocks it.
+
+Characters stay on their goal once they arrive. Every character holds its
+start cell at tick 0. Characters without a goal stand still at
+startPosition as obstacles, so their actionQueue is emptied. A character
+whose start is not a standing position (e.g. inside a voxel) first steps
+to the nearest one in its column. If a character cannot be planned, it
+moves to the front of the order and planning restarts (at most once per
+character).
+
+The output uses one action per tick: a move to the next node (falls target
+the landing cell directly) or {"type": "wait", "duration": 500}, so a wait
+takes as long as a move. The queue is stored compacted by cutscene_actions.
+The result is replayed in cutscene_sim.py as a check. Without --out the map is
+only rewritten when the check passes.
+
+Usage:
+    python3 story-geometry/cutscene_planner.py test-maps/cutscene-act-1-2-3.json \\
+        character-01-scholar=23,3,0 character-02-artist=22,3,1 --out planned.json
+"""
+
+import heapq
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from asset_store import write_json
+from cutscene_actions import compile_actions
+from cutscene_sim import CutsceneSimulator, MOVE_MS
+from navgraph import NavGraph
+
+DEFAULT_MAX_EXPANSIONS = 500000
+UNREACHABLE = np.iinfo(np.int32).max
+
+
+class PlanningError(Exception):
+    pass
+
+
+# ----------------------------------------------------------------------
+# Reservation table
+# ----------------------------------------------------------------------
+
+class ReservationTable:
+    """(node, tick) occupancy plus nodes held from a tick onwards."""
+
+    def __init__(self):
+        self.cells = set()
+        self.last_tick = {}
+        self.parked = {}  # node -> first tick it is held forever
+        self.horizon = 0  # after this tick nothing changes any more
+
+    def reserve_path(self, nodes):
+        for t, node in enumerate(nodes):
+            if node is None:
+                continue
+            self.cells.add((node, t))
+            if t > self.last_tick.get(node, -1):
+                self.last_tick[node] = t
+        self.park(nodes[-1], len(nodes) - 1)
+        self.horizon = max(self.horizon, len(nodes))
+
+    def park(self, node, tick):
+        self.parked[node] = min(tick, self.parked.get(node, tick))
+        self.horizon = max(self.horizon, tick + 1)
+
+    def blocked(self, node, t):
+        cells = self.cells
+        if (node, t) in cells or (node, t - 1) in cells or (node, t + 1) in cells:
+            return True
+        parked = self.parked.get(node)
+        return parked is not None and t >= parked - 1
+
+    def can_stay(self, node, t):
+        """Can a character arrive at node at tick t and stay forever?"""
+        return node not in self.parked and self.last_tick.get(node, -2) < t - 1
+
+
+# ----------------------------------------------------------------------
+# Planner
+# ----------------------------------------------------------------------
+
+class CooperativePlanner:
+    """Prioritized space-time A* over a NavGraph."""
+
+    def __init__(self, graph, max_expansions=DEFAULT_MAX_EXPANSIONS):
+        self.graph = graph
+        self.max_expansions = max_expansions
+        # Reverse CSR for goal distance fields
+        n = len(graph)
+        sources = np.repeat(np.arange(n, dtype=np.int32), np.diff(graph.offsets))
+        order = np.argsort(graph.targets, kind='stable')
+        self._rev_sources = sources[order]
+        self._rev_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(graph.targets, minlength=n), out=self._rev_offsets[1:])
+        self._adjacency = [graph.targets[graph.offsets[i]:graph.offsets[i + 1]].tolist()
+                           for i in range(n)]
+        self._heuristics = {}
+
+    def distances_to(self, goal):
+        """Fewest steps from every node to goal, ignoring other characters."""
+        dist = np.full(len(self.graph), UNREACHABLE, dtype=np.int32)
+        dist[goal] = 0
+        frontier = np.array([goal], dtype=np.int64)
+        step = 0
+        offsets, sources = self._rev_offsets, self._rev_sources
+        while len(frontier):
+            step += 1
+            starts, ends = offsets[frontier], offsets[frontier + 1]
+            counts = ends - starts
+            if counts.sum() == 0:
+                break
+            # Concatenate the reverse-edge ranges of the whole frontier
+            index = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            candidates = np.unique(sources[index])
+            candidates = candidates[dist[candidates] == UNREACHABLE]
+            dist[candidates] = step
+            frontier = candidates.astype(np.int64)
+        return dist
+
+    def _heuristic(self, goal):
+        """distances_to(goal) as a list, cached across restarts."""
+        h = self._heuristics.get(goal)
+        if h is None:
+            h = self._heuristics[goal] = self.distances_to(goal).tolist()
+        return h
+
+    def plan_one(self, start, goal, reservations, max_ticks, start_tick=0):
+        """
+        Node per tick from start to goal, or None. With start_tick 1 the
+        character only reaches start at tick 1 (path[0] is None).
+        """
+        h = self._heuristic(goal)
+        if h[start] == UNREACHABLE or (start_tick and reservations.blocked(start, start_tick)):
+            return None
+        adjacency = self._adjacency
+        # Past the last reservation the table is static: clamp state times
+        # there so waiting around cannot grow the search without bound
+        settled = reservations.horizon + 2
+        open_heap = [(h[start], -start_tick, start)]
+        previous = {(start, min(start_tick, settled)): None}
+        expansions = 0
+        while open_heap:
+            _, negative_t, node = heapq.heappop(open_heap)
+            t = -negative_t
+            if node == goal and reservations.can_stay(goal, t):
+                steps = []
+                state = (node, min(t, settled))
+                while state is not None:
+                    steps.append(state[0])
+                    state = previous[state]
+                return [None] * start_tick + steps[::-1]
+            if t >= max_ticks:
+                continue
+            expansions += 1
+            if expansions > self.max_expansions:
+                break
+            nt = t + 1
+            state, key_t = (node, min(t, settled)), min(nt, settled)
+            for nxt in adjacency[node] + [node]:
+                hn = h[nxt]
+                if hn == UNREACHABLE or (nxt, key_t) in previous or reservations.blocked(nxt, nt):
+                    continue
+                previous[(nxt, key_t)] = state
+                # Ties on f go to the deeper state
+                heapq.heappush(open_heap, (nt + hn, -nt, nxt))
+        return None
+
+    def plan(self, starts, goals, obstacles=(), max_ticks=None, start_ticks=None):
+        """
+        starts/goals: {id: node}. obstacles: nodes held by characters that
+        do not move. start_ticks: {id: 1} for characters that first have to
+        step onto their start node. Returns {id: [node per tick]}; raises
+        PlanningError when some character cannot be planned.
+        """
+        start_ticks = start_ticks or {}
+        # Longest trips first: they are the hardest to fit in later
+        distance = {cid: self._heuristic(goals[cid])[starts[cid]] for cid in goals}
+        order = sorted(goals, key=lambda cid: -distance[cid])
+        if len(set(goals.values())) != len(goals):
+            raise PlanningError("Two characters share a goal")
+        restarts = 0
+        while True:
+            reservations = ReservationTable()
+            for node in obstacles:
+                reservations.park(node, 0)
+            # Everyone is on their start cell at tick 0, planned or not
+            reservations.cells.update((starts[cid], 0) for cid in order if not start_ticks.get(cid))
+            plans = {}
+            failed = None
+            limit = max_ticks or 4 * len(self.graph)
+            for cid in order:
+                reservations.cells.discard((starts[cid], 0))
+                path = self.plan_one(starts[cid], goals[cid], reservations, limit,
+                                     start_ticks.get(cid, 0))
+                if path is None:
+                    failed = cid
+                    break
+                plans[cid] = path
+                reservations.reserve_path(path)
+            if failed is None:
+                return {cid: plans[cid] for cid in goals}
+            if restarts >= len(order) or order[0] == failed:
+                raise PlanningError(f"No collision-free path for {failed}")
+            restarts += 1
+            order.remove(failed)
+            order.insert(0, failed)
+
+    def to_actions(self, path):
+        """Compact actionQueue for a node-per-tick path."""
+        actions = []
+        for before, after in zip(path, path[1:]):
+            if before is not None and before == after:
+                actions.append({'type': 'wait', 'duration': MOVE_MS})
+            else:
+                x, y, z = self.graph.position(after)
+                actions.append({'type': 'move', 'to': {'x': x, 'y': y, 'z': z}})
+        return compile_actions(actions)
+
+
+# ----------------------------------------------------------------------
+# Map-level helper
+# ----------------------------------------------------------------------
+
+def plan_cutscene(data, goals, graph=None, max_ticks=None):
+    """
+    Fill data['characterGroup'] actionQueues for {character id: (x, y, z)}.
+    Returns {character id: ticks to arrive}.
+    """
+    if graph is None:
+        graph = NavGraph.from_map(data)
+    characters = (data.get('characterGroup') or {}).get('characters', [])
+    by_id = {c['id']: c for c in characters}
+
+    def node_for(position, what):
+        node = graph.node_id(*position)
+        if node is None:
+            raise PlanningError(f"{what} {position} is not a standing position")
+        return node
+
+    def column_node(position):
+        """Nearest standing position in the start's column (starts inside voxels)."""
+        x, y, z = position
+        found = np.flatnonzero((graph.x == x) & (graph.z == z))
+        if len(found) == 0:
+            raise PlanningError(f"No standing position in the column of {position}")
+        return int(found[np.argmin(np.abs(graph.y[found] - y))])
+
+    starts, goal_nodes, start_ticks, obstacles = {}, {}, {}, []
+    for cid in goals:
+        if cid not in by_id:
+            raise PlanningError(f"Unknown character {cid}")
+    for character in characters:
+        start = character['startPosition']
+        position = (int(start['x']), int(start['y']), int(start['z']))
+        if character['id'] in goals:
+            node = graph.node_id(*position)
+            if node is None:
+                node = column_node(position)
+                start_ticks[character['id']] = 1
+            starts[character['id']] = node
+            goal_nodes[character['id']] = node_for(tuple(goals[character['id']]),
+                                                   f"{character['id']} goal")
+        else:
+            character['actionQueue'] = []
+            node = graph.node_id(*position)
+            if node is not None:
+                obstacles.append(node)
+
+    planner = CooperativePlanner(graph)
+    plans = planner.plan(starts, goal_nodes, obstacles, max_ticks, start_ticks)
+    for cid, path in plans.items():
+        by_id[cid]['actionQueue'] = planner.to_actions(path)
+    return {cid: len(path) - 1 for cid, path in plans.items()}
+
+
+def _parse_goal(text):
+    cid, _, position = text.rpartition('=')
+    x, y, z = (int(v) for v in position.split(','))
+    return cid, (x, y, z)
+
+
+def main():
+    args = sys.argv[1:]
+    out_path = None
+    max_ticks = None
+    if '--out' in args:
+        i = args.index('--out')
+        out_path = args[i + 1]
+        del args[i:i + 2]
+    if '--max-ticks' in args:
+        i = args.index('--max-ticks')
+        max_ticks = int(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) < 2:
+        print("Usage: python3 story-geometry/cutscene_planner.py <map.json> <id=x,y,z>... "
+              "[--out out.json] [--max-ticks N]")
+        print("\nExample:")
+        print("  python3 story-geometry/cutscene_planner.py test-maps/cutscene-act-1-2-3.json \\")
+        print("      character-01-scholar=23,3,0 character-02-artist=22,3,1 --out planned.json")
+        sys.exit(1)
+
+    map_path = Path(args[0])
+    if not map_path.exists():
+        print(f"❌ {map_path}: File not found")
+        sys.exit(1)
+    with open(map_path, 'r') as f:
+        data = json.load(f)
+
+    start = time.perf_counter()
+    try:
+        goals = dict(_parse_goal(a) for a in args[1:])
+        ticks = plan_cutscene(data, goals, max_ticks=max_ticks)
+    except (PlanningError, ValueError) as e:
+        print(f"❌ {map_path}: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    report = CutsceneSimulator(data).run()
+    ok = not report['blocked'] and all(
+        tuple(report['finalPositions'][cid][k] for k in ('x', 'y', 'z')) == goals[cid]
+        for cid in goals)
+    print(f"{'✓' if ok else '❌'} {map_path}: planned {len(goals)} characters in {elapsed * 1000:.0f}ms - "
+          f"longest {max(ticks.values(), default=0)} ticks, "
+          f"{len(report['blocked'])} blocked in simulation")
+
+    if not ok and out_path is None:
+        # Never replace the source map with plans that fail their own check
+        print(f"  {map_path} not written (pass --out to keep the failed plan)")
+        sys.exit(1)
+    target = Path(out_path) if out_path else map_path
+    write_json(target, data)
+    print(f"  wrote {target}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
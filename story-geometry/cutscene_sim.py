@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Headless cutscene simulator: plays every character's actionQueue through a
+copy of index.html's MovementPipeline, in lockstep ticks, without a browser.
+
+One tick is one consumeNextActions() call: each character (in map order)
+shifts one action (compact path/wait/repeat entries are expanded lazily by
+cutscene_actions.expand). The pipeline is reproduced strategy by strategy:
+
+    validators      CharacterCollisionStrategy, TerrainConstraintStrategy
+    transformers    AutoClimbStrategy
+    postProcessors  GravityStrategy (lands on the heightmap's supportBelow,
+                    terrain only)
+
+and so are its quirks: a character moving into a cell another character
+occupies - or that an earlier character claimed this tick - is blocked;
+positions only update once every action of the tick has been issued;
+'comment' and other unknown actions consume a tick without animating; a
+blocked move waits 100 ms. Because TerrainConstraintStrategy rejects
+solid targets before the transformers run, AutoClimbStrategy never fires
+for cutscene moves (the player's handleMovement is what auto-climbs).
+
+Simulated time follows the runtime: 1000 ms before the first tick, then
+each tick lasts as long as its longest animation (move 500 ms, wait
+`duration || 1000`, blocked 100 ms) plus cutsceneActionDelay (750 ms).
+
+Usage:
+    python3 story-geometry/cutscene_sim.py test-maps/cutscene-act-1-2-3.json
+    python3 story-geometry/cutscene_sim.py test-maps/cutscene-*.json --strict
+    python3 story-geometry/cutscene_sim.py test-maps/cutscene-*.json --verbose --json report.json
+"""
+
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+from cutscene_actions import expand
+from heightmap import ColumnIndex
+from profiling import stage
+from voxel_grid import VoxelGrid, voxel_arrays
+
+MOVE_MS = 500
+BLOCKED_WAIT_MS = 100
+DEFAULT_WAIT_MS = 1000
+ACTION_DELAY_MS = 750   # game.cutsceneActionDelay
+START_DELAY_MS = 1000   # loadTestMap -> first consumeNextActions()
+
+
+def _cell(pos):
+    return (math.floor(pos['x']), math.floor(pos['y']), math.floor(pos['z']))
+
+
+class Character:
+    def __init__(self, data):
+        self.id = data.get('id')
+        self.name = data.get('name', self.id)
+        self.position = dict(data['startPosition'])
+        # Compact path/wait/repeat entries expand lazily, one action per tick
+        self.actions = expand(data.get('actionQueue', []))
+        self.next_action = next(self.actions, None)
+        self.current_animation = None  # {'type': 'move'|'wait', 'targetPos', 'duration'}
+
+    def has_actions(self):
+        return self.next_action is not None
+
+    def take_action(self):
+        action = self.next_action
+        self.next_action = next(self.actions, None)
+        return action
+
+
+# ----------------------------------------------------------------------
+# Movement strategies (mirror index.html)
+# ----------------------------------------------------------------------
+
+class MovementStrategy:
+    def can_execute(self, world, character, target):
+        return True
+
+    def transform(self, world, character, target):
+        return {'type': 'move', 'to': target}
+
+    def post_process(self, world, character, final_pos):
+        pass
+
+
+class CharacterCollisionStrategy(MovementStrategy):
+    def can_execute(self, world, character, target):
+        cell = _cell(target)
+        for other in world.characters:
+            if other.id == character.id:
+                continue
+            if _cell(other.position) == cell:
+                return False
+            anim = other.current_animation
+            if anim and anim['type'] == 'move' and anim.get('targetPos') and _cell(anim['targetPos']) == cell:
+                return False
+        return True
+
+
+class TerrainConstraintStrategy(MovementStrategy):
+    def can_execute(self, world, character, target):
+        return _cell(target) not in world.terrain
+
+
+class AutoClimbStrategy(MovementStrategy):
+    def can_execute(self, world, character, target):
+        return _cell(target) in world.terrain
+
+    def transform(self, world, character, target):
+        world.event('climb', character, at=dict(target))
+        return {'type': 'move', 'to': {'x': target['x'], 'y': target['y'] + 1, 'z': target['z']},
+                'visualEffect': 'auto-climb'}
+
+
+class GravityStrategy(MovementStrategy):
+    def post_process(self, world, character, final_pos):
+        x, y, z = _cell(final_pos)
+        # Highest surface below, at any height (riverbeds sit below y=0)
+        ground_y = world.columns.support_below(x, y, z)
+        fall_distance = 0 if ground_y is None else y - (ground_y + 1)
+        if fall_distance > 0:
+            fall_target = {'x': final_pos['x'], 'y': final_pos['y'] - fall_distance, 'z': final_pos['z']}
+            world.event('fall', character, start=dict(final_pos), to=dict(fall_target),
+                        distance=fall_distance)
+            character.position = fall_target
+
+
+class MovementPipeline:
+    def __init__(self):
+        self.validators = [CharacterCollisionStrategy(), TerrainConstraintStrategy()]
+        self.transformers = [AutoClimbStrategy()]
+        self.post_processors = [GravityStrategy()]
+
+    def process_movement(self, world, character, target):
+        """Transformed action, or None if a validator blocked the move."""
+        for validator in self.validators:
+            if not validator.can_execute(world, character, target):
+                world.event('blocked', character, target=dict(target),
+                            by=type(validator).__name__)
+                return None
+        final_action = {'type': 'move', 'to': target}
+        for transformer in self.transformers:
+            if transformer.can_execute(world, character, target):
+                final_action = transformer.transform(world, character, target)
+                break
+        return final_action
+
+
+# ----------------------------------------------------------------------
+# Simulation
+# ----------------------------------------------------------------------
+
+class CutsceneSimulator:
+    """Runs a map's characterGroup to completion."""
+
+    def __init__(self, data, pipeline=None):
+        xs, ys, zs, colors = voxel_arrays(data.get('voxels', []))
+        self.terrain = set(zip(xs.tolist(), ys.tolist(), zs.tolist()))
+        self.columns = ColumnIndex.from_grid(VoxelGrid.from_arrays(xs, ys, zs, colors))
+        group = data.get('characterGroup') or {}
+        self.characters = [Character(c) for c in group.get('characters', [])]
+        self.pipeline = pipeline or MovementPipeline()
+        self.events = []
+        self.tick = 0
+        self.time_ms = START_DELAY_MS
+
+    def event(self, kind, character, **details):
+        self.events.append({'tick': self.tick, 'type': kind, 'character': character.id, **details})
+
+    def step(self):
+        """One consumeNextActions() + its animations. False when all queues are empty."""
+        issued = [c for c in self.characters if c.has_actions()]
+        if not issued:
+            return False
+        self.tick += 1
+
+        # [1] Issue one action per character, in order (sees earlier claims)
+        moves = []
+        for character in issued:
+            action = character.take_action()
+            kind = action.get('type')
+            if kind == 'move':
+                processed = self.pipeline.process_movement(self, character, action['to'])
+                if processed is None:
+                    character.current_animation = {'type': 'wait', 'duration': BLOCKED_WAIT_MS}
+                else:
+                    character.current_animation = {'type': 'move', 'targetPos': processed['to'],
+                                                    'duration': MOVE_MS}
+                    moves.append(character)
+            elif kind == 'wait':
+                character.current_animation = {'type': 'wait',
+                                               'duration': action.get('duration') or DEFAULT_WAIT_MS}
+
+        # [2] Animations complete: positions land on their targets
+        longest = max((c.current_animation['duration'] for c in self.characters
+                       if c.current_animation), default=0)
+        for character in moves:
+            character.position = dict(character.current_animation['targetPos'])
+        for character in self.characters:
+            character.current_animation = None
+
+        # [3] Gravity post-processing (setTimeout 525 ms, in issue order)
+        for character in moves:
+            for processor in self.pipeline.post_processors:
+                processor.post_process(self, character, character.position)
+
+        self.time_ms += longest + ACTION_DELAY_MS
+        return True
+
+    def run(self, max_ticks=100000):
+        with stage('simulate'):
+            while self.tick < max_ticks and self.step():
+                pass
+        return self.report()
+
+    def report(self):
+        def count(kind):
+            return sum(1 for e in self.events if e['type'] == kind)
+        return {
+            'ticks': self.tick,
+            'simulatedMs': self.time_ms,
+            'blocked': [e for e in self.events if e['type'] == 'blocked'],
+            'falls': [e for e in self.events if e['type'] == 'fall'],
+            'climbs': count('climb'),
+            'finalPositions': {c.id: c.position for c in self.characters},
+        }
+
+
+def simulate_file(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return CutsceneSimulator(data).run()
+
+
+def _fmt(pos):
+    return f"({pos['x']}, {pos['y']}, {pos['z']})"
+
+
+def main():
+    args = sys.argv[1:]
+    strict = '--strict' in args
+    verbose = '--verbose' in args
+    json_path = None
+    if '--json' in args:
+        i = args.index('--json')
+        json_path = args[i + 1]
+        del args[i:i + 2]
+    files = [a for a in args if not a.startswith('--')]
+
+    if not files:
+        print("Usage: python3 story-geometry/cutscene_sim.py <map.json>... [--strict] [--verbose] [--json out.json]")
+        print("\nExample:")
+        print("  python3 story-geometry/cutscene_sim.py test-maps/cutscene-act-1-2-3.json")
+        print("  python3 story-geometry/cutscene_sim.py test-maps/cutscene-*.json --strict")
+        sys.exit(1)
+
+    all_ok = True
+    reports = {}
+    for filepath in files:
+        if not Path(filepath).exists():
+            print(f"❌ {filepath}: File not found")
+            all_ok = False
+            continue
+        start = time.perf_counter()
+        report = simulate_file(filepath)
+        elapsed = time.perf_counter() - start
+        reports[filepath] = report
+
+        blocked, falls = report['blocked'], report['falls']
+        ok = not (strict and blocked)
+        all_ok &= ok
+        rate = report['ticks'] / elapsed if elapsed > 0 else float('inf')
+        print(f"{'✓' if ok else '❌'} {filepath}: {report['ticks']} ticks "
+              f"({report['simulatedMs'] / 1000:.1f}s of playback) in {elapsed * 1000:.1f}ms "
+              f"[{rate:,.0f} ticks/s] - {len(blocked)} blocked, {len(falls)} falls")
+        if verbose or not ok:
+            for e in blocked:
+                print(f"   tick {e['tick']}: {e['character']} blocked at {_fmt(e['target'])} by {e['by']}")
+        if verbose:
+            for e in falls:
+                print(f"   tick {e['tick']}: {e['character']} fell {e['distance']} from {_fmt(e['start'])}")
+            for cid, pos in report['finalPositions'].items():
+                print(f"   final {cid}: {_fmt(pos)}")
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,33 @@
-import json
+from voxel_grid import VoxelGrid, load_map, save_map
 
 # Read current bridge data
-with open('story-geometry/bridge-over-forest-floor.json', 'r') as f:
-    bridge_data = json.load(f)
+bridge_data, bridge_grid = load_map('story-geometry/bridge-over-forest-floor.json')
 
 # Extract just the bridge structure (not river)
-bridge_voxels = [v for v in bridge_data['voxels'] 
-                 if v['color'] == 11184810 or (v['color'] == 9127187 and v['y'] >= 1)]
+bridge_voxels = bridge_grid.select(
+    (bridge_grid.color == 11184810) |
+    ((bridge_grid.color == 9127187) & (bridge_grid.y >= 1))
+)
 
 print(f"Current bridge: {len(bridge_voxels)} voxels")
 
 # Build developed bridge matching design intent
-developed_bridge = []
+developed_bridge = VoxelGrid()
 
 # === COBBLESTONE SUPPORTS (enhanced at both ends) ===
 # West support (X=0)
 for z in [-1, 0, 1]:
-    developed_bridge.append({'x': 0, 'y': 0, 'z': z, 'color': 11184810})
-    developed_bridge.append({'x': 0, 'y': 1, 'z': z, 'color': 11184810})
+    developed_bridge.add(0, 0, z, 11184810)
+    developed_bridge.add(0, 1, z, 11184810)
     if z == 0:  # Center support pillar taller
-        developed_bridge.append({'x': 0, 'y': 2, 'z': z, 'color': 11184810})
+        developed_bridge.add(0, 2, z, 11184810)
 
 # East support (X=11)  
 for z in [-1, 0, 1]:
-    developed_bridge.append({'x': 11, 'y': 0, 'z': z, 'color': 11184810})
-    developed_bridge.append({'x': 11, 'y': 1, 'z': z, 'color': 11184810})
+    developed_bridge.add(11, 0, z, 11184810)
+    developed_bridge.add(11, 1, z, 11184810)
     if z == 0:  # Center support pillar taller
-        developed_bridge.append({'x': 11, 'y': 2, 'z': z, 'color': 11184810})
+        developed_bridge.add(11, 2, z, 11184810)
 
 # === WOODEN PLANK WALKWAY (individual planks with dip) ===
 # Bridge spans X: 1-10
@@ -41,12 +42,12 @@ for x in range(1, 11):
         y = 4  # Highest (near supports)
     
     # Main plank (centerline)
-    developed_bridge.append({'x': x, 'y': y, 'z': 0, 'color': 9127187})
+    developed_bridge.add(x, y, 0, 9127187)
     
     # Side planks (make walkway wider - 3 planks wide)
     if x % 2 == 0:  # Alternating pattern for visual interest
-        developed_bridge.append({'x': x, 'y': y, 'z': -1, 'color': 9127187})
-        developed_bridge.append({'x': x, 'y': y, 'z': 1, 'color': 9127187})
+        developed_bridge.add(x, y, -1, 9127187)
+        developed_bridge.add(x, y, 1, 9127187)
 
 # === VISIBLE ROPE RAILINGS (thin voxel lines along sides) ===
 # North railing (Z = -1.5, approximate with voxels at Z=-2)
@@ -60,9 +61,9 @@ for x in range(1, 11, 2):  # Every other position (rope segments)
         y = 4
     
     # Railing at walkway height
-    developed_bridge.append({'x': x, 'y': y, 'z': -2, 'color': 9127187})
+    developed_bridge.add(x, y, -2, 9127187)
     # Upper rope line
-    developed_bridge.append({'x': x, 'y': y + 1, 'z': -2, 'color': 9127187})
+    developed_bridge.add(x, y + 1, -2, 9127187)
 
 # South railing (Z = +2)
 for x in range(1, 11, 2):
@@ -74,8 +75,8 @@ for x in range(1, 11, 2):
     else:
         y = 4
     
-    developed_bridge.append({'x': x, 'y': y, 'z': 2, 'color': 9127187})
-    developed_bridge.append({'x': x, 'y': y + 1, 'z': 2, 'color': 9127187})
+    developed_bridge.add(x, y, 2, 9127187)
+    developed_bridge.add(x, y + 1, 2, 9127187)
 
 # === TORCHES (light sources along bridge) ===
 # Torch color: bright yellow/orange (16776960 = yellow, or 16744192 = orange)
@@ -93,9 +94,9 @@ torch_positions = [
 
 for x, y, z in torch_positions:
     # Torch base (wooden post)
-    developed_bridge.append({'x': x, 'y': y, 'z': z, 'color': 9127187})
+    developed_bridge.add(x, y, z, 9127187)
     # Torch flame
-    developed_bridge.append({'x': x, 'y': y + 1, 'z': z, 'color': torch_color})
+    developed_bridge.add(x, y + 1, z, torch_color)
 
 # === STRUCTURAL SUPPORTS (visible from below) ===
 # Cross-bracing beneath bridge at key points
@@ -111,7 +112,7 @@ for x in support_x_positions:
     
     # Vertical support beam
     if y > 1:
-        developed_bridge.append({'x': x, 'y': y - 1, 'z': 0, 'color': 9127187})
+        developed_bridge.add(x, y - 1, 0, 9127187)
 
 print(f"\nDeveloped bridge: {len(developed_bridge)} voxels")
 print(f"  Cobblestone supports: ~12")
@@ -121,7 +122,6 @@ print(f"  Torches: ~{len(torch_positions) * 2}")
 print(f"  Structural supports: ~{len(support_x_positions)}")
 
 # Update bridge data
-bridge_data['voxels'] = developed_bridge
 bridge_data['description'] = 'Developed rope bridge matching design intent. Individual planks, visible rope railings, torches, structural detail.'
 bridge_data['notes']['implementation_status'] = 'DEVELOPED - matches design intent'
 bridge_data['notes']['features_added'] = [
@@ -139,8 +139,7 @@ bridge_data['notes']['colors'] = {
 }
 bridge_data['notes']['total_voxels'] = len(developed_bridge)
 
-with open('story-geometry/bridge-over-forest-floor.json', 'w') as f:
-    json.dump(bridge_data, f, indent=2)
+save_map(bridge_data, developed_bridge, 'story-geometry/bridge-over-forest-floor.json')
 
 print(f"\nBridge updated in bridge-over-forest-floor.json")
 print("Design intent satisfied: individual planks, rope railings, torches, structural detail")
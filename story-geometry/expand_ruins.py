@@ -1,10 +1,9 @@
-import json
+from heightmap import save_map
+from voxel_grid import load_map
 
 # Read current ruins
-with open('story-geometry/ruins-complete.json', 'r') as f:
-    ruins = json.load(f)
-
-existing_voxels = ruins['voxels']
+ruins, ruins_grid = load_map('story-geometry/ruins-complete.json')
+existing_count = len(ruins_grid)
 
 # Add varied architectural artifacts extending into grass areas
 artifacts = []
@@ -107,11 +106,10 @@ print(f"  Furniture remnants: ~{len(bench_remnants)}")
 print(f"  Wooden debris: ~{len(wooden_artifacts)}")
 print(f"  Wall fragments: ~{len(wall_fragments)}")
 
-# Combine with existing
-all_voxels = existing_voxels + artifacts
+# Combine with existing (artifacts sit on top of grass in the same cell)
+ruins_grid.extend(artifacts)
 
 # Update ruins
-ruins['voxels'] = all_voxels
 ruins['description'] = "Expanded ruins with architectural artifacts. Fallen walls, columns, foundations, benches - tells story of old fort's extent."
 
 # Update notes
@@ -131,14 +129,12 @@ ruins['notes']['expansion_artifacts'] = {
     'design_philosophy': 'Artifacts tell story - this was a functioning fort with courtyard, defenses, structures'
 }
 
-ruins['notes']['total_voxels'] = len(all_voxels)
-
-with open('story-geometry/ruins-complete.json', 'w') as f:
-    json.dump(ruins, f, indent=2)
+ruins['notes']['total_voxels'] = len(ruins_grid)
 
-with open('test-maps/ruins-test.json', 'w') as f:
-    json.dump(ruins, f, indent=2)
+save_map(ruins, ruins_grid,
+         'story-geometry/ruins-complete.json',
+         'test-maps/ruins-test.json')
 
-print(f"\nUpdated ruins: {len(all_voxels)} total voxels")
-print(f"  Original (structures + grass): {len(existing_voxels)}")
+print(f"\nUpdated ruins: {len(ruins_grid)} total voxels")
+print(f"  Original (structures + grass): {existing_count}")
 print(f"  New artifacts: {len(artifacts)}")
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Greedy-mesh a map into a few merged, face-culled meshes (one per color)
+and write them as binary glTF next to the map: test-maps/<map>.glb.
+
+A BoxGeometry per voxel costs 12 triangles and one draw call, interior
+faces included; InstancedVoxelRenderer in index.html shares the draw call
+per color but still draws every face. Here only faces whose neighbor
+cell is empty are kept. Coplanar faces of the same color are then merged
+into rectangles: first into runs along one axis, then runs with the same
+extent are stacked along the other. The result is one primitive (one draw
+call) per color.
+
+Voxels are unit cubes centered on their integer coordinates, exactly like
+createVoxel(). A voxel without a color gets createVoxel()'s height colors.
+When a cell is listed twice, the later voxel wins (as in game.terrain).
+
+The glb carries asset.extras = {voxelCount, voxelHash, quads}. voxelHash
+is voxel_grid.voxel_hash() of the map's voxels and colors as listed (a
+missing color hashes as NO_COLOR); index.html recomputes it over the
+loaded map and only uses the file when it matches, and `check` compares
+it the same way.
+
+Usage:
+    python3 story-geometry/greedy_mesh.py build test-maps/complete-scene.json
+    python3 story-geometry/greedy_mesh.py check test-maps/*.json
+    python3 story-geometry/greedy_mesh.py stats test-maps/complete-scene.json
+"""
+
+import hashlib
+import json
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from voxel_grid import NO_COLOR, VoxelGrid, pack_arrays, voxel_arrays, voxel_hash
+
+GLB_MAGIC = 0x46546C67
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+FLOAT = 5126
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+
+# For a face normal along axis a, (u, v) axes with u x v = +a
+FACE_AXES = {0: (1, 2), 1: (2, 0), 2: (0, 1)}
+
+
+def default_color(y):
+    """createVoxel()'s color for a voxel without one."""
+    if y == 0:
+        return 0x8b7355
+    if y < 2:
+        return 0x228b22
+    if y < 5:
+        return 0x90ee90
+    if y < 8:
+        return 0x808080
+    return 0xffffff
+
+
+def grid_from_map(data):
+    xs, ys, zs, colors = voxel_arrays(data.get('voxels', []))
+    missing = colors == NO_COLOR
+    if missing.any():
+        colors[missing] = [default_color(y) for y in ys[missing].tolist()]
+    return VoxelGrid.from_arrays(xs, ys, zs, colors)
+
+
+def map_hash(data):
+    """voxel_hash() of a map's voxels with colors, as index.html computes it."""
+    return voxel_hash(*voxel_arrays(data.get('voxels', [])))
+
+
+def voxel_sha(grid):
+    """Hash of the (sorted) cells and colors, independent of list order."""
+    order = np.argsort(grid.keys)
+    digest = hashlib.sha256()
+    digest.update(grid.keys[order].astype('<i8').tobytes())
+    digest.update(grid.color[order].astype('<i8').tobytes())
+    return digest.hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Meshing
+# ----------------------------------------------------------------------
+
+def _starts(*columns_and_steps):
+    """Mask of rows that do not continue the previous row."""
+    n = len(columns_and_steps[0][0])
+    start = np.ones(n, dtype=bool)
+    if n > 1:
+        same = np.ones(n - 1, dtype=bool)
+        for column, step in columns_and_steps:
+            same &= column[1:] == column[:-1] + step
+        start[1:] = ~same
+    return start
+
+
+def greedy_quads(grid):
+    """
+    Merged visible faces as a dict of int64 arrays (one row per rectangle):
+    axis, sign, layer, u0, u1, v0, v1, color.
+    """
+    coords = (grid.x.astype(np.int64), grid.y.astype(np.int64), grid.z.astype(np.int64))
+    colors = grid.color.astype(np.int64)
+    solid = np.sort(grid.keys)
+    parts = []
+
+    for axis in range(3 if len(solid) else 0):
+        ua, va = FACE_AXES[axis]
+        for sign in (1, -1):
+            neighbor = list(coords)
+            neighbor[axis] = coords[axis] + sign
+            keys = pack_arrays(*neighbor)
+            idx = np.minimum(np.searchsorted(solid, keys), len(solid) - 1)
+            visible = solid[idx] != keys
+            if not visible.any():
+                continue
+            layer, u, v = coords[axis][visible], coords[ua][visible], coords[va][visible]
+            color = colors[visible]
+
+            # Pass 1: runs along u within (color, layer, v)
+            order = np.lexsort((u, v, layer, color))
+            color, layer, u, v = color[order], layer[order], u[order], v[order]
+            start = _starts((color, 0), (layer, 0), (v, 0), (u, 1))
+            end = np.append(np.flatnonzero(start)[1:] - 1, len(u) - 1)
+            color, layer, v, u0, u1 = color[start], layer[start], v[start], u[start], u[end]
+
+            # Pass 2: stack runs with the same extent along v
+            order = np.lexsort((v, u1, u0, layer, color))
+            color, layer, v, u0, u1 = color[order], layer[order], v[order], u0[order], u1[order]
+            start = _starts((color, 0), (layer, 0), (u0, 0), (u1, 0), (v, 1))
+            end = np.append(np.flatnonzero(start)[1:] - 1, len(v) - 1)
+
+            count = int(start.sum())
+            parts.append({
+                'axis': np.full(count, axis, dtype=np.int64),
+                'sign': np.full(count, sign, dtype=np.int64),
+                'layer': layer[start], 'u0': u0[start], 'u1': u1[start],
+                'v0': v[start], 'v1': v[end], 'color': color[start],
+            })
+
+    fields = ('axis', 'sign', 'layer', 'u0', 'u1', 'v0', 'v1', 'color')
+    if not parts:
+        return {f: np.empty(0, dtype=np.int64) for f in fields}
+    return {f: np.concatenate([p[f] for p in parts]) for f in fields}
+
+
+def quad_geometry(quads):
+    """(positions float32 [4n,3], normals float32 [4n,3], indices uint32 [6n])."""
+    n = len(quads['axis'])
+    positions = np.empty((n, 4, 3), dtype=np.float32)
+    normals = np.zeros((n, 4, 3), dtype=np.float32)
+    lo_u, hi_u = quads['u0'] - 0.5, quads['u1'] + 0.5
+    lo_v, hi_v = quads['v0'] - 0.5, quads['v1'] + 0.5
+    plane = quads['layer'] + 0.5 * quads['sign']
+    rows = np.arange(n)
+    for axis in range(3):
+        ua, va = FACE_AXES[axis]
+        mask = quads['axis'] == axis
+        r = rows[mask]
+        positions[r, :, axis] = plane[mask][:, None]
+        positions[r, :, ua] = np.stack([lo_u[mask], hi_u[mask], hi_u[mask], lo_u[mask]], axis=1)
+        positions[r, :, va] = np.stack([lo_v[mask], lo_v[mask], hi_v[mask], hi_v[mask]], axis=1)
+        normals[r, :, axis] = quads['sign'][mask][:, None]
+
+    # Corners run counter-clockwise seen from +axis; flip for -axis faces
+    front = np.array([0, 1, 2, 0, 2, 3], dtype=np.uint32)
+    back = np.array([0, 2, 1, 0, 3, 2], dtype=np.uint32)
+    pattern = np.where((quads['sign'] > 0)[:, None], front, back)
+    indices = (pattern + 4 * np.arange(n, dtype=np.uint32)[:, None]).astype(np.uint32)
+    return positions.reshape(-1, 3), normals.reshape(-1, 3), indices.reshape(-1)
+
+
+# ----------------------------------------------------------------------
+# glTF
+# ----------------------------------------------------------------------
+
+def _srgb_to_linear(channel):
+    c = channel / 255.0
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+def _material(color):
+    rgb = [(color >> 16) & 0xff, (color >> 8) & 0xff, color & 0xff]
+    return {
+        'name': f"#{color:06x}",
+        'pbrMetallicRoughness': {
+            'baseColorFactor': [round(_srgb_to_linear(c), 6) for c in rgb] + [1.0],
+            'metallicFactor': 0.0,
+            'roughnessFactor': 1.0,
+        },
+    }
+
+
+def build_gltf(grid, name='terrain', source_hash=None):
+    """(gltf JSON dict, binary buffer) with one primitive per color. source_hash: map_hash()."""
+    quads = greedy_quads(grid)
+    blob = bytearray()
+    views, accessors, primitives, materials = [], [], [], []
+
+    def add_view(array, target):
+        while len(blob) % 4:
+            blob.append(0)
+        views.append({'buffer': 0, 'byteOffset': len(blob), 'byteLength': array.nbytes,
+                      'target': target})
+        blob.extend(array.tobytes())
+        return len(views) - 1
+
+    for color in np.unique(quads['color']).tolist():
+        mask = quads['color'] == color
+        positions, normals, indices = quad_geometry({k: a[mask] for k, a in quads.items()})
+        accessors.append({'bufferView': add_view(positions, ARRAY_BUFFER), 'componentType': FLOAT,
+                          'count': len(positions), 'type': 'VEC3',
+                          'min': positions.min(axis=0).tolist(), 'max': positions.max(axis=0).tolist()})
+        accessors.append({'bufferView': add_view(normals, ARRAY_BUFFER), 'componentType': FLOAT,
+                          'count': len(normals), 'type': 'VEC3'})
+        index_type = UNSIGNED_SHORT if len(positions) <= 0xffff else UNSIGNED_INT
+        if index_type == UNSIGNED_SHORT:
+            indices = indices.astype(np.uint16)
+        accessors.append({'bufferView': add_view(indices, ELEMENT_ARRAY_BUFFER),
+                          'componentType': index_type, 'count': len(indices), 'type': 'SCALAR'})
+        materials.append(_material(int(color)))
+        primitives.append({'attributes': {'POSITION': len(accessors) - 3, 'NORMAL': len(accessors) - 2},
+                           'indices': len(accessors) - 1, 'material': len(materials) - 1})
+
+    gltf = {
+        'asset': {
+            'version': '2.0',
+            'generator': 'story-geometry/greedy_mesh.py',
+            'extras': {'voxelCount': len(grid), 'voxelHash': source_hash,
+                       'quads': int(len(quads['axis']))},
+        },
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{'name': name, 'mesh': 0}] if primitives else [{'name': name}],
+        'buffers': [{'byteLength': len(blob)}],
+        'bufferViews': views,
+        'accessors': accessors,
+        'materials': materials,
+    }
+    if primitives:
+        gltf['meshes'] = [{'name': name, 'primitives': primitives}]
+    return gltf, bytes(blob)
+
+
+def write_glb(path, gltf, blob):
+    text = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    text += b' ' * (-len(text) % 4)
+    blob += b'\0' * (-len(blob) % 4)
+    total = 12 + 8 + len(text) + 8 + len(blob)
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<III', GLB_MAGIC, 2, total))
+        f.write(struct.pack('<II', len(text), CHUNK_JSON))
+        f.write(text)
+        f.write(struct.pack('<II', len(blob), CHUNK_BIN))
+        f.write(blob)
+
+
+def read_glb_json(path):
+    with open(path, 'rb') as f:
+        magic, version, _ = struct.unpack('<III', f.read(12))
+        if magic != GLB_MAGIC or version != 2:
+            raise ValueError(f"{path} is not a glTF 2.0 binary")
+        length, kind = struct.unpack('<II', f.read(8))
+        if kind != CHUNK_JSON:
+            raise ValueError(f"{path}: first chunk is not JSON")
+        return json.loads(f.read(length))
+
+
+def mesh_path(map_path):
+    return Path(map_path).with_suffix('.glb')
+
+
+def build_for_map(map_path):
+    """Mesh a map file into <map>.glb. Returns the glTF JSON."""
+    with open(map_path, 'r') as f:
+        data = json.load(f)
+    gltf, blob = build_gltf(grid_from_map(data), Path(map_path).stem, map_hash(data))
+    write_glb(mesh_path(map_path), gltf, blob)
+    return gltf
+
+
+def mesh_stats(grid):
+    quads = greedy_quads(grid)
+    return {
+        'voxels': len(grid),
+        'drawCalls': len(np.unique(quads['color'])),
+        'triangles': 2 * len(quads['axis']),
+        'vertices': 4 * len(quads['axis']),
+        # One BoxGeometry mesh per voxel: 6 faces x 4 vertices, 12 triangles
+        'perVoxelDrawCalls': len(grid),
+        'perVoxelTriangles': 12 * len(grid),
+        'perVoxelVertices': 24 * len(grid),
+    }
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('build', 'check', 'stats'):
+        print("Usage: python3 story-geometry/greedy_mesh.py <build|check|stats> <maps>")
+        print("\nExample:")
+        print("  python3 story-geometry/greedy_mesh.py build test-maps/complete-scene.json")
+        print("  python3 story-geometry/greedy_mesh.py check test-maps/*.json")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    all_ok = True
+
+    for filepath in sys.argv[2:]:
+        path = Path(filepath)
+        if not path.exists():
+            print(f"❌ {filepath}: File not found")
+            all_ok = False
+            continue
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if 'voxels' not in data:
+            continue
+        grid = grid_from_map(data)
+
+        if command == 'build':
+            gltf, blob = build_gltf(grid, path.stem, map_hash(data))
+            write_glb(mesh_path(path), gltf, blob)
+            print(f"✓ {filepath}: {len(grid)} voxels → {gltf['asset']['extras']['quads']} quads, "
+                  f"{len(gltf['materials'])} meshes ({mesh_path(path)})")
+        elif command == 'check':
+            target = mesh_path(path)
+            if not target.exists():
+                print(f"- {filepath}: no mesh")
+                continue
+            extras = read_glb_json(target)['asset'].get('extras', {})
+            if extras.get('voxelHash') == map_hash(data):
+                print(f"✓ {filepath}: mesh matches voxels")
+            else:
+                print(f"❌ {filepath}: mesh is stale (re-run build)")
+                all_ok = False
+        else:
+            s = mesh_stats(grid)
+            print(f"✓ {filepath}: {s['voxels']} voxels - "
+                  f"draw calls {s['perVoxelDrawCalls']} → {s['drawCalls']}, "
+                  f"triangles {s['perVoxelTriangles']} → {s['triangles']}, "
+                  f"vertices {s['perVoxelVertices']} → {s['vertices']}")
+
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Per-column heightmap and surface index, baked into maps as a sidecar.
+
+For every occupied (x, z) column this records:
+    top       highest voxel y
+    bottom    lowest voxel y (river bed at y=-2 included)
+    surfaces  every voxel with an empty cell above it - something a
+              character can stand on - with its headroom: the number of
+              empty cells above before the next voxel (-1 = open sky)
+
+The sidecar lives under the map's "heightmap" key and stores only the
+occupied columns, as solid runs of cells (a surface is the top of a run):
+
+    "heightmap": {
+        "version": 2,
+        "voxelHash": "...",              # voxel_hash() of the cells baked
+        "origin": [minX, minZ], "size": [sizeX, sizeZ],
+        "columns": "<base64>"            # unsigned LEB128 varints
+    }
+
+Columns are numbered (x - minX) * sizeZ + (z - minZ) and encoded in order
+as groups: skip (empty columns before the group), repeat (consecutive
+columns with identical runs), run count, then per run: bottom (zigzag for
+the first run, else empty cells since the previous run's top - 1) and
+height - 1. Flat floors collapse into a few groups, so the sidecar is a
+small fraction of the voxel JSON and survives gzip/voxmap compression.
+
+Heights do not depend on colors, so voxelHash covers cells only: index.html
+uses the sidecar only when voxelHash() of the loaded terrain matches, and
+otherwise builds the index from the voxels. Generators save through this
+module's save_map(), which re-bakes the sidecar of any map that has one (or
+adds it, heightmap=True); voxel_grid.save_map() drops a sidecar that no
+longer matches. voxmap.py leaves it out of its header.
+
+index.html reads it into ColumnHeightmap for O(1) getTerrainHeightAt().
+
+Usage:
+    python3 story-geometry/heightmap.py bake test-maps/*.json
+    python3 story-geometry/heightmap.py check test-maps/*.json
+"""
+
+import base64
+import sys
+from pathlib import Path
+
+import numpy as np
+
+import voxel_grid
+from voxel_grid import VoxelGrid, load_map, voxel_hash
+
+VERSION = 2
+NO_COLUMN = -32768
+OPEN_SKY = -1
+
+
+def _varints(values):
+    """Unsigned LEB128 bytes for non-negative ints."""
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def _read_varints(blob):
+    values, value, shift = [], 0, 0
+    for byte in blob:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value, shift = 0, 0
+    if shift:
+        raise ValueError("Truncated heightmap columns")
+    return values
+
+
+def _zigzag(v):
+    return 2 * v if v >= 0 else -2 * v - 1
+
+
+def _unzigzag(v):
+    return v >> 1 if v % 2 == 0 else -((v + 1) >> 1)
+
+
+class ColumnIndex:
+    """
+    Column data over a dense rectangle. top/bottom hold NO_COLUMN for
+    empty columns; surfaces for column i are surface_y/headroom rows
+    surface_start[i]:surface_start[i+1], sorted by y.
+    """
+
+    def __init__(self, origin, size, top, bottom, surface_start, surface_y, headroom, voxel_hash):
+        self.origin = (int(origin[0]), int(origin[1]))
+        self.size = (int(size[0]), int(size[1]))
+        self.top = top
+        self.bottom = bottom
+        self.surface_start = surface_start
+        self.surface_y = surface_y
+        self.headroom = headroom
+        self.voxel_hash = voxel_hash
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_grid(cls, grid):
+        n = len(grid)
+        if n == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return cls((0, 0), (0, 0), empty, empty, np.zeros(1, dtype=np.int64), empty, empty,
+                       voxel_hash(empty, empty, empty))
+
+        xs = grid.x.astype(np.int64)
+        ys = grid.y.astype(np.int64)
+        zs = grid.z.astype(np.int64)
+        origin = (int(xs.min()), int(zs.min()))
+        size = (int(xs.max()) - origin[0] + 1, int(zs.max()) - origin[1] + 1)
+        cells = size[0] * size[1]
+
+        col = (xs - origin[0]) * size[1] + (zs - origin[1])
+        order = np.lexsort((ys, col))
+        col, ys = col[order], ys[order]
+
+        top = np.full(cells, NO_COLUMN, dtype=np.int64)
+        bottom = np.full(cells, NO_COLUMN, dtype=np.int64)
+        last = np.ones(n, dtype=bool)
+        last[:-1] = col[1:] != col[:-1]
+        first = np.ones(n, dtype=bool)
+        first[1:] = col[1:] != col[:-1]
+        top[col[last]] = ys[last]
+        bottom[col[first]] = ys[first]
+
+        # A voxel is a surface unless the cell directly above is filled
+        next_y = np.empty(n, dtype=np.int64)
+        next_y[:-1] = ys[1:]
+        is_surface = last.copy()
+        is_surface[:-1] |= next_y[:-1] != ys[:-1] + 1
+        headroom = np.where(last, OPEN_SKY, next_y - ys - 1)
+
+        surface_col = col[is_surface]
+        surface_start = np.zeros(cells + 1, dtype=np.int64)
+        np.cumsum(np.bincount(surface_col, minlength=cells), out=surface_start[1:])
+        return cls(origin, size, top, bottom, surface_start,
+                   ys[is_surface], headroom[is_surface], voxel_hash(grid.x, grid.y, grid.z))
+
+    @classmethod
+    def from_runs(cls, origin, size, runs, voxel_hash):
+        """Build from {column: [(bottom, top), ...]} (runs sorted by y)."""
+        cells = size[0] * size[1]
+        top = np.full(cells, NO_COLUMN, dtype=np.int64)
+        bottom = np.full(cells, NO_COLUMN, dtype=np.int64)
+        counts = np.zeros(cells, dtype=np.int64)
+        surface_y, headroom = [], []
+        for col in sorted(runs):
+            column = runs[col]
+            bottom[col], top[col] = column[0][0], column[-1][1]
+            counts[col] = len(column)
+            for k, (_, run_top) in enumerate(column):
+                surface_y.append(run_top)
+                headroom.append(OPEN_SKY if k == len(column) - 1 else column[k + 1][0] - run_top - 1)
+        surface_start = np.zeros(cells + 1, dtype=np.int64)
+        np.cumsum(counts, out=surface_start[1:])
+        return cls(origin, size, top, bottom, surface_start,
+                   np.array(surface_y, dtype=np.int64), np.array(headroom, dtype=np.int64), voxel_hash)
+
+    def runs(self):
+        """{column: [(bottom, top), ...]} solid runs of every occupied column."""
+        result = {}
+        for col in np.flatnonzero(self.top != NO_COLUMN).tolist():
+            a, b = self.surface_start[col], self.surface_start[col + 1]
+            tops = self.surface_y[a:b].tolist()
+            rooms = self.headroom[a:b].tolist()
+            # Each run starts right above the previous run's headroom
+            bottoms = [int(self.bottom[col])] + [t + r + 1 for t, r in zip(tops[:-1], rooms[:-1])]
+            result[col] = list(zip(bottoms, tops))
+        return result
+
+    @classmethod
+    def from_sidecar(cls, sidecar):
+        if sidecar.get('version') != VERSION:
+            raise ValueError(f"Unsupported heightmap version {sidecar.get('version')}")
+        values = _read_varints(base64.b64decode(sidecar['columns']))
+        runs, col, i = {}, -1, 0
+        while i < len(values):
+            skip, repeat, count = values[i:i + 3]
+            i += 3
+            column, previous_top = [], None
+            for _ in range(count):
+                start, height = values[i:i + 2]
+                i += 2
+                run_bottom = _unzigzag(start) if previous_top is None else previous_top + start + 2
+                previous_top = run_bottom + height
+                column.append((run_bottom, previous_top))
+            col += skip + 1
+            for _ in range(repeat):
+                runs[col] = column
+                col += 1
+            col -= 1
+        return cls.from_runs(sidecar['origin'], sidecar['size'], runs, sidecar['voxelHash'])
+
+    def to_sidecar(self):
+        values = []
+        col_runs = sorted(self.runs().items())
+        previous = -1
+        i = 0
+        while i < len(col_runs):
+            col, column = col_runs[i]
+            repeat = 1
+            while (i + repeat < len(col_runs) and col_runs[i + repeat][0] == col + repeat
+                   and col_runs[i + repeat][1] == column):
+                repeat += 1
+            values += [col - previous - 1, repeat, len(column)]
+            previous_top = None
+            for run_bottom, run_top in column:
+                start = _zigzag(run_bottom) if previous_top is None else run_bottom - previous_top - 2
+                values += [start, run_top - run_bottom]
+                previous_top = run_top
+            previous = col + repeat - 1
+            i += repeat
+        return {
+            'version': VERSION,
+            'voxelHash': self.voxel_hash,
+            'origin': list(self.origin),
+            'size': list(self.size),
+            'columns': base64.b64encode(_varints(values)).decode('ascii'),
+        }
+
+    def __eq__(self, other):
+        return (isinstance(other, ColumnIndex) and self.origin == other.origin
+                and self.size == other.size and self.voxel_hash == other.voxel_hash
+                and all(np.array_equal(getattr(self, a), getattr(other, a))
+                        for a in ('top', 'bottom', 'surface_start', 'surface_y', 'headroom')))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _column(self, x, z):
+        i, j = x - self.origin[0], z - self.origin[1]
+        if 0 <= i < self.size[0] and 0 <= j < self.size[1]:
+            return i * self.size[1] + j
+        return None
+
+    def top_at(self, x, z):
+        """Highest voxel y in the column, or None if it is empty."""
+        c = self._column(x, z)
+        if c is None or self.top[c] == NO_COLUMN:
+            return None
+        return int(self.top[c])
+
+    def bottom_at(self, x, z):
+        c = self._column(x, z)
+        if c is None or self.bottom[c] == NO_COLUMN:
+            return None
+        return int(self.bottom[c])
+
+    def surfaces_at(self, x, z):
+        """[(y, headroom)] sorted by y; headroom -1 means open sky."""
+        c = self._column(x, z)
+        if c is None:
+            return []
+        a, b = self.surface_start[c], self.surface_start[c + 1]
+        return list(zip(self.surface_y[a:b].tolist(), self.headroom[a:b].tolist()))
+
+    def standable_at(self, x, z, clearance=2):
+        """Surface ys with at least `clearance` empty cells above."""
+        return [y for y, room in self.surfaces_at(x, z) if room == OPEN_SKY or room >= clearance]
+
+    def support_below(self, x, y, z):
+        """Highest surface strictly below y (where something at y lands), or None."""
+        best = None
+        for surface_y, _ in self.surfaces_at(x, z):
+            if surface_y < y:
+                best = surface_y
+            else:
+                break
+        return best
+
+
+def bake(data, grid=None):
+    """Add/refresh data['heightmap'] from its voxels. Returns the index."""
+    if grid is None:
+        grid = VoxelGrid.from_voxels(data.get('voxels', []))
+    index = ColumnIndex.from_grid(grid)
+    data['heightmap'] = index.to_sidecar()
+    return index
+
+
+def save_map(data, grid, *paths, heightmap=None):
+    """
+    voxel_grid.save_map() that keeps the sidecar: re-baked when data has one
+    (or heightmap=True), left out when heightmap=False.
+    """
+    if heightmap is None:
+        heightmap = 'heightmap' in data
+    if heightmap:
+        data.setdefault('voxels', [])  # keep "voxels" ahead of "heightmap"
+        bake(data, grid)
+    else:
+        data.pop('heightmap', None)
+    voxel_grid.save_map(data, grid, *paths)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('bake', 'check'):
+        print("Usage: python3 story-geometry/heightmap.py <bake|check> <files>")
+        print("\nExample:")
+        print("  python3 story-geometry/heightmap.py bake test-maps/*.json")
+        print("  python3 story-geometry/heightmap.py check test-maps/*.json")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    all_ok = True
+
+    for filepath in sys.argv[2:]:
+        path = Path(filepath)
+        if not path.exists():
+            print(f"❌ {filepath}: File not found")
+            all_ok = False
+            continue
+
+        data, grid = load_map(path)
+        if 'voxels' not in data:
+            continue
+        expected = ColumnIndex.from_grid(grid)
+
+        if command == 'bake':
+            sidecar = expected.to_sidecar()
+            if data.get('heightmap') == sidecar:
+                print(f"✓ {filepath}: up to date")
+                continue
+            data['heightmap'] = sidecar
+            voxel_grid.save_map(data, None, path)
+            print(f"✓ {filepath}: baked {expected.size[0]}x{expected.size[1]} columns, "
+                  f"{len(expected.surface_y)} surfaces")
+        else:
+            if 'heightmap' not in data:
+                print(f"- {filepath}: no heightmap")
+                continue
+            try:
+                current = ColumnIndex.from_sidecar(data['heightmap'])
+            except (KeyError, ValueError) as error:
+                print(f"❌ {filepath}: unreadable heightmap ({error}); re-run bake")
+                all_ok = False
+                continue
+            if current == expected:
+                print(f"✓ {filepath}: heightmap matches voxels")
+            else:
+                print(f"❌ {filepath}: heightmap is stale (re-run bake)")
+                all_ok = False
+
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
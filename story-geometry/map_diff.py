@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Voxel, action and metadata diff between two versions of a map, as a patch
+that can be applied and reverted.
+
+Patch layout (JSON, one line per changed voxel):
+
+    {
+      "format": "map-patch", "version": 1,
+      "voxels": {
+        "added":     {"x,y,z": color, ...},
+        "removed":   {"x,y,z": color, ...},
+        "recolored": {"x,y,z": [old, new], ...}
+      },
+      "metadata": [{"path": ["notes", "age"], "old": ..., "new": ...}, ...],
+      "characters": {
+        "added":   [{"index": i, "character": {...}}],
+        "removed": [{"index": i, "character": {...}}],
+        "changed": {"<id>": {"fields": [...metadata entries...],
+                             "actions": [{"at": i, "old": [...], "new": [...]}]}}
+      }
+    }
+
+Voxels are compared by sorted packed keys (np.intersect1d over both maps'
+keys), so a diff is a merge of two sorted arrays. Metadata is diffed key
+by key, down to nested dicts. A missing "old" or "new" means the key is
+added or removed. Action queues are diffed as sequences
+(difflib.SequenceMatcher over the compact queue entries). Every entry keeps
+both sides, so a patch reverts exactly and is checked before it is applied:
+a removed voxel must be there with its color, a changed key must hold its
+old value, and so on. A conflict raises ValueError.
+
+A patch only holds what changed. index.html applies the voxel part on top
+of a loaded map (?test=<map>&patch=<name> loads test-maps/<name>.patch.json),
+so a large scene can be updated with a delta.
+
+Maps can be named as <git rev>:<path> to diff against history.
+
+Usage:
+    python3 story-geometry/map_diff.py diff HEAD~1:test-maps/complete-scene.json test-maps/complete-scene.json
+    python3 story-geometry/map_diff.py diff old.json new.json --out test-maps/change.patch.json
+    python3 story-geometry/map_diff.py apply test-maps/complete-scene.json change.patch.json [--out new.json]
+    python3 story-geometry/map_diff.py revert test-maps/complete-scene.json change.patch.json [--out old.json]
+"""
+
+import copy
+import difflib
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from asset_store import write_json
+from voxel_grid import NO_COLOR, is_columnar, pack_arrays, to_columns, unpack_arrays, voxel_arrays, voxel_list
+
+PATCH_FORMAT = 'map-patch'
+PATCH_VERSION = 1
+_MISSING = object()
+
+
+# ----------------------------------------------------------------------
+# Voxels
+# ----------------------------------------------------------------------
+
+def _voxel_arrays(voxels):
+    """Sorted unique (keys, colors); later duplicates win like VoxelGrid."""
+    xs, ys, zs, colors = voxel_arrays(voxels)
+    keys = pack_arrays(xs, ys, zs)
+    # Last occurrence of each key: unique over the reversed arrays
+    rev_keys, rev_first = np.unique(keys[::-1], return_index=True)
+    return rev_keys, colors[::-1][rev_first]
+
+
+def _cell_map(keys, colors):
+    xs, ys, zs = unpack_arrays(keys)
+    return {f"{x},{y},{z}": (None if c == NO_COLOR else c)
+            for x, y, z, c in zip(xs.tolist(), ys.tolist(), zs.tolist(), colors.tolist())}
+
+
+def diff_voxels(old_voxels, new_voxels):
+    old_keys, old_colors = _voxel_arrays(old_voxels)
+    new_keys, new_colors = _voxel_arrays(new_voxels)
+    _, in_old, in_new = np.intersect1d(old_keys, new_keys, assume_unique=True, return_indices=True)
+    removed = np.ones(len(old_keys), dtype=bool)
+    removed[in_old] = False
+    added = np.ones(len(new_keys), dtype=bool)
+    added[in_new] = False
+    changed = old_colors[in_old] != new_colors[in_new]
+    recolored = {cell: [old, new] for (cell, old), new in zip(
+        _cell_map(old_keys[in_old[changed]], old_colors[in_old[changed]]).items(),
+        _cell_map(new_keys[in_new[changed]], new_colors[in_new[changed]]).values())}
+    return {
+        'added': _cell_map(new_keys[added], new_colors[added]),
+        'removed': _cell_map(old_keys[removed], old_colors[removed]),
+        'recolored': recolored,
+    }
+
+
+def _parse_cell(cell):
+    x, y, z = (int(v) for v in cell.split(','))
+    return x, y, z
+
+
+def apply_voxels(voxels, change):
+    """
+    New voxel list with a voxel change applied. Checks cells first.
+    Duplicate cells collapse to their last entry, as in the diff.
+    """
+    current = dict(zip(*[a.tolist() for a in _voxel_arrays(voxels)]))
+
+    def check(cells, want):
+        for cell, color in cells.items():
+            key = int(pack_arrays(*[[v] for v in _parse_cell(cell)])[0])
+            have = current.get(key, _MISSING)
+            expected = _MISSING if want is _MISSING else (NO_COLOR if want(color) is None else want(color))
+            if have != expected:
+                raise ValueError(f"Voxel {cell}: patch expects "
+                                 f"{'empty' if expected is _MISSING else expected}, map has "
+                                 f"{'empty' if have is _MISSING else have}")
+
+    check(change['removed'], lambda c: c)
+    check(change['recolored'], lambda c: c[0])
+    check(change['added'], _MISSING)
+
+    drop = set(change['removed'])
+    recolor = {cell: colors[1] for cell, colors in change['recolored'].items()}
+    # One voxel per cell, the last one listed (what the diff compared), at
+    # the position of the cell's first entry
+    cells = {}
+    for voxel in voxels:
+        cells[f"{voxel['x']},{voxel['y']},{voxel['z']}"] = voxel
+    out = []
+    for cell, voxel in cells.items():
+        if cell in drop:
+            continue
+        if cell in recolor:
+            voxel = dict(voxel)
+            if recolor[cell] is None:
+                voxel.pop('color', None)
+            else:
+                voxel['color'] = recolor[cell]
+        out.append(voxel)
+    for cell, color in change['added'].items():
+        x, y, z = _parse_cell(cell)
+        out.append({'x': x, 'y': y, 'z': z} if color is None else {'x': x, 'y': y, 'z': z, 'color': color})
+    return out
+
+
+def _reverse_voxels(change):
+    return {'added': change['removed'], 'removed': change['added'],
+            'recolored': {cell: [new, old] for cell, (old, new) in change['recolored'].items()}}
+
+
+# ----------------------------------------------------------------------
+# Metadata and characters
+# ----------------------------------------------------------------------
+
+def diff_fields(old, new, path=(), skip=()):
+    """Entries {'path', 'old'?, 'new'?} for every differing key, recursing into dicts."""
+    entries = []
+    for key in list(old) + [k for k in new if k not in old]:
+        if (path + (key,)) in skip:
+            continue
+        a, b = old.get(key, _MISSING), new.get(key, _MISSING)
+        if a == b:
+            continue
+        if isinstance(a, dict) and isinstance(b, dict):
+            entries.extend(diff_fields(a, b, path + (key,), skip))
+            continue
+        entry = {'path': list(path + (key,))}
+        if a is not _MISSING:
+            entry['old'] = a
+        if b is not _MISSING:
+            entry['new'] = b
+        entries.append(entry)
+    return entries
+
+
+def apply_fields(data, entries):
+    for entry in entries:
+        *parents, key = entry['path']
+        target = data
+        for part in parents:
+            target = target.setdefault(part, {})
+        have = target.get(key, _MISSING)
+        if have != entry.get('old', _MISSING):
+            raise ValueError(f"{'.'.join(map(str, entry['path']))}: map value does not match the patch")
+        if 'new' in entry:
+            target[key] = copy.deepcopy(entry['new'])
+        else:
+            del target[key]
+
+
+def _reverse_fields(entries):
+    out = []
+    for entry in reversed(entries):
+        flipped = {'path': entry['path']}
+        if 'new' in entry:
+            flipped['old'] = entry['new']
+        if 'old' in entry:
+            flipped['new'] = entry['old']
+        out.append(flipped)
+    return out
+
+
+def diff_actions(old, new):
+    """Replace ops {'at', 'old', 'new'} turning queue old into new (positions in old)."""
+    matcher = difflib.SequenceMatcher(a=[json.dumps(a, sort_keys=True) for a in old],
+                                      b=[json.dumps(a, sort_keys=True) for a in new], autojunk=False)
+    return [{'at': i1, 'old': old[i1:i2], 'new': new[j1:j2]}
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def apply_actions(queue, ops):
+    queue = list(queue)
+    # Ops index the original queue: apply back to front so positions stay valid
+    for op in sorted(ops, key=lambda o: o['at'], reverse=True):
+        at, old = op['at'], op['old']
+        if queue[at:at + len(old)] != old:
+            raise ValueError(f"actionQueue[{at}]: map actions do not match the patch")
+        queue[at:at + len(old)] = copy.deepcopy(op['new'])
+    return queue
+
+
+def _reverse_actions(ops):
+    # Positions of the reversed ops are in the new queue
+    out = []
+    shift = 0
+    for op in sorted(ops, key=lambda o: o['at']):
+        out.append({'at': op['at'] + shift, 'old': op['new'], 'new': op['old']})
+        shift += len(op['new']) - len(op['old'])
+    return out
+
+
+def _characters(data):
+    return (data.get('characterGroup') or {}).get('characters', [])
+
+
+def diff_characters(old, new):
+    old_by_id = {c.get('id'): (i, c) for i, c in enumerate(old)}
+    new_by_id = {c.get('id'): (i, c) for i, c in enumerate(new)}
+    change = {'added': [], 'removed': [], 'changed': {}}
+    for cid, (i, character) in old_by_id.items():
+        if cid not in new_by_id:
+            change['removed'].append({'index': i, 'character': character})
+    for cid, (i, character) in new_by_id.items():
+        if cid not in old_by_id:
+            change['added'].append({'index': i, 'character': character})
+            continue
+        before = old_by_id[cid][1]
+        fields = diff_fields(before, character, skip={('actionQueue',)})
+        actions = diff_actions(before.get('actionQueue', []), character.get('actionQueue', []))
+        if fields or actions:
+            change['changed'][cid] = {'fields': fields, 'actions': actions}
+    return change
+
+
+def apply_characters(characters, change):
+    characters = copy.deepcopy(characters)
+    for entry in sorted(change['removed'], key=lambda e: e['index'], reverse=True):
+        i = entry['index']
+        if i >= len(characters) or characters[i] != entry['character']:
+            raise ValueError(f"Character {entry['character'].get('id')}: map does not match the patch")
+        del characters[i]
+    by_id = {c.get('id'): c for c in characters}
+    for cid, character_change in change['changed'].items():
+        character = by_id.get(cid)
+        if character is None:
+            raise ValueError(f"Character {cid}: not in map")
+        apply_fields(character, character_change['fields'])
+        if character_change['actions']:
+            character['actionQueue'] = apply_actions(character.get('actionQueue', []), character_change['actions'])
+    for entry in sorted(change['added'], key=lambda e: e['index']):
+        if entry['character'].get('id') in by_id:
+            raise ValueError(f"Character {entry['character'].get('id')}: already in map")
+        characters.insert(entry['index'], copy.deepcopy(entry['character']))
+    return characters
+
+
+def _reverse_characters(change):
+    return {'added': change['removed'], 'removed': change['added'],
+            'changed': {cid: {'fields': _reverse_fields(c['fields']), 'actions': _reverse_actions(c['actions'])}
+                        for cid, c in change['changed'].items()}}
+
+
+# ----------------------------------------------------------------------
+# Patches
+# ----------------------------------------------------------------------
+
+SPECIAL_KEYS = {('voxels',), ('characterGroup', 'characters')}
+
+
+def diff_maps(old, new):
+    """Patch turning map data old into new."""
+    return {
+        'format': PATCH_FORMAT,
+        'version': PATCH_VERSION,
+        'voxels': diff_voxels(old.get('voxels', []), new.get('voxels', [])),
+        'metadata': diff_fields(old, new, skip=SPECIAL_KEYS),
+        'characters': diff_characters(_characters(old), _characters(new)),
+    }
+
+
+def reverse_patch(patch):
+    return dict(patch, voxels=_reverse_voxels(patch['voxels']),
+                metadata=_reverse_fields(patch['metadata']),
+                characters=_reverse_characters(patch['characters']))
+
+
+def apply_patch(data, patch, reverse=False):
+    """New map data with the patch (or its inverse) applied. Raises ValueError on conflicts."""
+    if patch.get('format') != PATCH_FORMAT or patch.get('version') != PATCH_VERSION:
+        raise ValueError("Not a map-patch version 1 file")
+    if reverse:
+        patch = reverse_patch(patch)
+    out = {k: v for k, v in data.items() if k != 'voxels'}
+    out = copy.deepcopy(out)
+    apply_fields(out, patch['metadata'])
+    characters = patch['characters']
+    if characters['added'] or characters['removed'] or characters['changed']:
+        out.setdefault('characterGroup', {})['characters'] = apply_characters(_characters(data), characters)
+    voxels = data.get('voxels')
+    if voxels is not None or any(patch['voxels'].values()):
+        out['voxels'] = apply_voxels(voxel_list(voxels), patch['voxels'])
+        if is_columnar(voxels):
+            out['voxels'] = to_columns(*voxel_arrays(out['voxels']))
+    # Keep the original key order, new keys last
+    order = [k for k in data if k in out] + [k for k in out if k not in data]
+    return {k: out[k] for k in order}
+
+
+def patch_size(patch):
+    v, c = patch['voxels'], patch['characters']
+    return {
+        'added': len(v['added']), 'removed': len(v['removed']), 'recolored': len(v['recolored']),
+        'metadata': len(patch['metadata']),
+        'characters': len(c['added']) + len(c['removed']) + len(c['changed']),
+        'actionOps': sum(len(ch['actions']) for ch in c['changed'].values()),
+    }
+
+
+def is_empty(patch):
+    return not any(patch_size(patch).values())
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def read_map(spec):
+    """Load a map from a path or a <git rev>:<path> spec."""
+    if Path(spec).exists() or ':' not in spec:
+        with open(spec, 'r') as f:
+            return json.load(f)
+    result = subprocess.run(['git', 'show', spec], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ValueError(result.stderr.strip() or f"git show {spec} failed")
+    return json.loads(result.stdout)
+
+
+def summary(patch):
+    s = patch_size(patch)
+    return (f"+{s['added']} -{s['removed']} ~{s['recolored']} voxels, "
+            f"{s['metadata']} metadata, {s['characters']} characters ({s['actionOps']} action edits)")
+
+
+def main():
+    args = sys.argv[1:]
+    out_path = None
+    if '--out' in args:
+        i = args.index('--out')
+        out_path = args[i + 1]
+        del args[i:i + 2]
+    if len(args) != 3 or args[0] not in ('diff', 'apply', 'revert'):
+        print("Usage: python3 story-geometry/map_diff.py <diff|apply|revert> <a> <b> [--out file]")
+        print("  diff old.json new.json      (either may be <git rev>:<path>)")
+        print("  apply map.json patch.json   revert map.json patch.json")
+        print("\nExample:")
+        print("  python3 story-geometry/map_diff.py diff HEAD~1:test-maps/complete-scene.json "
+              "test-maps/complete-scene.json --out /tmp/scene.patch.json")
+        sys.exit(1)
+
+    command, a, b = args
+    try:
+        if command == 'diff':
+            patch = diff_maps(read_map(a), read_map(b))
+            print(f"{'✓' if is_empty(patch) else '-'} {a} → {b}: {summary(patch)}")
+            if out_path:
+                with open(out_path, 'w') as f:
+                    json.dump(patch, f, indent=2)
+                print(f"  wrote {out_path}")
+            elif not is_empty(patch):
+                print(json.dumps(patch, indent=2))
+        else:
+            data = read_map(a)
+            with open(b, 'r') as f:
+                patch = json.load(f)
+            result = apply_patch(data, patch, reverse=(command == 'revert'))
+            target = out_path or a
+            write_json(target, result)
+            print(f"✓ {'Reverted' if command == 'revert' else 'Applied'} {b} ({summary(patch)}) → {target}")
+    except (OSError, ValueError) as error:
+        print(f"❌ {error}")
+        sys.exit(1)
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Split a map into fixed-size spatial regions plus a manifest, so the browser
+can stream a large world instead of fetching it whole.
+
+A region is a REGION_SIZE x REGION_SIZE block of (x, z) columns over the full
+height (rx = x // size), so gravity and the column heightmap never straddle a
+missing region vertically. Regions are larger than ChunkedTerrain's 16^3
+chunks and only exist on disk. For test-maps/<map>.json the output is:
+
+    test-maps/<map>.regions/manifest.json
+        version, name, source, regionSize, voxelCount, bounds {min, max},
+        voxelSha (as in greedy_mesh.py; maps only), generator (generated
+        worlds only, see terrain_gen.py),
+        header   every map key except voxels/heightmap (playerStart, goal,
+                 characterGroup, barriers, ...)
+        regions  [{key: [rx, rz], file, bounds {min, max}, count, sha256}]
+    test-maps/<map>.regions/r_<rx>_<rz>.json
+        {"region": [rx, rz], "voxels": [{x, y, z, color}, ...]}
+
+sha256 is the hash of the region file's bytes. Unchanged region files are not
+rewritten, and region files that no longer exist in the map are deleted.
+
+index.html loads ?test=<map>.regions through RegionStreamer: only the manifest
+and the regions near the player/characters/camera are fetched before the
+first frame. Others stream in and out by distance.
+
+Usage:
+    python3 story-geometry/map_regions.py split test-maps/complete-scene.json
+    python3 story-geometry/map_regions.py split test-maps/complete-scene.json --size 16
+    python3 story-geometry/map_regions.py check test-maps/*.json
+    python3 story-geometry/map_regions.py stats test-maps/complete-scene.json
+"""
+
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from greedy_mesh import grid_from_map, voxel_sha
+from voxel_grid import VoxelGrid
+
+REGION_SIZE = 32
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+# Keys that describe the whole voxel set and are rebuilt at load
+WHOLE_MAP_KEYS = ('voxels', 'heightmap')
+
+
+def regions_dir(map_path):
+    return Path(map_path).with_suffix('.regions')
+
+
+def region_file(key):
+    return f"r_{key[0]}_{key[1]}.json"
+
+
+def _bounds(grid):
+    low, high = grid.bounds()
+    return {'min': list(low), 'max': list(high)}
+
+
+def split_grid(grid, size=REGION_SIZE):
+    """Yield ((rx, rz), VoxelGrid) per non-empty region, sorted by key."""
+    if len(grid) == 0:
+        return
+    rx, rz = grid.x // size, grid.z // size
+    order = np.lexsort((rz, rx))
+    rx, rz = rx[order], rz[order]
+    starts = np.flatnonzero(np.r_[True, (rx[1:] != rx[:-1]) | (rz[1:] != rz[:-1])])
+    for group in np.split(order, starts[1:]):
+        key = (int(grid.x[group[0]] // size), int(grid.z[group[0]] // size))
+        yield key, VoxelGrid.from_arrays(grid.x[group], grid.y[group], grid.z[group], grid.color[group])
+
+
+def region_bytes(key, grid):
+    return json.dumps({'region': list(key), 'voxels': grid.to_voxels()}).encode()
+
+
+def write_region(out_dir, key, grid):
+    """Write one region file unless unchanged. Returns (manifest entry, written)."""
+    blob = region_bytes(key, grid)
+    target = Path(out_dir) / region_file(key)
+    written = not target.exists() or target.read_bytes() != blob
+    if written:
+        target.write_bytes(blob)
+    entry = {'key': list(key), 'file': target.name, 'bounds': _bounds(grid),
+             'count': len(grid), 'sha256': hashlib.sha256(blob).hexdigest()}
+    return entry, written
+
+
+def write_manifest(out_dir, header, size, regions, voxel_sha=None, source=None, generator=None):
+    """
+    Write manifest.json for region entries from write_region() and delete
+    region files that are no longer listed. Returns (manifest, written).
+    """
+    out_dir = Path(out_dir)
+    regions = sorted(regions, key=lambda r: r['key'])
+    keep = {r['file'] for r in regions}
+    for stale in out_dir.glob('r_*.json'):
+        if stale.name not in keep:
+            stale.unlink()
+
+    bounds = None
+    if regions:
+        bounds = {'min': [min(r['bounds']['min'][a] for r in regions) for a in range(3)],
+                  'max': [max(r['bounds']['max'][a] for r in regions) for a in range(3)]}
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'name': header.get('name', out_dir.stem),
+        'source': source,
+        'regionSize': size,
+        'voxelCount': sum(r['count'] for r in regions),
+        'bounds': bounds,
+    }
+    if voxel_sha is not None:
+        manifest['voxelSha'] = voxel_sha
+    if generator is not None:
+        manifest['generator'] = generator
+    manifest['header'] = header
+    manifest['regions'] = regions
+
+    text = json.dumps(manifest, indent=2)
+    manifest_path = out_dir / MANIFEST
+    written = not manifest_path.exists() or manifest_path.read_text() != text
+    if written:
+        manifest_path.write_text(text)
+    return manifest, written
+
+
+def write_regions(data, grid, out_dir, size=REGION_SIZE, source=None):
+    """
+    Write the region files and manifest for a map into out_dir.
+    Returns (manifest, files_written).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    regions = []
+    written = 0
+    for key, region in split_grid(grid, size):
+        entry, changed = write_region(out_dir, key, region)
+        regions.append(entry)
+        written += changed
+    header = {k: v for k, v in data.items() if k not in WHOLE_MAP_KEYS}
+    manifest, changed = write_manifest(out_dir, header, size, regions, voxel_sha(grid), source)
+    return manifest, written + changed
+
+
+def load_manifest(out_dir):
+    with open(Path(out_dir) / MANIFEST, 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"{out_dir}: unsupported manifest version {manifest.get('version')}")
+    return manifest
+
+
+def load_regions(out_dir, keys=None):
+    """
+    Reassemble (manifest, grid) from a regions directory, optionally only
+    the given region keys. Raises ValueError on a hash or count mismatch.
+    """
+    out_dir = Path(out_dir)
+    manifest = load_manifest(out_dir)
+    wanted = None if keys is None else {tuple(k) for k in keys}
+    grid = VoxelGrid()
+    for entry in manifest['regions']:
+        if wanted is not None and tuple(entry['key']) not in wanted:
+            continue
+        blob = (out_dir / entry['file']).read_bytes()
+        if hashlib.sha256(blob).hexdigest() != entry['sha256']:
+            raise ValueError(f"{entry['file']}: hash does not match manifest")
+        voxels = json.loads(blob)['voxels']
+        if len(voxels) != entry['count']:
+            raise ValueError(f"{entry['file']}: {len(voxels)} voxels, manifest says {entry['count']}")
+        grid.extend(voxels)
+    return manifest, grid
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ('split', 'check', 'stats'):
+        print("Usage: python3 story-geometry/map_regions.py <split|check|stats> <maps> [--size N]")
+        print("\nExample:")
+        print("  python3 story-geometry/map_regions.py split test-maps/complete-scene.json")
+        print("  python3 story-geometry/map_regions.py check test-maps/*.json")
+        sys.exit(1)
+
+    command = args[0]
+    size = REGION_SIZE
+    if '--size' in args:
+        i = args.index('--size')
+        size = int(args[i + 1])
+        del args[i:i + 2]
+    all_ok = True
+
+    for filepath in args[1:]:
+        path = Path(filepath)
+        if not path.exists():
+            print(f"❌ {filepath}: File not found")
+            all_ok = False
+            continue
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if 'voxels' not in data:
+            continue
+        grid = grid_from_map(data)
+        out_dir = regions_dir(path)
+
+        if command == 'split':
+            manifest, written = write_regions(data, grid, out_dir, size, source=path.name)
+            print(f"✓ {filepath}: {len(grid)} voxels → {len(manifest['regions'])} regions of "
+                  f"{size}x{size} columns ({written} files written, {out_dir})")
+        elif command == 'check':
+            if not (out_dir / MANIFEST).exists():
+                print(f"- {filepath}: no regions")
+                continue
+            try:
+                manifest, regions = load_regions(out_dir)
+            except (ValueError, OSError) as error:
+                print(f"❌ {filepath}: {error}")
+                all_ok = False
+                continue
+            header = {k: v for k, v in data.items() if k not in WHOLE_MAP_KEYS}
+            if manifest.get('voxelSha') != voxel_sha(grid) or voxel_sha(regions) != manifest['voxelSha']:
+                print(f"❌ {filepath}: regions are stale (re-run split)")
+                all_ok = False
+            elif manifest['header'] != header:
+                print(f"❌ {filepath}: manifest header is stale (re-run split)")
+                all_ok = False
+            else:
+                print(f"✓ {filepath}: {len(manifest['regions'])} regions match the map")
+        else:
+            counts = [len(region) for _, region in split_grid(grid, size)]
+            if not counts:
+                print(f"- {filepath}: no voxels")
+                continue
+            print(f"✓ {filepath}: {len(grid)} voxels, {len(counts)} regions of {size}x{size} - "
+                  f"min {min(counts)}, mean {sum(counts) / len(counts):.0f}, max {max(counts)} voxels")
+
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 import json
 import math
 
+from heightmap import save_map
+
 # Read original bridge + floor
 with open('story-geometry/bridge-over-forest-floor.json', 'r') as f:
     data = json.load(f)
@@ -59,10 +61,8 @@ river_only = {
     }
 }
 
-with open('story-geometry/river-meandered.json', 'w') as f:
-    json.dump(river_only, f, indent=2)
-
-with open('test-maps/river-meandered.json', 'w') as f:
-    json.dump(river_only, f, indent=2)
+save_map(river_only, None,
+         'story-geometry/river-meandered.json',
+         'test-maps/river-meandered.json', heightmap=True)
 
 print("Created river-meandered.json for review")
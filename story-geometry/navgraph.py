@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Offline navigation graph for a map: "can a character get from A to B?"
+answered without playing the map in a browser.
+
+Nodes are standing positions (x, y, z): a voxel at y-1 to stand on and two
+empty cells (y, y+1) for a 2-voxel character (fix_characters_2voxels.py).
+Edges are single steps to the 8 horizontal neighbors, encoding the rules
+of index.html:
+
+    WALK   target cell is a node at the same height
+    CLIMB  target cell is solid but the cell above it is a node
+           (AutoClimbStrategy: 1 block only)
+    FALL   target cell and the one above are empty with nothing to stand
+           on - land on the highest surface below, at any height
+           (GravityStrategy's supportBelow); a 1-block drop is
+           handleMovement's auto-descend.
+
+Moves crossing a rope railing (barriers.ropeRailings, as in checkBarriers)
+get no edge. Character-vs-character collision is dynamic and not encoded.
+
+The graph is stored next to the map as <map>.navgraph: an uncompressed
+NumPy archive in CSR form (node coordinates sorted by packed key, edge
+offsets, edge targets, edge kinds) plus the SHA-256 of the map it was
+built from. Loading is a few array reads; node lookup is a binary search.
+
+Usage:
+    python3 story-geometry/navgraph.py build test-maps/complete-scene.json
+    python3 story-geometry/navgraph.py path test-maps/complete-scene.json 0,2,0 23,3,0
+    python3 story-geometry/navgraph.py stats test-maps/*.json
+"""
+
+import hashlib
+import json
+import sys
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from heightmap import ColumnIndex, OPEN_SKY
+from voxel_grid import VoxelGrid, pack_arrays, pack
+
+FORMAT_VERSION = 1
+CLEARANCE = 2  # character height in voxels
+
+WALK, CLIMB, FALL = 0, 1, 2
+KIND_NAMES = ('walk', 'climb', 'fall')
+
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def _sorted_member(sorted_keys, keys):
+    """(found mask, index) of keys in a sorted key array."""
+    idx = np.searchsorted(sorted_keys, keys)
+    idx_clipped = np.minimum(idx, max(len(sorted_keys) - 1, 0))
+    found = (idx < len(sorted_keys)) & (sorted_keys[idx_clipped] == keys) if len(sorted_keys) else \
+        np.zeros(len(keys), dtype=bool)
+    return found, idx_clipped
+
+
+def barrier_blocks(barriers, xs, zs):
+    """Vectorized checkBarriers(): True where moving into (x, z) is blocked."""
+    blocked = np.zeros(len(xs), dtype=bool)
+    railings = (barriers or {}).get('ropeRailings')
+    if not railings:
+        return blocked
+    north = railings.get('northSide')
+    if north:
+        blocked |= (xs >= north['xMin']) & (xs <= north['xMax']) & (zs < north['zLine'])
+    south = railings.get('southSide')
+    if south:
+        blocked |= (xs >= south['xMin']) & (xs <= south['xMax']) & (zs > south['zLine'])
+    return blocked
+
+
+class NavGraph:
+    """CSR adjacency over standing positions, nodes sorted by packed key."""
+
+    def __init__(self, xs, ys, zs, offsets, targets, kinds, source_sha=None):
+        self.x = np.asarray(xs, dtype=np.int32)
+        self.y = np.asarray(ys, dtype=np.int32)
+        self.z = np.asarray(zs, dtype=np.int32)
+        self.keys = pack_arrays(self.x, self.y, self.z)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.kinds = np.asarray(kinds, dtype=np.uint8)
+        self.source_sha = source_sha
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_map(cls, data, grid=None, source_sha=None):
+        if grid is None:
+            grid = VoxelGrid.from_voxels(data.get('voxels', []))
+        columns = ColumnIndex.from_grid(grid)
+        solid = np.sort(grid.keys)
+
+        # Surfaces -> column coordinates
+        per_column = np.diff(columns.surface_start)
+        surface_col = np.repeat(np.arange(len(per_column)), per_column)
+        size_z = max(columns.size[1], 1)
+        sx = columns.origin[0] + surface_col // size_z
+        sz = columns.origin[1] + surface_col % size_z
+        sy = columns.surface_y
+        room = columns.headroom
+
+        # Nodes: stand on a surface with room for the character
+        standable = (room == OPEN_SKY) | (room >= CLEARANCE)
+        nx, ny, nz = sx[standable], sy[standable] + 1, sz[standable]
+        order = np.argsort(pack_arrays(nx, ny, nz), kind='stable')
+        nx, ny, nz = nx[order], ny[order], nz[order]
+        node_keys = pack_arrays(nx, ny, nz)
+
+        # Surfaces keyed (column, y) for "highest surface below" lookups
+        surface_bias = 1 << 20
+        surface_keys = surface_col.astype(np.int64) * (1 << 21) + (sy + surface_bias)
+
+        sources, dests, kinds = [], [], []
+        node_ids = np.arange(len(nx))
+        for dx, dz in DIRECTIONS:
+            tx, tz = nx + dx, nz + dz
+            open_dir = ~barrier_blocks(data.get('barriers'), tx, tz)
+
+            # Walk: same height
+            found, idx = _sorted_member(node_keys, pack_arrays(tx, ny, tz))
+            walk = open_dir & found
+            sources.append(node_ids[walk]); dests.append(idx[walk])
+            kinds.append(np.full(int(walk.sum()), WALK, dtype=np.uint8))
+
+            # Climb: target solid, one up is standable
+            blocked_here, _ = _sorted_member(solid, pack_arrays(tx, ny, tz))
+            found, idx = _sorted_member(node_keys, pack_arrays(tx, ny + 1, tz))
+            climb = open_dir & blocked_here & found
+            sources.append(node_ids[climb]); dests.append(idx[climb])
+            kinds.append(np.full(int(climb.sum()), CLIMB, dtype=np.uint8))
+
+            # Fall: target and head cell empty, nothing directly below
+            blocked_head, _ = _sorted_member(solid, pack_arrays(tx, ny + 1, tz))
+            support, _ = _sorted_member(solid, pack_arrays(tx, ny - 1, tz))
+            candidate = open_dir & ~blocked_here & ~blocked_head & ~support
+            ci = tx - columns.origin[0]
+            cj = tz - columns.origin[1]
+            in_rect = (ci >= 0) & (ci < columns.size[0]) & (cj >= 0) & (cj < columns.size[1])
+            candidate &= in_rect
+            col = ci * size_z + cj
+            query = col.astype(np.int64) * (1 << 21) + (ny - 1 + surface_bias)
+            below = np.searchsorted(surface_keys, query) - 1
+            below_ok = candidate & (below >= 0)
+            below_c = np.maximum(below, 0)
+            if len(surface_keys):
+                below_ok &= surface_col[below_c] == col
+            else:
+                below_ok &= False
+            land_y = sy[below_c] + 1 if len(sy) else ny
+            found, idx = _sorted_member(node_keys, pack_arrays(tx, land_y, tz))
+            fall = below_ok & found
+            sources.append(node_ids[fall]); dests.append(idx[fall])
+            kinds.append(np.full(int(fall.sum()), FALL, dtype=np.uint8))
+
+        src = np.concatenate(sources) if sources else np.empty(0, dtype=np.int64)
+        dst = np.concatenate(dests) if dests else np.empty(0, dtype=np.int64)
+        kind = np.concatenate(kinds) if kinds else np.empty(0, dtype=np.uint8)
+        order = np.lexsort((dst, src))
+        offsets = np.zeros(len(nx) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(nx)), out=offsets[1:])
+        return cls(nx, ny, nz, offsets, dst[order], kind[order], source_sha)
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez(f, version=np.int32(FORMAT_VERSION),
+                     x=self.x, y=self.y, z=self.z,
+                     offsets=self.offsets, targets=self.targets, kinds=self.kinds,
+                     source_sha=np.array(self.source_sha or ''))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            if int(f['version']) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported navgraph version {int(f['version'])}")
+            return cls(f['x'], f['y'], f['z'], f['offsets'], f['targets'], f['kinds'],
+                       str(f['source_sha']) or None)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def node_id(self, x, y, z):
+        """Node index for a standing position, or None."""
+        key = pack(x, y, z)
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return i
+        return None
+
+    def position(self, node):
+        return int(self.x[node]), int(self.y[node]), int(self.z[node])
+
+    def neighbors(self, node):
+        """[(target node, kind)] for one node."""
+        a, b = self.offsets[node], self.offsets[node + 1]
+        return list(zip(self.targets[a:b].tolist(), self.kinds[a:b].tolist()))
+
+    def reachable(self, start):
+        """Set of node ids reachable from start."""
+        seen = {start}
+        queue = deque([start])
+        offsets, targets = self.offsets, self.targets
+        while queue:
+            node = queue.popleft()
+            for t in targets[offsets[node]:offsets[node + 1]].tolist():
+                if t not in seen:
+                    seen.add(t)
+                    queue.append(t)
+        return seen
+
+    def path(self, start, goal):
+        """Fewest-steps path as [(x, y, z), ...], or None. Accepts positions."""
+        s, g = self.node_id(*start), self.node_id(*goal)
+        if s is None or g is None:
+            return None
+        previous = {s: None}
+        queue = deque([s])
+        offsets, targets = self.offsets, self.targets
+        while queue:
+            node = queue.popleft()
+            if node == g:
+                steps = []
+                while node is not None:
+                    steps.append(self.position(node))
+                    node = previous[node]
+                return steps[::-1]
+            for t in targets[offsets[node]:offsets[node + 1]].tolist():
+                if t not in previous:
+                    previous[t] = node
+                    queue.append(t)
+        return None
+
+
+# ----------------------------------------------------------------------
+# Map-level helpers
+# ----------------------------------------------------------------------
+
+def graph_path(map_path):
+    return Path(map_path).with_suffix('.navgraph')
+
+
+def _file_sha(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_for_map(map_path):
+    """Build and save the graph for a map file. Returns the graph."""
+    with open(map_path, 'r') as f:
+        data = json.load(f)
+    graph = NavGraph.from_map(data, source_sha=_file_sha(map_path))
+    graph.save(graph_path(map_path))
+    return graph
+
+
+def load_for_map(map_path):
+    """Load the stored graph if it matches the map, otherwise rebuild it."""
+    target = graph_path(map_path)
+    if target.exists():
+        try:
+            graph = NavGraph.load(target)
+            if graph.source_sha == _file_sha(map_path):
+                return graph
+        except (OSError, ValueError, KeyError):
+            pass
+    return build_for_map(map_path)
+
+
+def _parse_position(text):
+    x, y, z = (int(v) for v in text.split(','))
+    return x, y, z
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('build', 'path', 'stats'):
+        print("Usage: python3 story-geometry/navgraph.py <build|stats> <maps>")
+        print("       python3 story-geometry/navgraph.py path <map> <x,y,z> <x,y,z>")
+        print("\nExample:")
+        print("  python3 story-geometry/navgraph.py build test-maps/complete-scene.json")
+        print("  python3 story-geometry/navgraph.py path test-maps/complete-scene.json 0,2,0 23,3,0")
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == 'path':
+        if len(sys.argv) != 5:
+            print("❌ path needs <map> <start x,y,z> <goal x,y,z>")
+            sys.exit(1)
+        graph = load_for_map(sys.argv[2])
+        start, goal = _parse_position(sys.argv[3]), _parse_position(sys.argv[4])
+        for label, pos in (('start', start), ('goal', goal)):
+            if graph.node_id(*pos) is None:
+                print(f"❌ {label} {pos} is not a standing position")
+                sys.exit(1)
+        steps = graph.path(start, goal)
+        if steps is None:
+            print(f"❌ No path from {start} to {goal}")
+            sys.exit(1)
+        print(f"✓ {len(steps) - 1} steps: " + ' → '.join(f"({x},{y},{z})" for x, y, z in steps))
+        sys.exit(0)
+
+    all_ok = True
+    for filepath in sys.argv[2:]:
+        if not Path(filepath).exists():
+            print(f"❌ {filepath}: File not found")
+            all_ok = False
+            continue
+        graph = build_for_map(filepath) if command == 'build' else load_for_map(filepath)
+        counts = np.bincount(graph.kinds, minlength=3)
+        detail = ', '.join(f"{n} {name}" for n, name in zip(counts.tolist(), KIND_NAMES))
+        print(f"✓ {filepath}: {len(graph)} nodes, {graph.edge_count} edges ({detail})")
+
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
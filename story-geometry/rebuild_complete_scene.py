@@ -1,15 +1,19 @@
-import json
+from compose import compose, format_report, layer
+from heightmap import save_map
+from voxel_grid import load_map
 
 # Read updated bridge + meandering floor
-with open('story-geometry/bridge-over-forest-floor.json', 'r') as f:
-    bridge_data = json.load(f)
+bridge_data, bridge_grid = load_map('story-geometry/bridge-over-forest-floor.json')
 
 # Read ruins (already rotated)
-with open('story-geometry/ruins-complete.json', 'r') as f:
-    ruins_data = json.load(f)
+ruins_data, ruins_grid = load_map('story-geometry/ruins-complete.json')
 
-# Combine
-combined_voxels = bridge_data['voxels'] + ruins_data['voxels']
+# Combine (ruins win where cells overlap)
+combined_voxels, overlaps = compose([
+    layer('bridge', bridge_grid),
+    layer('ruins', ruins_grid),
+])
+print('\n'.join(format_report(overlaps)))
 
 # Create complete scene
 complete_scene = {
@@ -18,7 +22,6 @@ complete_scene = {
     'category': 'story-geometry',
     'playerStart': {'x': 0, 'y': 1, 'z': 0},
     'goal': {'x': 23, 'y': 2, 'z': 0},
-    'voxels': combined_voxels,
     'notes': {
         'components': [
             'Rope bridge (X: 0-11) with meandering floor beneath',
@@ -32,15 +35,12 @@ complete_scene = {
 }
 
 # Write files
-with open('story-geometry/complete-scene.json', 'w') as f:
-    json.dump(complete_scene, f, indent=2)
+save_map(complete_scene, combined_voxels,
+         'story-geometry/complete-scene.json',
+         'test-maps/complete-scene.json', heightmap=True)
 
-with open('test-maps/complete-scene.json', 'w') as f:
-    json.dump(complete_scene, f, indent=2)
-
-with open('test-maps/combined-test.json', 'w') as f:
-    json.dump(bridge_data, f, indent=2)
+save_map(bridge_data, None, 'test-maps/combined-test.json')
 
 print(f"Complete scene updated: {len(combined_voxels)} total voxels")
-print(f"- Bridge + meandering floor + side grass: {len(bridge_data['voxels'])}")
-print(f"- Ruins + surrounding: {len(ruins_data['voxels'])}")
+print(f"- Bridge + meandering floor + side grass: {len(bridge_grid)}")
+print(f"- Ruins + surrounding: {len(ruins_grid)}")
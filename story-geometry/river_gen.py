@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Vectorized river generator: every z row of a meandering river is computed
+at once with NumPy instead of voxel by voxel.
+
+A river is described by a dict of parameters; ANCIENT_RIVER and
+PERPENDICULAR_RIVER reproduce ancient_river.py and perpendicular_river.py
+exactly. Override any key for other extents or meanders:
+
+    params = dict(ANCIENT_RIVER, z_range=(-1000, 999), x_range=None)
+
+Per z row (all rows at once):
+    meander     sum of a * sin(z * f) over `meanders`; the center is
+                center_x + int(meander)
+    half width  half_width + int(|first meander term| * width_gain)
+                (outside of bends erodes wider)
+    depth       for d = |x - center|: the first matching `edge_depths`
+                entry (d > half width - n), then `channel_depths`
+                (d < n), else bed_y
+    fill        the first `fill` band with d < n (None = any) keeps cells
+                where (x + z) % m == 0 - sparser towards the banks
+    color       colors[0] where (x*a + z*b) % m < t (color_rule), else
+                colors[1]
+    exclude     (x, z_min, z_max) cells left out (bridge supports)
+    x_range     optional inclusive clip on x
+
+Output comes in z slabs (iter_river) or in square spatial chunks
+(iter_river_chunks) so large valleys never need one giant list of dicts.
+
+Usage:
+    python3 story-geometry/river_gen.py ancient
+    python3 story-geometry/river_gen.py ancient --z -1000 999 --x -1000 999
+    python3 story-geometry/river_gen.py ancient --z -1000 999 --out /tmp/valley-river.json
+    python3 story-geometry/river_gen.py ancient --z -1000 999 --chunks 64 /tmp/river-chunks
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from profiling import stage
+from voxel_grid import VoxelGrid
+
+GREEN = 2263842
+BROWN = 9127187
+
+ANCIENT_RIVER = {
+    'z_range': (-18, 18),
+    'x_range': (-2, 13),
+    'center_x': 5,
+    'meanders': [(3.5, 0.25), (1.2, 0.6)],
+    'half_width': 5,
+    'width_gain': 0.8,
+    'edge_depths': [(2, 0), (4, -1)],
+    'channel_depths': [(2, -2)],
+    'bed_y': -1,
+    'fill': [(3, 1), (6, 2), (None, 3)],
+    'color_rule': (7, 11, 5, 2),
+    'colors': (GREEN, BROWN),
+    'exclude': [(0, -1, 1), (11, -1, 1)],
+}
+
+PERPENDICULAR_RIVER = {
+    'z_range': (-15, 15),
+    'x_range': None,
+    'center_x': 5,
+    'meanders': [(1.5, 0.4)],
+    'half_width': 2,
+    'width_gain': 0.0,
+    'edge_depths': [(1, 0)],
+    'channel_depths': [],
+    'bed_y': -1,
+    'fill': [(2, 1), (None, 2)],
+    'color_rule': (1, 1, 3, 1),
+    'colors': (GREEN, BROWN),
+    'exclude': [(0, -1, 1), (11, -1, 1)],
+}
+
+PRESETS = {'ancient': ANCIENT_RIVER, 'perpendicular': PERPENDICULAR_RIVER}
+
+DEFAULT_SLAB = 4096
+
+
+def river_rows(params, z_lo, z_hi):
+    """(x, y, z, color) int arrays for rows z_lo..z_hi, in z-then-x order."""
+    z = np.arange(z_lo, z_hi + 1, dtype=np.int64)
+    waves = [a * np.sin(z * f) for a, f in params['meanders']]
+    meander = waves[0].copy()
+    for wave in waves[1:]:
+        meander += wave
+    center = params['center_x'] + np.trunc(meander).astype(np.int64)
+    half = params['half_width'] + np.trunc(np.abs(waves[0]) * params['width_gain']).astype(np.int64)
+
+    widest = int(half.max()) if len(half) else 0
+    offsets = np.arange(-widest, widest + 1, dtype=np.int64)
+    shape = (len(z), len(offsets))
+    x = center[:, None] + offsets[None, :]
+    zz = np.broadcast_to(z[:, None], shape)
+    d = np.broadcast_to(np.abs(offsets)[None, :], shape)
+    band = np.broadcast_to(half[:, None], shape)
+    keep = d <= band
+
+    for ex, ez_lo, ez_hi in params['exclude']:
+        keep &= ~((x == ex) & (zz >= ez_lo) & (zz <= ez_hi))
+    if params['x_range'] is not None:
+        keep &= (x >= params['x_range'][0]) & (x <= params['x_range'][1])
+
+    # Fill bands: first band with d < n decides, pattern (x + z) % m == 0
+    xz = x + zz
+    keep &= np.select([np.ones(shape, dtype=bool) if n is None else d < n for n, _ in params['fill']],
+                      [xz % m == 0 for _, m in params['fill']], default=False)
+
+    x, zz, d, band = x[keep], zz[keep], d[keep], band[keep]
+    depth_conditions = [d > band - n for n, _ in params['edge_depths']] + \
+                       [d < n for n, _ in params['channel_depths']]
+    depth_values = [y for _, y in params['edge_depths']] + [y for _, y in params['channel_depths']]
+    y = np.select(depth_conditions, depth_values, default=params['bed_y']) if depth_conditions else \
+        np.full(len(x), params['bed_y'], dtype=np.int64)
+
+    a, b, m, t = params['color_rule']
+    color = np.where((x * a + zz * b) % m < t, params['colors'][0], params['colors'][1])
+    return x, y.astype(np.int64), zz, color.astype(np.int64)
+
+
+def iter_river(params, slab=DEFAULT_SLAB):
+    """Yield (x, y, z, color) arrays slab by slab along z."""
+    z_lo, z_hi = params['z_range']
+    for start in range(z_lo, z_hi + 1, slab):
+        yield river_rows(params, start, min(start + slab - 1, z_hi))
+
+
+def iter_river_chunks(params, chunk=64, slab=None):
+    """
+    Yield ((cx, cz), (x, y, z, color)) for each chunk x chunk column tile
+    (cx = x // chunk) that holds river voxels. Tiles come out slab by slab,
+    so memory stays bounded by one slab.
+    """
+    slab = slab or max(chunk, DEFAULT_SLAB // chunk * chunk)
+    z_lo, z_hi = params['z_range']
+    # Align slabs to chunk rows so a tile is never split across slabs
+    start = z_lo - (z_lo % chunk)
+    while start <= z_hi:
+        stop = min(start + slab - 1, z_hi)
+        x, y, z, color = river_rows(params, max(start, z_lo), stop)
+        if len(x):
+            tile = (x // chunk) * (1 << 32) + (z // chunk)
+            order = np.argsort(tile, kind='stable')
+            tile = tile[order]
+            bounds = np.flatnonzero(np.diff(tile)) + 1
+            for group in np.split(order, bounds):
+                cx, cz = int(x[group[0]] // chunk), int(z[group[0]] // chunk)
+                yield (cx, cz), (x[group], y[group], z[group], color[group])
+        start += slab
+
+
+def river_grid(params):
+    """The whole river as a VoxelGrid."""
+    grid = VoxelGrid()
+    with stage('river') as s:
+        for x, y, z, color in iter_river(params):
+            grid.add_arrays(x, y, z, color)
+        s.voxels_out = len(grid)
+    return grid
+
+
+def _arrays_to_voxels(x, y, z, color):
+    return [{'x': a, 'y': b, 'z': c, 'color': d}
+            for a, b, c, d in zip(x.tolist(), y.tolist(), z.tolist(), color.tolist())]
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in PRESETS:
+        print("Usage: python3 story-geometry/river_gen.py <ancient|perpendicular> "
+              "[--z LO HI] [--x LO HI|none] [--out map.json] [--chunks N DIR]")
+        print("\nExample:")
+        print("  python3 story-geometry/river_gen.py ancient --z -1000 999 --x -1000 999")
+        print("  python3 story-geometry/river_gen.py ancient --z -1000 999 --chunks 64 /tmp/river-chunks")
+        sys.exit(1)
+
+    params = dict(PRESETS[args[0]])
+    out_path = chunk_dir = None
+    chunk = 64
+    i = 1
+    while i < len(args):
+        if args[i] == '--z':
+            params['z_range'] = (int(args[i + 1]), int(args[i + 2]))
+            i += 3
+        elif args[i] == '--x':
+            if args[i + 1] == 'none':
+                params['x_range'] = None
+                i += 2
+            else:
+                params['x_range'] = (int(args[i + 1]), int(args[i + 2]))
+                i += 3
+        elif args[i] == '--out':
+            out_path = args[i + 1]
+            i += 2
+        elif args[i] == '--chunks':
+            chunk, chunk_dir = int(args[i + 1]), Path(args[i + 2])
+            i += 3
+        else:
+            print(f"❌ Unknown option {args[i]}")
+            sys.exit(1)
+
+    start = time.perf_counter()
+    if chunk_dir:
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+        total = tiles = 0
+        for (cx, cz), arrays in iter_river_chunks(params, chunk):
+            with open(chunk_dir / f"river_{cx}_{cz}.json", 'w') as f:
+                json.dump({'chunk': [cx, cz], 'chunkSize': chunk,
+                           'voxels': _arrays_to_voxels(*arrays)}, f)
+            total += len(arrays[0])
+            tiles += 1
+        print(f"✓ {args[0]} river: {total} voxels in {tiles} chunks → {chunk_dir} "
+              f"({time.perf_counter() - start:.2f}s)")
+        sys.exit(0)
+
+    grid = river_grid(params)
+    elapsed = time.perf_counter() - start
+    print(f"✓ {args[0]} river: {len(grid)} voxels, z {params['z_range']}, "
+          f"x {params['x_range'] or 'unclipped'} in {elapsed * 1000:.0f}ms")
+    if out_path:
+        with open(out_path, 'w') as f:
+            json.dump({'name': f"{args[0].capitalize()} River", 'category': 'story-geometry',
+                       'voxels': grid.to_voxels()}, f, indent=2)
+        print(f"  wrote {out_path}")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,9 @@
-import json
+from heightmap import save_map
+from transform import Transform
+from voxel_grid import load_map
 
 # Read the original ruins
-with open('story-geometry/ruins-complete.json', 'r') as f:
-    ruins = json.load(f)
+ruins, ruins_grid = load_map('story-geometry/ruins-complete.json')
 
 # Rotation center (approximate center of current ruins)
 center_x = 17
@@ -11,25 +12,10 @@ center_z = 0
 # Translation offset (push back from bridge)
 x_offset = 3
 
-# Transform each voxel
-transformed_voxels = []
-for voxel in ruins['voxels']:
-    old_x = voxel['x']
-    old_z = voxel['z']
-    
-    # Rotate 180 degrees around center
-    new_x = 2 * center_x - old_x
-    new_z = 2 * center_z - old_z
-    
-    # Translate away from bridge
-    new_x += x_offset
-    
-    transformed_voxels.append({
-        'x': new_x,
-        'y': voxel['y'],
-        'z': new_z,
-        'color': voxel['color']
-    })
+# Transform all voxels at once: rotate 180 degrees around center,
+# then translate away from bridge
+ruins_transform = Transform().rotate('y', 180, pivot=(center_x, 0, center_z)).translate(x_offset, 0, 0)
+transformed_voxels = ruins_transform.apply(ruins_grid)
 
 # Add scattered rubble on periphery (cobblestone single blocks)
 rubble_positions = [
@@ -40,10 +26,7 @@ rubble_positions = [
 ]
 
 for x, y, z in rubble_positions:
-    transformed_voxels.append({
-        'x': x, 'y': y, 'z': z,
-        'color': 11184810  # cobblestone
-    })
+    transformed_voxels.add(x, y, z, 11184810)  # cobblestone
 
 # Add grass surrounding (green and brown pattern like forest floor)
 grass_positions = [
@@ -57,17 +40,12 @@ grass_positions = [
 ]
 
 for x, y, z in grass_positions:
-    # Check if position doesn't conflict with ruins
-    if not any(v['x'] == x and v['y'] == y and v['z'] == z for v in transformed_voxels):
-        # Alternate between green and brown
-        color = 2263842 if (x + z) % 2 == 0 else 9127187
-        transformed_voxels.append({
-            'x': x, 'y': y, 'z': z,
-            'color': color
-        })
+    # Alternate between green and brown, only where it doesn't conflict
+    # with ruins (O(1) occupancy check)
+    color = 2263842 if (x + z) % 2 == 0 else 9127187
+    transformed_voxels.add_if_empty(x, y, z, color)
 
 # Update structure
-ruins['voxels'] = transformed_voxels
 ruins['description'] = "Rotated 180° and pushed back from bridge. Wooden hiding area now at back. Surrounded by grass and scattered rubble."
 ruins['notes']['rotation_applied'] = "180 degrees around center (17, 0)"
 ruins['notes']['translation'] = "+3 in X direction (away from bridge)"
@@ -82,8 +60,7 @@ ruins['notes']['structure_breakdown']['standing_tower_base']['features'][1] = "E
 ruins['notes']['structure_breakdown']['standing_tower_base']['features'][4] = "Dark interior space below mezzanine at back (anomaly hiding spot)"
 
 # Write updated ruins
-with open('story-geometry/ruins-complete.json', 'w') as f:
-    json.dump(ruins, f, indent=2)
+save_map(ruins, transformed_voxels, 'story-geometry/ruins-complete.json')
 
 print(f"Transformed {len(transformed_voxels)} voxels")
 print(f"Rotation: 180° around ({center_x}, {center_z})")
@@ -1,19 +1,19 @@
-import json
+import numpy as np
+
+from heightmap import save_map
+from voxel_grid import load_map
 
 # Read current "bridge" (actually floating ship)
-with open('story-geometry/bridge-over-forest-floor.json', 'r') as f:
-    data = json.load(f)
+data, grid = load_map('story-geometry/bridge-over-forest-floor.json')
 
 # Extract just the developed bridge structure
-ship_voxels = [v for v in data['voxels'] 
-               if v['color'] in [11184810, 9127187, 16744192]]
+ship_voxels = grid.select(np.isin(grid.color, [11184810, 9127187, 16744192]))
 
 # Create floating ship artifact
 floating_ship = {
     'name': 'Floating Ship Structure',
     'description': 'Unintentional ship-like structure from bridge development. Suspended wooden planks with torches - could be airship, floating platform, or sky vessel.',
     'category': 'artifacts',
-    'voxels': ship_voxels,
     'notes': {
         'origin': 'Created 2026-01-30 during bridge development',
         'why_saved': 'Looks like floating ship rather than grounded bridge',
@@ -40,11 +40,9 @@ floating_ship = {
     }
 }
 
-with open('story-geometry/floating-ship.json', 'w') as f:
-    json.dump(floating_ship, f, indent=2)
-
-with open('test-maps/floating-ship.json', 'w') as f:
-    json.dump(floating_ship, f, indent=2)
+save_map(floating_ship, ship_voxels,
+         'story-geometry/floating-ship.json',
+         'test-maps/floating-ship.json', heightmap=True)
 
 print(f"Saved floating ship: {len(ship_voxels)} voxels")
 print("Location: story-geometry/floating-ship.json")
@@ -0,0 +1,363 @@
+"""
+Chunked sparse spatial index for region and neighborhood queries.
+
+The world is cut into 16x16x16 chunks held in a dict keyed on chunk
+coordinates, so empty space costs nothing and a query only touches the
+chunks its region overlaps - cost scales with the region, not the scene.
+Each chunk keeps an occupancy bitset (one uint16 per (x, y) column, one
+bit per z) plus a color array for the occupied cells.
+
+index.html mirrors this layout in ChunkedTerrain (game.terrain).
+
+    from voxel_grid import load_map
+    from spatial_index import SpatialIndex
+
+    data, grid = load_map('story-geometry/complete-scene.json')
+    index = SpatialIndex.from_grid(grid)
+    xs, ys, zs, colors = index.query_box((16, -2, -10), (24, 5, 10))
+    under_bridge = index.query_column(5, 0, y_max=0)
+"""
+
+import numpy as np
+
+CHUNK_BITS = 4
+CHUNK_SIZE = 1 << CHUNK_BITS
+CHUNK_MASK = CHUNK_SIZE - 1
+
+_Z_BITS = np.left_shift(np.uint16(1), np.arange(CHUNK_SIZE, dtype=np.uint16))
+
+# Neighbor offsets: faces only, or faces + edges + corners
+NEIGHBORS_6 = [(-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0), (0, 0, -1), (0, 0, 1)]
+NEIGHBORS_26 = [(dx, dy, dz)
+                for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+                if (dx, dy, dz) != (0, 0, 0)]
+
+
+class _Chunk:
+    """One 16^3 block: occupancy bitset + colors (valid where the bit is set)."""
+
+    __slots__ = ('bits', 'colors', 'count')
+
+    def __init__(self):
+        self.bits = np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=np.uint16)
+        self.colors = np.zeros((CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE), dtype=np.int64)
+        self.count = 0
+
+    def recount(self):
+        self.count = int(np.unpackbits(self.bits.view(np.uint8)).sum())
+
+    def occupancy(self, x0, x1, y0, y1, z0, z1):
+        """Bool array for the local sub-box [x0:x1, y0:y1, z0:z1]."""
+        bits = self.bits[x0:x1, y0:y1, None]
+        return (bits & _Z_BITS[z0:z1]) != 0
+
+
+def _empty_result():
+    empty = np.empty(0, dtype=np.int32)
+    return empty, empty, empty, np.empty(0, dtype=np.int64)
+
+
+def _concat(parts):
+    if not parts:
+        return _empty_result()
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+class SpatialIndex:
+    """Sparse voxel set: {chunk coords: _Chunk}."""
+
+    def __init__(self):
+        self._chunks = {}
+        # (cx, cz) -> set of cy, so column queries skip empty layers
+        self._columns = {}
+        self._size = 0
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_arrays(cls, xs, ys, zs, colors):
+        index = cls()
+        index.insert_arrays(xs, ys, zs, colors)
+        return index
+
+    @classmethod
+    def from_grid(cls, grid):
+        """Index every voxel of a VoxelGrid."""
+        return cls.from_arrays(grid.x, grid.y, grid.z, grid.color)
+
+    @classmethod
+    def from_voxels(cls, voxels):
+        """Index a list of {'x','y','z','color'} dicts (map JSON)."""
+        voxels = list(voxels)
+        return cls.from_arrays([v['x'] for v in voxels], [v['y'] for v in voxels],
+                               [v['z'] for v in voxels], [v.get('color', 0) for v in voxels])
+
+    # ------------------------------------------------------------------
+    # Point access
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, xyz):
+        return self.has(*xyz)
+
+    @property
+    def chunk_count(self):
+        return len(self._chunks)
+
+    def chunk_keys(self):
+        return list(self._chunks)
+
+    def has(self, x, y, z):
+        chunk = self._chunks.get((x >> CHUNK_BITS, y >> CHUNK_BITS, z >> CHUNK_BITS))
+        if chunk is None:
+            return False
+        return bool(chunk.bits[x & CHUNK_MASK, y & CHUNK_MASK] >> (z & CHUNK_MASK) & 1)
+
+    def get(self, x, y, z, default=None):
+        """Color at (x, y, z), or default if the cell is empty."""
+        chunk = self._chunks.get((x >> CHUNK_BITS, y >> CHUNK_BITS, z >> CHUNK_BITS))
+        lx, ly, lz = x & CHUNK_MASK, y & CHUNK_MASK, z & CHUNK_MASK
+        if chunk is None or not chunk.bits[lx, ly] >> lz & 1:
+            return default
+        return int(chunk.colors[lx, ly, lz])
+
+    def insert(self, x, y, z, color):
+        """Place or recolor one voxel. Returns True if the cell was empty."""
+        key = (x >> CHUNK_BITS, y >> CHUNK_BITS, z >> CHUNK_BITS)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._add_chunk(key)
+        lx, ly, lz = x & CHUNK_MASK, y & CHUNK_MASK, z & CHUNK_MASK
+        chunk.colors[lx, ly, lz] = color
+        if chunk.bits[lx, ly] >> lz & 1:
+            return False
+        chunk.bits[lx, ly] |= np.uint16(1 << lz)
+        chunk.count += 1
+        self._size += 1
+        return True
+
+    def remove(self, x, y, z):
+        """Remove one voxel. Returns True if one was there."""
+        key = (x >> CHUNK_BITS, y >> CHUNK_BITS, z >> CHUNK_BITS)
+        chunk = self._chunks.get(key)
+        lx, ly, lz = x & CHUNK_MASK, y & CHUNK_MASK, z & CHUNK_MASK
+        if chunk is None or not chunk.bits[lx, ly] >> lz & 1:
+            return False
+        chunk.bits[lx, ly] &= np.uint16(~(1 << lz) & 0xffff)
+        chunk.count -= 1
+        self._size -= 1
+        if chunk.count == 0:
+            self._drop_chunk(key)
+        return True
+
+    def _add_chunk(self, key):
+        chunk = self._chunks[key] = _Chunk()
+        self._columns.setdefault((key[0], key[2]), set()).add(key[1])
+        return chunk
+
+    def _drop_chunk(self, key):
+        del self._chunks[key]
+        layers = self._columns[(key[0], key[2])]
+        layers.discard(key[1])
+        if not layers:
+            del self._columns[(key[0], key[2])]
+
+    # ------------------------------------------------------------------
+    # Bulk insert / delete
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _group_by_chunk(xs, ys, zs):
+        """Yield (chunk key, row indices) for coordinate arrays."""
+        cx, cy, cz = xs >> CHUNK_BITS, ys >> CHUNK_BITS, zs >> CHUNK_BITS
+        order = np.lexsort((cz, cy, cx))
+        cx, cy, cz = cx[order], cy[order], cz[order]
+        breaks = np.flatnonzero((np.diff(cx) != 0) | (np.diff(cy) != 0) | (np.diff(cz) != 0)) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.concatenate((breaks, [len(order)]))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            yield (int(cx[start]), int(cy[start]), int(cz[start])), order[start:end]
+
+    def insert_arrays(self, xs, ys, zs, colors):
+        """
+        Bulk insert. Later entries win for duplicate cells, matching
+        insert() in a loop. Returns the number of newly occupied cells.
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        zs = np.asarray(zs, dtype=np.int64)
+        colors = np.asarray(colors, dtype=np.int64)
+        if len(xs) == 0:
+            return 0
+        added = 0
+        for key, rows in self._group_by_chunk(xs, ys, zs):
+            rows = np.sort(rows)  # keep input order so the last write wins
+            chunk = self._chunks.get(key)
+            if chunk is None:
+                chunk = self._add_chunk(key)
+            lx, ly, lz = xs[rows] & CHUNK_MASK, ys[rows] & CHUNK_MASK, zs[rows] & CHUNK_MASK
+            chunk.colors[lx, ly, lz] = colors[rows]
+            np.bitwise_or.at(chunk.bits, (lx, ly), _Z_BITS[lz])
+            before = chunk.count
+            chunk.recount()
+            added += chunk.count - before
+        self._size += added
+        return added
+
+    def remove_arrays(self, xs, ys, zs):
+        """Bulk delete. Returns the number of voxels actually removed."""
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        zs = np.asarray(zs, dtype=np.int64)
+        if len(xs) == 0:
+            return 0
+        removed = 0
+        for key, rows in self._group_by_chunk(xs, ys, zs):
+            chunk = self._chunks.get(key)
+            if chunk is None:
+                continue
+            lx, ly, lz = xs[rows] & CHUNK_MASK, ys[rows] & CHUNK_MASK, zs[rows] & CHUNK_MASK
+            np.bitwise_and.at(chunk.bits, (lx, ly), ~_Z_BITS[lz])
+            before = chunk.count
+            chunk.recount()
+            removed += before - chunk.count
+            if chunk.count == 0:
+                self._drop_chunk(key)
+        self._size -= removed
+        return removed
+
+    def contains_arrays(self, xs, ys, zs):
+        """Vectorized has(): bool array, one entry per coordinate."""
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        zs = np.asarray(zs, dtype=np.int64)
+        result = np.zeros(len(xs), dtype=bool)
+        if len(xs) == 0:
+            return result
+        for key, rows in self._group_by_chunk(xs, ys, zs):
+            chunk = self._chunks.get(key)
+            if chunk is not None:
+                bits = chunk.bits[xs[rows] & CHUNK_MASK, ys[rows] & CHUNK_MASK]
+                result[rows] = (bits & _Z_BITS[zs[rows] & CHUNK_MASK]) != 0
+        return result
+
+    # ------------------------------------------------------------------
+    # Region queries - all return (xs, ys, zs, colors) arrays
+    # ------------------------------------------------------------------
+
+    def _chunks_in_box(self, lo, hi):
+        """(key, chunk) pairs overlapping the inclusive box lo..hi."""
+        clo = [v >> CHUNK_BITS for v in lo]
+        chi = [v >> CHUNK_BITS for v in hi]
+        span = (chi[0] - clo[0] + 1) * (chi[1] - clo[1] + 1) * (chi[2] - clo[2] + 1)
+        if span > len(self._chunks):
+            # Box bigger than the populated world: walk what exists
+            for key, chunk in self._chunks.items():
+                if all(clo[i] <= key[i] <= chi[i] for i in range(3)):
+                    yield key, chunk
+            return
+        for cx in range(clo[0], chi[0] + 1):
+            for cy in range(clo[1], chi[1] + 1):
+                for cz in range(clo[2], chi[2] + 1):
+                    chunk = self._chunks.get((cx, cy, cz))
+                    if chunk is not None:
+                        yield (cx, cy, cz), chunk
+
+    def query_box(self, lo, hi):
+        """Every voxel with lo <= (x, y, z) <= hi (inclusive on both ends)."""
+        lo = [int(v) for v in lo]
+        hi = [int(v) for v in hi]
+        if any(lo[i] > hi[i] for i in range(3)):
+            return _empty_result()
+        parts = []
+        for key, chunk in self._chunks_in_box(lo, hi):
+            base = [k << CHUNK_BITS for k in key]
+            # Local slice of this chunk inside the box
+            a = [max(lo[i] - base[i], 0) for i in range(3)]
+            b = [min(hi[i] - base[i], CHUNK_MASK) + 1 for i in range(3)]
+            occupied = chunk.occupancy(a[0], b[0], a[1], b[1], a[2], b[2])
+            lx, ly, lz = np.nonzero(occupied)
+            if len(lx) == 0:
+                continue
+            lx, ly, lz = lx + a[0], ly + a[1], lz + a[2]
+            parts.append(((lx + base[0]).astype(np.int32), (ly + base[1]).astype(np.int32),
+                          (lz + base[2]).astype(np.int32), chunk.colors[lx, ly, lz]))
+        return _concat(parts)
+
+    def query_column(self, x, z, y_min=None, y_max=None):
+        """(ys, colors) of the voxels at (x, z), sorted by y."""
+        layers = self._columns.get((x >> CHUNK_BITS, z >> CHUNK_BITS))
+        if not layers:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        lx, lz = x & CHUNK_MASK, z & CHUNK_MASK
+        ys, colors = [], []
+        for cy in sorted(layers):
+            chunk = self._chunks[(x >> CHUNK_BITS, cy, z >> CHUNK_BITS)]
+            ly = np.flatnonzero((chunk.bits[lx, :] >> lz) & 1)
+            ys.append(ly + (cy << CHUNK_BITS))
+            colors.append(chunk.colors[lx, ly, lz])
+        ys = np.concatenate(ys).astype(np.int32)
+        colors = np.concatenate(colors)
+        keep = np.ones(len(ys), dtype=bool)
+        if y_min is not None:
+            keep &= ys >= y_min
+        if y_max is not None:
+            keep &= ys <= y_max
+        return ys[keep], colors[keep]
+
+    def query_sphere(self, center, radius):
+        """Every voxel whose cell center is within radius of center."""
+        cx, cy, cz = center
+        r = int(np.ceil(radius))
+        xs, ys, zs, colors = self.query_box(
+            (int(np.floor(cx)) - r, int(np.floor(cy)) - r, int(np.floor(cz)) - r),
+            (int(np.floor(cx)) + r, int(np.floor(cy)) + r, int(np.floor(cz)) + r))
+        inside = (xs - cx) ** 2 + (ys - cy) ** 2 + (zs - cz) ** 2 <= radius * radius
+        return xs[inside], ys[inside], zs[inside], colors[inside]
+
+    def neighbors(self, x, y, z, connectivity=6):
+        """[(x, y, z, color)] of occupied cells adjacent to (x, y, z)."""
+        if connectivity not in (6, 26):
+            raise ValueError(f"connectivity must be 6 or 26, got {connectivity}")
+        offsets = NEIGHBORS_6 if connectivity == 6 else NEIGHBORS_26
+        found = []
+        for dx, dy, dz in offsets:
+            color = self.get(x + dx, y + dy, z + dz)
+            if color is not None:
+                found.append((x + dx, y + dy, z + dz, color))
+        return found
+
+    def neighbor_counts(self, xs, ys, zs, connectivity=6):
+        """Vectorized count of occupied neighbors for each coordinate."""
+        if connectivity not in (6, 26):
+            raise ValueError(f"connectivity must be 6 or 26, got {connectivity}")
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        zs = np.asarray(zs, dtype=np.int64)
+        counts = np.zeros(len(xs), dtype=np.int32)
+        for dx, dy, dz in (NEIGHBORS_6 if connectivity == 6 else NEIGHBORS_26):
+            counts += self.contains_arrays(xs + dx, ys + dy, zs + dz)
+        return counts
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def to_arrays(self):
+        """(xs, ys, zs, colors) for every voxel, chunk by chunk."""
+        parts = []
+        for key, chunk in self._chunks.items():
+            lx, ly, lz = np.nonzero(chunk.occupancy(0, CHUNK_SIZE, 0, CHUNK_SIZE, 0, CHUNK_SIZE))
+            parts.append(((lx + (key[0] << CHUNK_BITS)).astype(np.int32),
+                          (ly + (key[1] << CHUNK_BITS)).astype(np.int32),
+                          (lz + (key[2] << CHUNK_BITS)).astype(np.int32),
+                          chunk.colors[lx, ly, lz]))
+        return _concat(parts)
+
+    def to_grid(self):
+        from voxel_grid import VoxelGrid
+        return VoxelGrid.from_arrays(*self.to_arrays())
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic stress maps at any scale, streamed straight to disk.
+
+The output is an ordinary map (the test-maps schema, indent=2 JSON, byte for
+byte what json.dump would write) with:
+
+    voxels          N cells on a W x W area (W = ceil(sqrt(N))), one x-slab
+                    at a time: land at y 0..3 colored by the distribution,
+                    water at y -2..-1 (WATER) for the requested fraction
+    characterGroup  K characters, each with an L-entry actionQueue (random
+                    walk of moves with occasional waits), standing on the
+                    land at y 4 like playerStart and goal
+    barriers        B rope railings: northSide and southSide (read by
+                    index.html), then railing3, railing4, ... (parse load only)
+    notes           the generator parameters, so a map can be regenerated
+
+Every slab has its own generator seeded from (seed, slab), so output size
+does not change memory use: a 50M-voxel (~4 GB) map is written with a few
+MB of RAM. Cells come out in (x, y, z) order, so --columnar writes the
+canonical columnar layout (voxel_layout.py) in one pass per column.
+--hex-every N writes every N-th color as a 0x literal (invalid JSON, for
+fix-hex-colors.py and validator error paths).
+
+    from stress_map import DEFAULTS, write_map
+    stats = write_map('/tmp/stress.json', dict(DEFAULTS, voxels=1_000_000, characters=16))
+
+Usage:
+    python3 story-geometry/stress_map.py /tmp/stress.json --voxels 10m --characters 32 --actions 500
+    python3 story-geometry/stress_map.py /tmp/stress.json --voxels 1m --colors grass:0.5,stone:0.5 --water 0.3
+    python3 story-geometry/stress_map.py /tmp/stress.json --voxels 50m --columnar --seed 7
+"""
+
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+COLORS = {'grass': 2263842, 'dirt': 9127187, 'stone': 11184810, 'sand': 15787660, 'snow': 16777215}
+WATER = 255
+LAND_Y = (0, 4)     # y range [lo, hi) for land voxels
+WATER_Y = (-2, 0)   # y range [lo, hi) for water voxels
+
+DEFAULTS = {
+    'voxels': 100_000,
+    'colors': {'grass': 0.6, 'dirt': 0.25, 'stone': 0.15},
+    'characters': 4,
+    'actions': 100,
+    'barriers': 2,
+    'water': 0.1,
+    'seed': 1,
+    'columnar': False,
+    'hex_every': 0,
+}
+
+
+def _palette(params):
+    """(colors int array, probabilities) for land voxels."""
+    names = list(params['colors'])
+    weights = np.array([params['colors'][n] for n in names], dtype=float)
+    if not len(names) or weights.min() < 0 or weights.sum() <= 0:
+        raise ValueError("Color distribution needs at least one positive weight")
+    colors = np.array([COLORS[n] if n in COLORS else int(n) for n in names], dtype=np.int64)
+    return colors, weights / weights.sum()
+
+
+def slab_counts(params):
+    """(width, voxels per x-slab, water voxels per x-slab)."""
+    n = params['voxels']
+    width = max(4, math.ceil(math.sqrt(n)))
+    cumulative = np.arange(width + 1) * n // width
+    water_cumulative = np.round(cumulative * params['water']).astype(np.int64)
+    return width, np.diff(cumulative), np.diff(water_cumulative)
+
+
+def iter_slabs(params):
+    """Yield (xs, ys, zs, colors) per x-slab in (x, y, z) order."""
+    width, counts, water = slab_counts(params)
+    palette, probabilities = _palette(params)
+    half = width // 2
+    land_rows, water_rows = LAND_Y[1] - LAND_Y[0], WATER_Y[1] - WATER_Y[0]
+    for i in range(width):
+        if counts[i] == 0:
+            continue
+        rng = np.random.default_rng((params['seed'], 0, i))
+        wet = np.sort(rng.choice(water_rows * width, water[i], replace=False))
+        dry = np.sort(rng.choice(land_rows * width, counts[i] - water[i], replace=False))
+        ys = np.concatenate([WATER_Y[0] + wet // width, LAND_Y[0] + dry // width])
+        zs = np.concatenate([wet % width, dry % width]) - half
+        colors = np.concatenate([np.full(len(wet), WATER, dtype=np.int64),
+                                 palette[rng.choice(len(palette), len(dry), p=probabilities)]])
+        yield np.full(counts[i], i - half, dtype=np.int64), ys, zs, colors
+
+
+def characters(params):
+    """Yield character dicts (the schema of characterGroup.characters)."""
+    width = slab_counts(params)[0]
+    half = width // 2
+    for k in range(params['characters']):
+        rng = np.random.default_rng((params['seed'], 1, k))
+        x, z = (int(v) for v in rng.integers(-half, width - half, 2))
+        start = {'x': x, 'y': LAND_Y[1], 'z': z}
+        queue = []
+        steps = rng.integers(-1, 2, (params['actions'], 2)).tolist()
+        waits = (rng.random(params['actions']) < 0.1).tolist()
+        for (dx, dz), wait in zip(steps, waits):
+            if wait:
+                queue.append({'type': 'wait', 'duration': 500})
+                continue
+            x = min(max(x + dx, -half), width - half - 1)
+            z = min(max(z + dz, -half), width - half - 1)
+            queue.append({'type': 'move', 'to': {'x': x, 'y': start['y'], 'z': z}})
+        colors = [int(c) for c in rng.integers(0, 1 << 24, 3)]
+        yield {'id': f'stress-{k + 1:04d}', 'name': f'Stress {k + 1}', 'startPosition': start,
+               'colors': {'boots': colors[0], 'body': colors[1], 'head': colors[2]},
+               'actionQueue': queue}
+
+
+def barriers(params):
+    width = slab_counts(params)[0]
+    half = width // 2
+    rng = np.random.default_rng((params['seed'], 2))
+    railings = {'note': f"{params['barriers']} synthetic rope railings"}
+    for b in range(params['barriers']):
+        name = ('northSide', 'southSide')[b] if b < 2 else f'railing{b + 1}'
+        x_min = int(rng.integers(-half, width - half))
+        z_line = round(float(rng.integers(-half, width - half)) + (-0.45 if b % 2 == 0 else 0.45), 2)
+        railings[name] = {'xMin': x_min, 'xMax': x_min + int(rng.integers(1, 32)), 'zLine': z_line,
+                          'description': f"Synthetic railing {b + 1}"}
+    return {'ropeRailings': railings}
+
+
+# ----------------------------------------------------------------------
+# Streaming writer (matches json.dump(indent=2) byte for byte)
+# ----------------------------------------------------------------------
+
+def _nested(value, depth):
+    """json.dumps(value, indent=2) as it appears at nesting depth."""
+    return json.dumps(value, indent=2).replace('\n', '\n' + '  ' * depth)
+
+
+def _object_rows(xs, ys, zs, colors, hex_every, offset):
+    if hex_every:
+        color_text = [f"0x{c:06x}" if (offset + i) % hex_every == 0 else str(c)
+                      for i, c in enumerate(colors.tolist())]
+    else:
+        color_text = colors.tolist()
+    return [f'    {{\n      "x": {x},\n      "y": {y},\n      "z": {z},\n      "color": {c}\n    }}'
+            for x, y, z, c in zip(xs.tolist(), ys.tolist(), zs.tolist(), color_text)]
+
+
+def _write_list(f, rows_iter, indent):
+    """Write a JSON list of pre-rendered rows: '[' rows... ']' or '[]'."""
+    first = True
+    for rows in rows_iter:
+        if not rows:
+            continue
+        f.write(('[\n' if first else ',\n') + ',\n'.join(rows))
+        first = False
+    f.write('[]' if first else '\n' + indent + ']')
+
+
+def _write_voxels(f, params):
+    if not params['columnar']:
+        offset = 0
+
+        def rows():
+            nonlocal offset
+            for xs, ys, zs, colors in iter_slabs(params):
+                yield _object_rows(xs, ys, zs, colors, params['hex_every'], offset)
+                offset += len(xs)
+
+        _write_list(f, rows(), '  ')
+        return
+
+    # Columnar: one pass over the slabs per column; palette first so c can index it
+    used = set()
+    for *_, colors in iter_slabs(params):
+        used.update(np.unique(colors).tolist())
+    palette = np.array(sorted(used), dtype=np.int64)
+    f.write('{')
+    for n, column in enumerate(('x', 'y', 'z', 'c')):
+        f.write(('\n' if n == 0 else ',\n') + f'    "{column}": ')
+
+        def rows(n=n, column=column):
+            for slab in iter_slabs(params):
+                values = np.searchsorted(palette, slab[3]) if column == 'c' else slab[n]
+                yield [f'      {v}' for v in values.tolist()]
+
+        _write_list(f, rows(), '    ')
+    f.write(',\n    "palette": ')
+    _write_list(f, [[f'      {c}' for c in palette.tolist()]], '    ')
+    f.write('\n  }')
+
+
+def header(params):
+    """Map keys before the voxels."""
+    width = slab_counts(params)[0]
+    return {
+        'name': f"Stress map ({params['voxels']} voxels, seed {params['seed']})",
+        'description': 'Synthetic scale-test map written by story-geometry/stress_map.py',
+        'category': 'stress',
+        'playerStart': {'x': 0, 'y': LAND_Y[1], 'z': 0},
+        'goal': {'x': width // 2 - 1, 'y': LAND_Y[1], 'z': 0},
+    }
+
+
+def write_map(path, params):
+    """Stream a stress map to path. Returns {'bytes', 'voxels', 'seconds'}."""
+    params = dict(DEFAULTS, **params)
+    if params['columnar'] and params['hex_every']:
+        raise ValueError("--hex-every only applies to the object layout")
+    start = time.perf_counter()
+    notes = {'generator': 'stress_map.py',
+             'params': {k: v for k, v in params.items() if k != 'columnar'}}
+    with open(path, 'w') as f:
+        text = json.dumps(header(params), indent=2)
+        f.write(text[:-2] + ',\n  "voxels": ')
+        _write_voxels(f, params)
+        if params['characters']:
+            f.write(',\n  "cutsceneMode": true,\n  "characterGroup": {\n    "characters": ')
+            _write_list(f, ([_nested(c, 3).join(['      ', ''])] for c in characters(params)), '    ')
+            f.write('\n  }')
+        if params['barriers']:
+            f.write(',\n  "barriers": ' + _nested(barriers(params), 1))
+        f.write(',\n  "notes": ' + _nested(notes, 1) + '\n}')
+        size = f.tell()
+    return {'bytes': size, 'voxels': params['voxels'], 'seconds': time.perf_counter() - start}
+
+
+def parse_count(text):
+    """'250k', '10m', '2b' or a plain integer."""
+    scale = {'k': 10 ** 3, 'm': 10 ** 6, 'b': 10 ** 9}.get(text[-1:].lower())
+    return int(float(text[:-1]) * scale) if scale else int(text)
+
+
+def parse_colors(text):
+    """'grass:0.6,stone:0.4' or '2263842:1' -> {name: weight}."""
+    colors = {}
+    for part in text.split(','):
+        name, _, weight = part.partition(':')
+        if name not in COLORS and not name.isdigit():
+            raise ValueError(f"Unknown color {name!r} (use {', '.join(COLORS)} or a decimal color)")
+        colors[name] = float(weight or 1)
+    return colors
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0].startswith('--'):
+        print("Usage: python3 story-geometry/stress_map.py <out.json> [--voxels N] [--colors name:w,...] "
+              "[--characters K] [--actions L] [--barriers B] [--water F] [--seed S] [--columnar] [--hex-every N]")
+        print("\nExample:")
+        print("  python3 story-geometry/stress_map.py /tmp/stress.json --voxels 10m --characters 32 --actions 500")
+        sys.exit(1)
+
+    out_path, params = args[0], dict(DEFAULTS)
+    options = args[1:]
+    try:
+        while options:
+            option = options.pop(0)
+            if option == '--columnar':
+                params['columnar'] = True
+                continue
+            value = options.pop(0)
+            if option == '--voxels':
+                params['voxels'] = parse_count(value)
+            elif option == '--colors':
+                params['colors'] = parse_colors(value)
+            elif option in ('--characters', '--actions', '--barriers', '--hex-every'):
+                params[option[2:].replace('-', '_')] = parse_count(value)
+            elif option == '--water':
+                params['water'] = float(value)
+            elif option == '--seed':
+                params['seed'] = int(value)
+            else:
+                raise ValueError(f"Unknown option {option}")
+        if not 0 <= params['water'] <= 1:
+            raise ValueError("--water must be between 0 and 1")
+        stats = write_map(out_path, params)
+    except (ValueError, IndexError, OSError) as error:
+        print(f"❌ {error}")
+        sys.exit(1)
+
+    mb = stats['bytes'] / 1e6
+    print(f"✓ {out_path}: {stats['voxels']} voxels, {params['characters']} characters x "
+          f"{params['actions']} actions, {params['barriers']} barriers - {mb:.1f} MB in "
+          f"{stats['seconds']:.1f}s ({mb / max(stats['seconds'], 1e-9):.0f} MB/s)")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
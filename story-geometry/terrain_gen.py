@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Deterministic, seeded terrain generator that bakes worlds into streamable
+region files (the map_regions.py layout).
+
+Every random choice comes from hash32(x, z, seed, salt), an integer hash of
+world coordinates, instead of a random stream. A region is therefore a pure
+function of (params, region key): regions can be generated in any order, in
+parallel, and come out identical for a given seed. hash32 uses 32-bit
+arithmetic only, so index.html's createTerrain() draws the same pillars from
+the same seed.
+
+Column height (floor of the sum, columns are filled from y=0 up):
+    classic   weight of createTerrain()'s sin(x*0.3)*2 + cos(z*0.3)*2 +
+              sin(dist*0.2)*3 hills
+    octaves   [(scale, amplitude)] of seeded value noise in [-1, 1]
+Pillars: with pillar_chance per column, pillar_height (lo, hi) voxels on top.
+Colors follow createVoxel()'s height bands (greedy_mesh.default_color).
+
+Worlds are cached by seed: test-maps/terrain-<preset>-<seed>.regions/ is
+skipped when its manifest was made with the same generator params and every
+region file is intact.
+
+Usage:
+    python3 story-geometry/terrain_gen.py bake --seed 7
+    python3 story-geometry/terrain_gen.py bake --preset hills --seed 7 --size 1024 1024 --jobs 8
+    python3 story-geometry/terrain_gen.py check test-maps/terrain-hills-7.regions
+
+    http://localhost:8080/?test=terrain-hills-7.regions
+"""
+
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from map_regions import REGION_SIZE, load_manifest, region_bytes, write_manifest, write_region
+from voxel_grid import VoxelGrid, pack_arrays
+
+GENERATOR_VERSION = 1
+
+PRESETS = {
+    # createTerrain()'s 40x40 default world, made reproducible
+    'classic': {
+        'size': (40, 40),
+        'classic': 1.0,
+        'octaves': [],
+        'pillar_chance': 0.05,
+        'pillar_height': (5, 12),
+    },
+    # Rolling hills that do not repeat, for large worlds
+    'hills': {
+        'size': (512, 512),
+        'classic': 0.0,
+        'octaves': [(96, 9.0), (32, 4.0), (8, 1.5)],
+        'pillar_chance': 0.01,
+        'pillar_height': (4, 9),
+    },
+}
+
+SALT_PILLAR = 1
+SALT_PILLAR_HEIGHT = 2
+SALT_OCTAVE = 16
+
+COLOR_BANDS = [(0, 0x8b7355), (2, 0x228b22), (5, 0x90ee90), (8, 0x808080)]
+SNOW = 0xffffff
+
+
+# ----------------------------------------------------------------------
+# Seeded noise
+# ----------------------------------------------------------------------
+
+def _u32(values):
+    return (np.asarray(values, dtype=np.int64) & 0xffffffff).astype(np.uint32)
+
+
+def hash32(x, z, seed, salt=0):
+    """Integer hash of (x, z) -> uniform floats in [0, 1). Mirrored in index.html."""
+    h = (_u32(x) * np.uint32(0x27d4eb2d)) ^ (_u32(z) * np.uint32(0x165667b1)) \
+        ^ np.uint32((seed * 0x9e3779b9 + salt * 0x85ebca6b) & 0xffffffff)
+    h ^= h >> np.uint32(16)
+    h *= np.uint32(0x7feb352d)
+    h ^= h >> np.uint32(15)
+    h *= np.uint32(0x846ca68b)
+    h ^= h >> np.uint32(16)
+    return h / 4294967296.0
+
+
+def value_noise(x, z, scale, seed, salt):
+    """Smoothly interpolated lattice noise in [-1, 1] with cells of `scale` columns."""
+    fx, fz = x / scale, z / scale
+    ix, iz = np.floor(fx).astype(np.int64), np.floor(fz).astype(np.int64)
+    tx, tz = fx - ix, fz - iz
+    tx, tz = tx * tx * (3 - 2 * tx), tz * tz * (3 - 2 * tz)
+    v00 = hash32(ix, iz, seed, salt)
+    v10 = hash32(ix + 1, iz, seed, salt)
+    v01 = hash32(ix, iz + 1, seed, salt)
+    v11 = hash32(ix + 1, iz + 1, seed, salt)
+    top = v00 + (v10 - v00) * tx
+    bottom = v01 + (v11 - v01) * tx
+    return 2 * (top + (bottom - top) * tz) - 1
+
+
+# ----------------------------------------------------------------------
+# Generation
+# ----------------------------------------------------------------------
+
+def world_extent(params):
+    """Inclusive (x_lo, x_hi, z_lo, z_hi) centered on the origin, like createTerrain()."""
+    width, depth = params['size']
+    return -(width // 2), width - width // 2 - 1, -(depth // 2), depth - depth // 2 - 1
+
+
+def column_heights(params, seed, x, z):
+    """Ground height and pillar height (0 = none) per column."""
+    x = np.asarray(x, dtype=np.int64)
+    z = np.asarray(z, dtype=np.int64)
+    height = np.zeros(len(x), dtype=np.float64)
+    if params['classic']:
+        distance = np.sqrt(x * x + z * z)
+        height += params['classic'] * (np.sin(x * 0.3) * 2 + np.cos(z * 0.3) * 2 + np.sin(distance * 0.2) * 3)
+    for octave, (scale, amplitude) in enumerate(params['octaves']):
+        height += amplitude * value_noise(x, z, scale, seed, SALT_OCTAVE + octave)
+    ground = np.floor(height).astype(np.int64)
+
+    lo, hi = params['pillar_height']
+    pillar = np.where(hash32(x, z, seed, SALT_PILLAR) < params['pillar_chance'],
+                      np.floor(hash32(x, z, seed, SALT_PILLAR_HEIGHT) * (hi - lo + 1)).astype(np.int64) + lo, 0)
+    return ground, pillar
+
+
+def _runs(x, z, lo, hi):
+    """Expand inclusive y runs [lo, hi] per column into voxel arrays."""
+    counts = np.maximum(hi - lo + 1, 0)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    y = np.repeat(lo, counts) + (np.arange(counts.sum()) - starts)
+    return np.repeat(x, counts), y, np.repeat(z, counts)
+
+
+def default_colors(y):
+    """createVoxel()'s height-banded colors, vectorized."""
+    return np.select([y == 0] + [y < limit for limit, _ in COLOR_BANDS[1:]],
+                     [c for _, c in COLOR_BANDS], default=SNOW)
+
+
+def generate_region(params, seed, key, size=REGION_SIZE):
+    """VoxelGrid of one region: columns [rx*size, rx*size+size) x [rz*size, ...) within the world."""
+    x_lo, x_hi, z_lo, z_hi = world_extent(params)
+    xs = np.arange(max(key[0] * size, x_lo), min((key[0] + 1) * size - 1, x_hi) + 1, dtype=np.int64)
+    zs = np.arange(max(key[1] * size, z_lo), min((key[1] + 1) * size - 1, z_hi) + 1, dtype=np.int64)
+    x, z = (a.ravel() for a in np.meshgrid(xs, zs, indexing='ij'))
+    ground, pillar = column_heights(params, seed, x, z)
+
+    # Ground fills 0..max(0, ground); a pillar stands on ground + 1
+    gx, gy, gz = _runs(x, z, np.zeros_like(ground), np.maximum(ground, 0))
+    has_pillar = pillar > 0
+    px, py, pz = _runs(x[has_pillar], z[has_pillar], ground[has_pillar] + 1,
+                       ground[has_pillar] + pillar[has_pillar])
+    xs, ys, zs = np.concatenate([gx, px]), np.concatenate([gy, py]), np.concatenate([gz, pz])
+    # Low ground under a pillar can overlap the y=0 floor: one voxel per cell
+    _, first = np.unique(pack_arrays(xs, ys, zs), return_index=True)
+    first.sort()
+    xs, ys, zs = xs[first], ys[first], zs[first]
+    return VoxelGrid.from_arrays(xs, ys, zs, default_colors(ys))
+
+
+def region_keys(params, size=REGION_SIZE):
+    x_lo, x_hi, z_lo, z_hi = world_extent(params)
+    return [(rx, rz)
+            for rx in range(x_lo // size, x_hi // size + 1)
+            for rz in range(z_lo // size, z_hi // size + 1)]
+
+
+def _bake_region(task):
+    params, seed, key, size, out_dir = task
+    grid = generate_region(params, seed, key, size)
+    if len(grid) == 0:
+        return None, False
+    return write_region(out_dir, key, grid)
+
+
+def _check_region(task):
+    params, seed, entry, size = task
+    grid = generate_region(params, seed, tuple(entry['key']), size)
+    return hashlib.sha256(region_bytes(entry['key'], grid)).hexdigest() == entry['sha256']
+
+
+def generator_info(preset, params, seed, size):
+    return {'version': GENERATOR_VERSION, 'preset': preset, 'seed': seed,
+            'regionSize': size, 'params': params}
+
+
+def _json_params(params):
+    """Params as they read back from JSON (tuples become lists)."""
+    return {k: [list(v) for v in value] if k == 'octaves' else list(value) if isinstance(value, tuple) else value
+            for k, value in params.items()}
+
+
+def is_cached(out_dir, generator):
+    """True if out_dir holds this exact world with every region file intact."""
+    try:
+        manifest = load_manifest(out_dir)
+    except (OSError, ValueError):
+        return False
+    if manifest.get('generator') != generator:
+        return False
+    for entry in manifest['regions']:
+        path = Path(out_dir) / entry['file']
+        if not path.exists() or hashlib.sha256(path.read_bytes()).hexdigest() != entry['sha256']:
+            return False
+    return True
+
+
+def bake(preset, seed, params=None, size=REGION_SIZE, out_dir=None, jobs=None, force=False):
+    """
+    Generate a world into region files across a process pool.
+    Returns (manifest or None if cached, out_dir, files_written).
+    """
+    params = _json_params(params or PRESETS[preset])
+    out_dir = Path(out_dir or f'test-maps/terrain-{preset}-{seed}.regions')
+    generator = generator_info(preset, params, seed, size)
+    if not force and is_cached(out_dir, generator):
+        return None, out_dir, 0
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tasks = [(params, seed, key, size, out_dir) for key in region_keys(params, size)]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(_bake_region, tasks, chunksize=max(1, len(tasks) // (4 * (jobs or os.cpu_count() or 1)))))
+    regions = [entry for entry, _ in results if entry is not None]
+    written = sum(1 for _, changed in results if changed)
+
+    ground, pillar = column_heights(params, seed, [0], [0])
+    header = {
+        'name': f"Terrain {preset} (seed {seed})",
+        'description': f"Generated by story-geometry/terrain_gen.py ({params['size'][0]}x{params['size'][1]} columns)",
+        'category': 'generated',
+        'playerStart': {'x': 0, 'y': int(max(ground[0], 0) + pillar[0]) + 1, 'z': 0},
+    }
+    manifest, manifest_written = write_manifest(out_dir, header, size, regions, generator=generator)
+    return manifest, out_dir, written + manifest_written
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ('bake', 'check'):
+        print("Usage: python3 story-geometry/terrain_gen.py bake [--preset classic|hills] [--seed N] "
+              "[--size W D] [--region N] [--jobs N] [--out DIR] [--force]")
+        print("       python3 story-geometry/terrain_gen.py check <regions dir>")
+        print("\nExample:")
+        print("  python3 story-geometry/terrain_gen.py bake --preset hills --seed 7 --size 1024 1024")
+        sys.exit(1)
+
+    if args[0] == 'check':
+        if len(args) < 2:
+            print("❌ check needs a regions directory")
+            sys.exit(1)
+        out_dir = Path(args[1])
+        manifest = load_manifest(out_dir)
+        generator = manifest.get('generator')
+        if not generator:
+            print(f"❌ {out_dir}: not a generated world")
+            sys.exit(1)
+        tasks = [(generator['params'], generator['seed'], entry, generator['regionSize'])
+                 for entry in manifest['regions']]
+        with ProcessPoolExecutor() as pool:
+            matches = list(pool.map(_check_region, tasks))
+        if all(matches):
+            print(f"✓ {out_dir}: {len(matches)} regions regenerate identically")
+            sys.exit(0)
+        print(f"❌ {out_dir}: {matches.count(False)} of {len(matches)} regions differ from seed "
+              f"{generator['seed']}")
+        sys.exit(1)
+
+    preset, seed, size, jobs, out_dir, force = 'classic', 1, REGION_SIZE, None, None, False
+    overrides = {}
+    i = 1
+    while i < len(args):
+        if args[i] == '--preset':
+            preset = args[i + 1]
+            i += 2
+        elif args[i] == '--seed':
+            seed = int(args[i + 1])
+            i += 2
+        elif args[i] == '--size':
+            overrides['size'] = (int(args[i + 1]), int(args[i + 2]))
+            i += 3
+        elif args[i] == '--region':
+            size = int(args[i + 1])
+            i += 2
+        elif args[i] == '--jobs':
+            jobs = int(args[i + 1])
+            i += 2
+        elif args[i] == '--out':
+            out_dir = args[i + 1]
+            i += 2
+        elif args[i] == '--force':
+            force = True
+            i += 1
+        else:
+            print(f"❌ Unknown option {args[i]}")
+            sys.exit(1)
+    if preset not in PRESETS:
+        print(f"❌ Unknown preset {preset} (choose from {', '.join(PRESETS)})")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    manifest, out_dir, written = bake(preset, seed, dict(PRESETS[preset], **overrides),
+                                      size, out_dir, jobs, force)
+    elapsed = time.perf_counter() - start
+    if manifest is None:
+        print(f"✓ {out_dir}: cached (seed {seed}), nothing to do")
+    else:
+        print(f"✓ {out_dir}: {manifest['voxelCount']} voxels in {len(manifest['regions'])} regions, "
+              f"{written} files written ({elapsed:.2f}s)")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
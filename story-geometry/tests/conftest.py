@@ -0,0 +1,16 @@
+"""
+pytest setup for the story-geometry modules. The scripts import each other
+by module name (run as python3 story-geometry/<script>.py), so the
+directory goes on sys.path.
+
+    python3 -m pytest -q story-geometry/tests
+"""
+
+import sys
+from pathlib import Path
+
+STORY_GEOMETRY = Path(__file__).resolve().parent.parent
+REPO_ROOT = STORY_GEOMETRY.parent
+
+if str(STORY_GEOMETRY) not in sys.path:
+    sys.path.insert(0, str(STORY_GEOMETRY))
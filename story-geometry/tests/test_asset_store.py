@@ -0,0 +1,97 @@
+"""asset_store.py: ref links, no writes through a link, concurrent writers."""
+
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import pytest
+
+import asset_store
+from asset_store import encode, load_refs, object_path, track, write_bytes, write_json
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """An empty store in a temporary repo root, with one ref over two paths."""
+    store_dir = tmp_path / 'story-geometry' / 'store'
+    monkeypatch.setattr(asset_store, 'REPO_ROOT', tmp_path)
+    monkeypatch.setattr(asset_store, 'STORE_DIR', store_dir)
+    monkeypatch.setattr(asset_store, 'OBJECTS_DIR', store_dir / 'objects')
+    monkeypatch.setattr(asset_store, 'REFS_FILE', store_dir / 'refs.json')
+    monkeypatch.setattr(asset_store, 'LOCK_FILE', store_dir / 'refs.lock')
+    (tmp_path / 'story-geometry').mkdir()
+    (tmp_path / 'test-maps').mkdir()
+    first = tmp_path / 'story-geometry' / 'scene.json'
+    first.write_bytes(encode({'name': 'scene', 'voxels': []}))
+    second = tmp_path / 'test-maps' / 'scene.json'
+    track('scene', [first, second])
+    return tmp_path
+
+
+def read(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_track_links_every_path_to_one_object(store):
+    assert asset_store.check() == []
+    paths = [store / 'story-geometry' / 'scene.json', store / 'test-maps' / 'scene.json']
+    assert all(p.is_symlink() for p in paths)
+    assert len({os.path.realpath(p) for p in paths}) == 1
+
+
+def test_write_json_repoints_ref_and_prunes_old_object(store):
+    old = load_refs()['scene']['object']
+    assert write_json(store / 'test-maps' / 'scene.json', {'name': 'scene', 'voxels': [1]})
+    new = load_refs()['scene']['object']
+    assert new != old
+    assert not object_path(old).exists()
+    assert read(store / 'story-geometry' / 'scene.json')['voxels'] == [1]
+    assert asset_store.check() == []
+    # Same bytes again: nothing written
+    assert not write_json(store / 'story-geometry' / 'scene.json', {'name': 'scene', 'voxels': [1]})
+
+
+def test_write_bytes_never_writes_through_an_untracked_link(store):
+    target = store / 'story-geometry' / 'scene.json'
+    stray = store / 'test-maps' / 'stray.json'
+    os.symlink(os.path.relpath(os.path.realpath(target), stray.parent), stray)
+    object_before = os.path.realpath(target)
+    assert write_bytes(stray, b'{"name": "stray"}')
+    assert not stray.is_symlink()
+    assert read(stray) == {'name': 'stray'}
+    assert read(object_before) == {'name': 'scene', 'voxels': []}
+    assert asset_store.check() == []
+
+
+def test_plain_write_through_a_link_is_reported(store):
+    with open(store / 'test-maps' / 'scene.json', 'w') as f:
+        f.write('{}')
+    assert any('modified in place' in problem for problem in asset_store.check())
+
+
+def _writer(root, worker, rounds):
+    for i in range(rounds):
+        path = root / ('test-maps' if i % 2 else 'story-geometry') / 'scene.json'
+        write_json(path, {'name': 'scene', 'writer': worker, 'round': i})
+
+
+def test_concurrent_writers_keep_the_store_consistent(store):
+    context = multiprocessing.get_context('fork')  # children inherit the patched paths
+    workers = [context.Process(target=_writer, args=(store, w, 20)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [w.exitcode for w in workers] == [0] * 4
+    assert asset_store.check() == []
+    assert len(list((store / 'story-geometry' / 'store' / 'objects').glob('*.json'))) == 1
+    assert read(store / 'test-maps' / 'scene.json')['round'] == 19
+
+
+def test_modules_import_without_fcntl():
+    # fcntl is POSIX-only; every script imports asset_store through voxel_grid
+    code = "import sys; sys.modules['fcntl'] = None; import asset_store, voxel_grid"
+    subprocess.run([sys.executable, '-c', code], cwd=asset_store.__file__.rpartition(os.sep)[0], check=True)
@@ -0,0 +1,56 @@
+"""bench.py: fixed inputs, the regression gate and history records."""
+
+import json
+
+import numpy as np
+import pytest
+
+import bench
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    path = tmp_path / 'history.jsonl'
+    monkeypatch.setattr(bench, 'HISTORY_FILE', path)
+    monkeypatch.setattr(bench, 'SIZES', dict(bench.SIZES, tiny=300))
+    monkeypatch.setattr(bench.platform, 'node', lambda: 'bench-host')
+    return path
+
+
+def write_history(path, *runs):
+    with open(path, 'w') as f:
+        for host, results in runs:
+            f.write(json.dumps({'host': host, 'results': results}) + '\n')
+
+
+def test_unique_cells_are_distinct_and_seeded():
+    xs, ys, zs = bench.unique_cells(5000, 3)
+    assert len(set(zip(xs.tolist(), ys.tolist(), zs.tolist()))) == 5000
+    assert all(np.array_equal(a, b) for a, b in zip((xs, ys, zs), bench.unique_cells(5000, 3)))
+
+
+def test_every_benchmark_runs_and_is_recorded(history, capsys):
+    assert bench.run_suite(list(bench.BENCHMARKS), ['tiny'], repeat=1, threshold=1.25, record=True)
+    entry = json.loads(history.read_text())
+    assert entry['host'] == 'bench-host'
+    assert set(entry['results']) == {f"{name}/tiny" for name in bench.BENCHMARKS}
+    assert capsys.readouterr().out.count('(no baseline)') == len(bench.BENCHMARKS)
+
+
+def test_baseline_is_the_median_of_recent_runs_on_this_host(history):
+    runs = [('bench-host', {'river/tiny': t}) for t in (9.0, 1.0, 2.0, 3.0, 4.0, 5.0)]
+    write_history(history, *runs, ('other-host', {'river/tiny': 0.001}))
+    assert bench.baseline(bench.load_history(), 'river/tiny', 'bench-host') == 3.0
+    assert bench.baseline(bench.load_history(), 'compose/tiny', 'bench-host') is None
+
+
+def test_slowdowns_past_threshold_and_noise_floor_fail(history, monkeypatch):
+    monkeypatch.setattr(bench, 'measure', lambda case, repeat: 0.1)
+    write_history(history, ('bench-host', {'river/tiny': 0.05}))
+    assert not bench.run_suite(['river'], ['tiny'], repeat=1, threshold=1.25, record=False)
+    assert bench.run_suite(['river'], ['tiny'], repeat=1, threshold=2.5, record=False)
+    # Twice as slow but within the noise floor
+    monkeypatch.setattr(bench, 'measure', lambda case, repeat: 0.002)
+    write_history(history, ('bench-host', {'river/tiny': 0.001}))
+    assert bench.run_suite(['river'], ['tiny'], repeat=1, threshold=1.25, record=False)
+    assert len(history.read_text().splitlines()) == 1
@@ -0,0 +1,79 @@
+"""build_graph.py: a clean build reproduces the committed outputs, reruns are no-ops."""
+
+import re
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO_ROOT
+
+STATUS = re.compile(r'^(✓|▶|❌|-) ([\w-]+): (.*)$')
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """Copy of the scripts and maps (links kept) to build in."""
+    ignore = shutil.ignore_patterns('__pycache__', 'tests', 'refs.lock')
+    for directory in ('story-geometry', 'test-maps'):
+        shutil.copytree(REPO_ROOT / directory, tmp_path / directory, symlinks=True, ignore=ignore)
+    return tmp_path
+
+
+def build(root, *args):
+    """Run build_graph.py in root. Returns {node: status line}."""
+    result = subprocess.run([sys.executable, 'story-geometry/build_graph.py', *args],
+                            cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return {m.group(2): m.group(3) for m in map(STATUS.match, result.stdout.splitlines()) if m}
+
+
+def snapshot(root):
+    """{path: bytes, or link target} of every output the graph can touch."""
+    files = {}
+    for directory in ('story-geometry', 'test-maps'):
+        for path in sorted((root / directory).rglob('*')):
+            if path.is_symlink():
+                files[path.relative_to(root)] = path.readlink()
+            elif path.is_file() and path.name != 'refs.lock':
+                files[path.relative_to(root)] = path.read_bytes()
+    return files
+
+
+def built(statuses):
+    return sorted(name for name, status in statuses.items() if status.startswith('built'))
+
+
+def test_clean_build_reproduces_committed_outputs(repo):
+    before = snapshot(repo)
+    statuses = build(repo)
+    assert built(statuses) == ['composite', 'heightmaps', 'meshes', 'river',
+                               'ruins-artifacts', 'ruins-grass']
+    changed = [str(path) for path, content in snapshot(repo).items() if before.get(path) != content]
+    assert changed == []
+
+
+def test_second_build_is_a_no_op(repo):
+    build(repo)
+    before = snapshot(repo)
+    statuses = build(repo)
+    assert set(statuses.values()) == {'up to date'}
+    assert snapshot(repo) == before
+
+
+def test_editing_a_source_rebuilds_only_downstream(repo):
+    build(repo)
+    bridge = repo / 'story-geometry' / 'bridge-over-forest-floor.json'
+    original = bridge.read_text()
+    # A cobblestone block above the deck (combine_all keeps cobblestone)
+    bridge.write_text(original.replace('"voxels": [', '"voxels": [\n    {"x": 0, "y": 9, "z": 0, "color": 11184810},', 1))
+    statuses = build(repo)
+    assert built(statuses) == ['composite', 'heightmaps', 'meshes']
+    assert statuses['river'] == statuses['ruins-grass'] == 'up to date'
+
+    # Back to the original: every node's earlier state comes from the cache
+    bridge.write_text(original)
+    statuses = build(repo)
+    assert built(statuses) == []
+    assert statuses['composite'] == 'restored from cache'
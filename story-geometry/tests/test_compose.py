@@ -0,0 +1,100 @@
+"""compose.py: the sort-merge composition against a dict-of-cells oracle."""
+
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from compose import OPERATIONS, compose, layer
+from conftest import REPO_ROOT, STORY_GEOMETRY
+from voxel_grid import VoxelGrid
+
+
+def random_grid(rng, n, span=8):
+    xs, ys, zs = rng.integers(-span, span, (3, n))
+    return VoxelGrid.from_arrays(xs, ys, zs, rng.integers(0, 4, n))
+
+
+def rows(grid):
+    return list(zip(zip(grid.x.tolist(), grid.y.tolist(), grid.z.tolist()), grid.color.tolist()))
+
+
+def oracle(layers):
+    """Dict cell → [color, priority, owner] in first-seen order, plus the report."""
+    scene = {}
+    report = []
+    for index, step in enumerate(layers):
+        cells = dict(rows(step['grid']))
+        overlap = [cell for cell in cells if cell in scene]
+        owners = {}
+        for cell in overlap:
+            name = layers[scene[cell][2]]['name']
+            owners[name] = owners.get(name, 0) + 1
+        entry = {'overlap': len(overlap), 'overlapWith': owners,
+                 'conflicts': sum(scene[cell][0] != cells[cell] for cell in overlap),
+                 'added': 0, 'removed': 0, 'recolored': 0, 'kept': 0}
+        if step['op'] in ('union', 'paint'):
+            for cell in overlap:
+                if scene[cell][1] > step['priority']:
+                    entry['kept'] += 1
+                    continue
+                entry['recolored'] += scene[cell][0] != cells[cell]
+                scene[cell][0] = cells[cell]
+                scene[cell][2] = index
+                if step['op'] == 'union':
+                    scene[cell][1] = step['priority']
+            if step['op'] == 'union':
+                for cell, color in cells.items():
+                    if cell not in scene:
+                        scene[cell] = [color, step['priority'], index]
+                        entry['added'] += 1
+        else:
+            drop = [cell for cell in scene if (cell in cells) == (step['op'] == 'difference')]
+            for cell in drop:
+                del scene[cell]
+            entry['removed'] = len(drop)
+        entry['scene'] = len(scene)
+        report.append(entry)
+    return [(cell, value[0]) for cell, value in scene.items()], report
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_compose_matches_oracle(seed):
+    rng = np.random.default_rng(seed)
+    layers = [layer(f"layer{i}", random_grid(rng, int(rng.integers(0, 400))),
+                    OPERATIONS[0] if i == 0 else str(rng.choice(OPERATIONS)), int(rng.integers(0, 3)))
+              for i in range(6)]
+    scene, report = compose(layers)
+    expected, expected_report = oracle(layers)
+    assert rows(scene) == expected
+    for entry, wanted in zip(report, expected_report):
+        assert {key: entry[key] for key in wanted} == wanted
+
+
+def test_union_ties_match_extend():
+    rng = np.random.default_rng(9)
+    grids = [random_grid(rng, 300) for _ in range(3)]
+    extended = VoxelGrid()
+    for grid in grids:
+        extended.extend(grid)
+    scene, _ = compose([layer(str(i), grid) for i, grid in enumerate(grids)])
+    assert rows(scene) == rows(extended)
+
+
+def test_unknown_operation():
+    with pytest.raises(ValueError):
+        layer('x', VoxelGrid(), op='xor')
+
+
+def test_cli_drops_the_first_layers_heightmap(tmp_path):
+    out = tmp_path / 'scene.json'
+    first = REPO_ROOT / 'story-geometry' / 'river-meandered.json'
+    assert 'heightmap' in json.loads(first.read_text())
+    subprocess.run([sys.executable, str(STORY_GEOMETRY / 'compose.py'), str(out),
+                    f"union:{first}", f"union:{REPO_ROOT / 'story-geometry' / 'ruins-complete.json'}@1"],
+                   check=True, capture_output=True)
+    data = json.loads(out.read_text())
+    assert 'heightmap' not in data
+    assert data['name'] == json.loads(first.read_text())['name']
@@ -0,0 +1,60 @@
+"""cutscene_actions.py: the compact cutscene queues expand to the original ones."""
+
+import copy
+import json
+
+import pytest
+
+from conftest import REPO_ROOT
+from cutscene_actions import compile_actions, expand, expanded_length
+from cutscene_sim import CutsceneSimulator
+
+FIXTURES = REPO_ROOT / 'story-geometry' / 'tests' / 'fixtures'
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+ORIGINAL = load(FIXTURES / 'cutscene-act-1-2-3-queues.json')['queues']
+SCENE = load(REPO_ROOT / 'test-maps' / 'cutscene-act-1-2-3.json')
+COMPACT = {c['id']: c['actionQueue'] for c in SCENE['characterGroup']['characters']}
+
+
+def test_scene_has_the_original_characters():
+    assert list(COMPACT) == list(ORIGINAL)
+
+
+@pytest.mark.parametrize('character', list(ORIGINAL))
+def test_expand_matches_original_queue(character):
+    assert list(expand(COMPACT[character])) == ORIGINAL[character]
+    assert expanded_length(COMPACT[character]) == len(ORIGINAL[character])
+
+
+@pytest.mark.parametrize('character', list(ORIGINAL))
+def test_compile_gives_the_committed_queue(character):
+    assert compile_actions(ORIGINAL[character]) == COMPACT[character]
+
+
+def test_compact_queues_are_shorter():
+    assert sum(map(len, COMPACT.values())) < sum(map(len, ORIGINAL.values()))
+
+
+def test_playback_is_unchanged():
+    original = copy.deepcopy(SCENE)
+    for character in original['characterGroup']['characters']:
+        character['actionQueue'] = ORIGINAL[character['id']]
+    assert CutsceneSimulator(SCENE).run() == CutsceneSimulator(original).run()
+
+
+def test_repeat_and_wait_forms():
+    queue = [{'type': 'repeat', 'times': 2, 'actions': [
+        {'type': 'path', 'points': ['0,1,0', '2,1,1']},
+        {'type': 'wait', 'count': 2, 'duration': 300},
+    ]}]
+    moves = [{'type': 'move', 'to': {'x': x, 'y': 1, 'z': z}} for x, z in ((0, 0), (1, 1), (2, 1))]
+    waits = [{'type': 'wait', 'duration': 300}] * 2
+    assert list(expand(queue)) == (moves + waits) * 2
+    assert expanded_length(queue) == 10
+    assert list(expand(compile_actions((moves + waits) * 2))) == (moves + waits) * 2
@@ -0,0 +1,55 @@
+"""cutscene_planner.py: plans replay cleanly, and a failed plan never replaces the map."""
+
+import json
+import shutil
+
+import pytest
+
+import cutscene_planner
+from conftest import REPO_ROOT
+from cutscene_sim import CutsceneSimulator
+
+ACT = REPO_ROOT / 'test-maps' / 'cutscene-act-1-2-3.json'
+GOALS = {'character-01-scholar': (23, 3, 0), 'character-02-artist': (22, 3, 1)}
+
+
+def test_planned_queues_reach_their_goals():
+    with open(ACT) as f:
+        data = json.load(f)
+    cutscene_planner.plan_cutscene(data, GOALS)
+    report = CutsceneSimulator(data).run()
+    assert report['blocked'] == []
+    for cid, goal in GOALS.items():
+        assert tuple(report['finalPositions'][cid][k] for k in ('x', 'y', 'z')) == goal
+
+
+def run_main(monkeypatch, *args):
+    monkeypatch.setattr('sys.argv', ['cutscene_planner.py', *map(str, args)])
+    with pytest.raises(SystemExit) as exit_info:
+        cutscene_planner.main()
+    return exit_info.value.code
+
+
+@pytest.fixture
+def failing_check(monkeypatch):
+    """Make the replay check report every character as blocked."""
+    run = CutsceneSimulator.run
+
+    def blocked_run(self):
+        report = run(self)
+        report['blocked'] = list(report['finalPositions'])
+        return report
+    monkeypatch.setattr(CutsceneSimulator, 'run', blocked_run)
+
+
+def test_failed_plan_leaves_the_source_map(tmp_path, monkeypatch, failing_check):
+    source = tmp_path / ACT.name
+    shutil.copy(ACT, source)
+    before = source.read_bytes()
+    goals = [f"{cid}={','.join(map(str, goal))}" for cid, goal in GOALS.items()]
+    assert run_main(monkeypatch, source, *goals) == 1
+    assert source.read_bytes() == before
+
+    out = tmp_path / 'failed.json'
+    assert run_main(monkeypatch, source, *goals, '--out', out) == 1
+    assert out.exists() and source.read_bytes() == before
@@ -0,0 +1,84 @@
+"""cutscene_sim.py: movement rules, gravity and timing on small hand-made scenes."""
+
+import numpy as np
+import pytest
+
+from cutscene_sim import (ACTION_DELAY_MS, BLOCKED_WAIT_MS, MOVE_MS, START_DELAY_MS, CutsceneSimulator,
+                          GravityStrategy)
+
+
+def floor(*cells):
+    return [{'x': x, 'y': y, 'z': z, 'color': 1} for x, y, z in cells]
+
+
+def move(x, y, z):
+    return {'type': 'move', 'to': {'x': x, 'y': y, 'z': z}}
+
+
+def scene(voxels, *characters):
+    return {'voxels': voxels, 'characterGroup': {'characters': [
+        {'id': cid, 'startPosition': {'x': x, 'y': y, 'z': z}, 'actionQueue': queue}
+        for cid, (x, y, z), queue in characters]}}
+
+
+FLOOR = floor(*[(x, 0, z) for x in range(6) for z in range(3)])
+
+
+def position(report, cid):
+    p = report['finalPositions'][cid]
+    return p['x'], p['y'], p['z']
+
+
+def test_walk_and_timing():
+    report = CutsceneSimulator(scene(FLOOR, ('a', (0, 1, 0), [move(1, 1, 0), {'type': 'wait', 'duration': 2000},
+                                                              move(2, 1, 0)]))).run()
+    assert position(report, 'a') == (2, 1, 0)
+    assert report['ticks'] == 3 and report['blocked'] == [] and report['falls'] == []
+    assert report['simulatedMs'] == START_DELAY_MS + MOVE_MS + 2000 + MOVE_MS + 3 * ACTION_DELAY_MS
+
+
+def test_terrain_blocks_solid_targets():
+    voxels = FLOOR + floor((1, 1, 0))
+    report = CutsceneSimulator(scene(voxels, ('a', (0, 1, 0), [move(1, 1, 0)]))).run()
+    assert position(report, 'a') == (0, 1, 0)
+    assert [e['by'] for e in report['blocked']] == ['TerrainConstraintStrategy']
+    assert report['simulatedMs'] == START_DELAY_MS + BLOCKED_WAIT_MS + ACTION_DELAY_MS
+
+
+def test_characters_block_claimed_and_occupied_cells():
+    report = CutsceneSimulator(scene(
+        FLOOR,
+        ('a', (0, 1, 0), [move(1, 1, 0)]),
+        ('b', (2, 1, 0), [move(1, 1, 0), move(3, 1, 0)]),  # a claimed (1,1,0) first
+        ('c', (3, 1, 0), [move(4, 1, 0)]),
+        ('d', (5, 1, 1), [move(3, 1, 0)]),  # c only leaves (3,1,0) at the end of the tick
+    )).run()
+    assert [position(report, cid) for cid in 'abcd'] == [(1, 1, 0), (3, 1, 0), (4, 1, 0), (5, 1, 1)]
+    assert [(e['tick'], e['character'], e['by']) for e in report['blocked']] == \
+        [(1, 'b', 'CharacterCollisionStrategy'), (1, 'd', 'CharacterCollisionStrategy')]
+
+
+def test_falls_land_on_the_support_below():
+    voxels = FLOOR + floor((6, -2, 0))
+    report = CutsceneSimulator(scene(voxels, ('a', (5, 1, 0), [move(6, 1, 0), move(7, -1, 0)]))).run()
+    # Lands in the riverbed below y=0, then walks off into a column with
+    # nothing below and stays where the move left it
+    assert [(f['to']['y'], f['distance']) for f in report['falls']] == [(-1, 2)]
+    assert position(report, 'a') == (7, -1, 0)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_gravity_matches_a_downward_scan(seed):
+    rng = np.random.default_rng(seed)
+    cells = set(zip(*(v.tolist() for v in rng.integers(-6, 6, (3, 300)))))
+    sim = CutsceneSimulator({'voxels': floor(*cells)})
+    gravity = GravityStrategy()
+    for x, y, z in zip(*(v.tolist() for v in rng.integers(-7, 7, (3, 300)))):
+        if (x, y, z) in cells:
+            continue
+        below = next((s for s in range(y - 1, -8, -1) if (x, s, z) in cells), None)
+        character = type('Character', (), {'id': 'c', 'position': None})()
+        gravity.post_process(sim, character, {'x': x, 'y': y, 'z': z})
+        expected_y = y if below is None else below + 1
+        landed = (character.position or {'y': y})['y']
+        assert landed == expected_y
@@ -0,0 +1,88 @@
+"""greedy_mesh.py: merged quads cover exactly the exposed faces, wound outwards."""
+
+import json
+
+import numpy as np
+import pytest
+
+from conftest import REPO_ROOT
+from greedy_mesh import (FACE_AXES, build_gltf, default_color, greedy_quads, grid_from_map, map_hash,
+                         quad_geometry, read_glb_json, write_glb)
+from voxel_grid import VoxelGrid
+
+
+def random_grid(seed, n=600, span=6, colors=3):
+    rng = np.random.default_rng(seed)
+    xs, ys, zs = rng.integers(-span, span, (3, n))
+    return VoxelGrid.from_arrays(xs, ys, zs, rng.integers(0, colors, n))
+
+
+def exposed_faces(grid):
+    """Every (axis, sign, layer, u, v, color) unit face with an empty neighbor."""
+    cells = {(x, y, z): c for x, y, z, c in grid}
+    faces = []
+    for cell, color in cells.items():
+        for axis in range(3):
+            ua, va = FACE_AXES[axis]
+            for sign in (1, -1):
+                neighbor = list(cell)
+                neighbor[axis] += sign
+                if tuple(neighbor) not in cells:
+                    faces.append((axis, sign, cell[axis], cell[ua], cell[va], color))
+    return sorted(faces)
+
+
+def unit_faces(quads):
+    faces = []
+    for axis, sign, layer, u0, u1, v0, v1, color in zip(*(quads[k].tolist() for k in
+                                                          ('axis', 'sign', 'layer', 'u0', 'u1', 'v0', 'v1', 'color'))):
+        faces.extend((axis, sign, layer, u, v, color) for u in range(u0, u1 + 1) for v in range(v0, v1 + 1))
+    return sorted(faces)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_quads_tile_the_exposed_faces(seed):
+    grid = random_grid(seed)
+    quads = greedy_quads(grid)
+    assert unit_faces(quads) == exposed_faces(grid)
+    assert len(quads['axis']) < len(exposed_faces(grid))
+
+
+def test_flat_floor_merges_to_one_quad_per_side():
+    xs, zs = np.meshgrid(np.arange(10), np.arange(7))
+    grid = VoxelGrid.from_arrays(xs.ravel(), np.zeros(70), zs.ravel(), np.full(70, 5))
+    assert len(greedy_quads(grid)['axis']) == 6
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_geometry_faces_outwards(seed):
+    quads = greedy_quads(random_grid(seed))
+    positions, normals, indices = quad_geometry(quads)
+    a, b, c = (positions[indices[k::3]] for k in range(3))
+    cross = np.cross(b - a, c - a)
+    assert (np.einsum('ij,ij->i', cross, normals[indices[::3]]) > 0).all()
+    # Every corner sits on the face plane, half a cell out from the layer
+    axis = np.repeat(quads['axis'], 4)
+    plane = np.repeat(quads['layer'] + 0.5 * quads['sign'], 4)
+    assert np.allclose(positions[np.arange(len(axis)), axis], plane)
+
+
+def test_glb_round_trip(tmp_path):
+    with open(REPO_ROOT / 'test-maps' / 'complete-scene.json') as f:
+        data = json.load(f)
+    grid = grid_from_map(data)
+    gltf, blob = build_gltf(grid, 'scene', map_hash(data))
+    write_glb(tmp_path / 'scene.glb', gltf, blob)
+    loaded = read_glb_json(tmp_path / 'scene.glb')
+    assert loaded['asset']['extras'] == {'voxelCount': len(grid), 'voxelHash': map_hash(data),
+                                         'quads': len(greedy_quads(grid)['axis'])}
+    assert len(loaded['meshes'][0]['primitives']) == len(grid.color_counts())
+
+
+def test_uncolored_voxels_get_height_colors():
+    data = {'voxels': [{'x': 0, 'y': 0, 'z': 0}, {'x': 0, 'y': 3, 'z': 0}, {'x': 0, 'y': 9, 'z': 0, 'color': 7}]}
+    colors = dict(((x, y, z), c) for x, y, z, c in grid_from_map(data))
+    assert colors == {(0, 0, 0): default_color(0), (0, 3, 0): default_color(3), (0, 9, 0): 7}
+    # The hash covers the map as listed, missing colors included
+    assert map_hash(data) != map_hash({'voxels': [dict(v, color=colors[(v['x'], v['y'], v['z'])])
+                                                  for v in data['voxels']]})
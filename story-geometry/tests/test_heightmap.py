@@ -0,0 +1,110 @@
+"""heightmap.py: column queries against a brute-force scan of the cells."""
+
+import json
+
+import numpy as np
+import pytest
+
+from conftest import REPO_ROOT
+import voxel_grid
+from heightmap import OPEN_SKY, ColumnIndex, bake, save_map
+from voxel_grid import VoxelGrid
+
+
+def random_grid(seed, n=400, span=8, height=(-3, 9)):
+    rng = np.random.default_rng(seed)
+    xs, zs = rng.integers(-span, span, (2, n))
+    ys = rng.integers(*height, n)
+    return VoxelGrid.from_arrays(xs, ys, zs, np.zeros(n, dtype=np.int64))
+
+
+def brute_force(cells, x, z):
+    """(top, bottom, [(surface y, headroom)]) of one column by scanning every cell."""
+    ys = sorted(y for cx, y, cz in cells if cx == x and cz == z)
+    if not ys:
+        return None, None, []
+    surfaces = []
+    for y in ys:
+        if (x, y + 1, z) in cells:
+            continue
+        above = [other for other in ys if other > y]
+        surfaces.append((y, above[0] - y - 1 if above else OPEN_SKY))
+    return ys[-1], ys[0], surfaces
+
+
+def cells_of(grid):
+    return set(zip(grid.x.tolist(), grid.y.tolist(), grid.z.tolist()))
+
+
+def assert_matches(index, cells, span=8):
+    for x in range(-span - 1, span + 1):
+        for z in range(-span - 1, span + 1):
+            top, bottom, surfaces = brute_force(cells, x, z)
+            assert index.top_at(x, z) == top
+            assert index.bottom_at(x, z) == bottom
+            assert index.surfaces_at(x, z) == surfaces
+            assert index.standable_at(x, z) == [y for y, room in surfaces
+                                                if room == OPEN_SKY or room >= 2]
+            for y in range(-5, 12):
+                below = [s for s, _ in surfaces if s < y]
+                assert index.support_below(x, y, z) == (below[-1] if below else None)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_queries_match_brute_force(seed):
+    grid = random_grid(seed)
+    assert_matches(ColumnIndex.from_grid(grid), cells_of(grid))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_sidecar_round_trip_matches_brute_force(seed):
+    grid = random_grid(seed, n=150)
+    index = ColumnIndex.from_sidecar(json.loads(json.dumps(ColumnIndex.from_grid(grid).to_sidecar())))
+    assert index == ColumnIndex.from_grid(grid)
+    assert_matches(index, cells_of(grid))
+
+
+def test_empty_map():
+    index = ColumnIndex.from_grid(VoxelGrid())
+    assert index.top_at(0, 0) is None
+    assert index.surfaces_at(0, 0) == []
+    assert ColumnIndex.from_sidecar(index.to_sidecar()) == index
+
+
+@pytest.mark.parametrize('name', ['complete-scene', 'river-meandered', 'ruins-test', 'floating-ship'])
+def test_committed_sidecars_are_current(name):
+    with open(REPO_ROOT / 'test-maps' / f'{name}.json') as f:
+        data = json.load(f)
+    committed = data['heightmap']
+    index = bake(data)
+    assert data['heightmap'] == committed
+    assert_matches(index, cells_of(VoxelGrid.from_voxels(data['voxels'])), span=30)
+
+
+def test_save_map_keeps_the_sidecar_current(tmp_path):
+    path = tmp_path / 'map.json'
+    grid = random_grid(1)
+    data = {'name': 'map'}
+    save_map(data, grid, path, heightmap=True)
+    saved = json.loads(path.read_text())
+    assert list(saved) == ['name', 'voxels', 'heightmap']
+    assert ColumnIndex.from_sidecar(saved['heightmap']) == ColumnIndex.from_grid(grid)
+
+    # Decided from the data: a map with a sidecar is re-baked
+    grid.add(40, 40, 40, 0)
+    save_map(saved, grid, path)
+    assert ColumnIndex.from_sidecar(json.loads(path.read_text())['heightmap']) == ColumnIndex.from_grid(grid)
+    save_map(saved, grid, path, heightmap=False)
+    assert 'heightmap' not in json.loads(path.read_text())
+
+
+def test_plain_save_map_drops_a_stale_sidecar(tmp_path):
+    path = tmp_path / 'map.json'
+    grid = random_grid(2)
+    data = {'name': 'map'}
+    bake(data, grid)
+    voxel_grid.save_map(data, grid, path)
+    assert 'heightmap' in json.loads(path.read_text())
+    grid.remove(int(grid.x[0]), int(grid.y[0]), int(grid.z[0]))
+    voxel_grid.save_map(data, grid, path)
+    assert 'heightmap' not in json.loads(path.read_text())
@@ -0,0 +1,105 @@
+"""map_diff.py: apply(old, diff(old, new)) == new, revert undoes it, conflicts raise."""
+
+import copy
+import json
+import subprocess
+
+import numpy as np
+import pytest
+
+from conftest import REPO_ROOT
+from map_diff import apply_patch, diff_maps, is_empty, patch_size
+from voxel_grid import to_columns, voxel_arrays
+
+
+def random_voxels(seed, n=300, span=6, duplicates=0):
+    rng = np.random.default_rng(seed)
+    voxels = [{'x': int(x), 'y': int(y), 'z': int(z), 'color': int(c)}
+              for x, y, z, c in zip(*rng.integers(-span, span, (3, n)), rng.integers(0, 4, n))]
+    for i in rng.integers(0, len(voxels), duplicates):
+        voxels.append(dict(voxels[i], color=int(rng.integers(10, 14))))
+    for voxel in voxels[::17]:
+        del voxel['color']
+    return voxels
+
+
+def cells(voxels):
+    """Brute-force cell map: the last entry for a cell wins, as in VoxelGrid."""
+    out = {}
+    for v in voxels:
+        out[(v['x'], v['y'], v['z'])] = v.get('color')
+    return out
+
+
+def scene(seed, **kwargs):
+    return {'name': f'map {seed}', 'notes': {'seed': seed, 'keep': True},
+            'voxels': random_voxels(seed, **kwargs),
+            'characterGroup': {'characters': [
+                {'id': 'a', 'actionQueue': [{'type': 'wait'}, {'type': 'move', 'to': {'x': seed, 'y': 1, 'z': 0}}]},
+                {'id': 'b', 'actionQueue': [{'type': 'comment', 'text': str(seed)}]}]}}
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_apply_diff_is_identity(seed):
+    old, new = scene(seed), scene(seed + 100)
+    new['notes'].pop('keep')
+    new['characterGroup']['characters'].append({'id': 'c', 'actionQueue': []})
+    patch = diff_maps(old, new)
+    result = apply_patch(old, patch)
+    assert cells(result['voxels']) == cells(new['voxels'])
+    assert {k: v for k, v in result.items() if k != 'voxels'} == {k: v for k, v in new.items() if k != 'voxels'}
+    reverted = apply_patch(result, patch, reverse=True)
+    assert cells(reverted['voxels']) == cells(old['voxels'])
+    assert reverted['notes'] == old['notes']
+    assert reverted['characterGroup'] == old['characterGroup']
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_duplicate_cells_collapse_last_wins(seed):
+    old = scene(seed, duplicates=40)
+    new = scene(seed)
+    new['voxels'] = old['voxels'][:200] + random_voxels(seed + 50, n=60, duplicates=10)
+    result = apply_patch(old, diff_maps(old, new))
+    assert cells(result['voxels']) == cells(new['voxels'])
+    assert len(result['voxels']) == len(cells(new['voxels']))
+    # Diffing a map against itself still drops its duplicates on apply
+    same = apply_patch(old, diff_maps(old, old))
+    assert len(same['voxels']) == len(cells(old['voxels']))
+    assert cells(same['voxels']) == cells(old['voxels'])
+
+
+def test_history_round_trip_on_deduplicated_scene():
+    """The baseline complete-scene listed 20 cells twice; the committed one does not."""
+    baseline = subprocess.run(['git', 'show', '320218e:test-maps/complete-scene.json'], cwd=REPO_ROOT,
+                              capture_output=True, text=True)
+    if baseline.returncode != 0:
+        pytest.skip('baseline commit not available')
+    old = json.loads(baseline.stdout)
+    with open(REPO_ROOT / 'test-maps' / 'complete-scene.json') as f:
+        new = json.load(f)
+    assert apply_patch(old, diff_maps(old, new)) == new
+
+
+def test_columnar_maps_stay_columnar():
+    old, new = scene(1), scene(2)
+    for data in (old, new):
+        data['voxels'] = to_columns(*voxel_arrays(data['voxels']))
+    assert apply_patch(old, diff_maps(old, new))['voxels'] == new['voxels']
+
+
+def test_empty_patch():
+    data = scene(3)
+    patch = diff_maps(data, copy.deepcopy(data))
+    assert is_empty(patch)
+    assert patch_size(patch)['added'] == 0
+
+
+def test_conflicts_raise():
+    old, new = scene(4), scene(5)
+    patch = diff_maps(old, new)
+    with pytest.raises(ValueError):
+        apply_patch(new, patch)
+    edited = copy.deepcopy(old)
+    edited['notes']['seed'] = 'other'
+    with pytest.raises(ValueError):
+        apply_patch(edited, patch)
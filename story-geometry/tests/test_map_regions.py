@@ -0,0 +1,78 @@
+"""map_regions.py: regions partition the map exactly and rewrite only what changed."""
+
+import json
+
+import numpy as np
+import pytest
+
+from conftest import REPO_ROOT
+from greedy_mesh import grid_from_map, voxel_sha
+from map_regions import WHOLE_MAP_KEYS, load_regions, split_grid, write_regions
+from voxel_grid import VoxelGrid
+
+
+def cells(grid):
+    return dict(zip(zip(grid.x.tolist(), grid.y.tolist(), grid.z.tolist()), grid.color.tolist()))
+
+
+def random_grid(seed, n=2000, span=70):
+    rng = np.random.default_rng(seed)
+    xs, zs = rng.integers(-span, span, (2, n))
+    return VoxelGrid.from_arrays(xs, rng.integers(-2, 6, n), zs, rng.integers(0, 5, n))
+
+
+@pytest.mark.parametrize('size', [1, 7, 16, 32])
+def test_split_partitions_by_column(size):
+    grid = random_grid(size)
+    seen = {}
+    keys = []
+    for key, region in split_grid(grid, size):
+        keys.append(key)
+        for (x, y, z), color in cells(region).items():
+            assert (x // size, z // size) == key
+            assert (x, y, z) not in seen
+            seen[(x, y, z)] = color
+    assert keys == sorted(keys)
+    assert seen == cells(grid)
+
+
+def test_split_and_load_round_trip(tmp_path):
+    with open(REPO_ROOT / 'test-maps' / 'complete-scene.json') as f:
+        data = json.load(f)
+    grid = grid_from_map(data)
+    manifest, written = write_regions(data, grid, tmp_path, size=16, source='complete-scene.json')
+    assert written == len(manifest['regions']) + 1
+    assert manifest['voxelCount'] == len(grid)
+    assert manifest['voxelSha'] == voxel_sha(grid)
+    assert manifest['header'] == {k: v for k, v in data.items() if k not in WHOLE_MAP_KEYS}
+    _, loaded = load_regions(tmp_path)
+    assert cells(loaded) == cells(grid)
+    # Only the regions asked for
+    first = manifest['regions'][0]
+    _, part = load_regions(tmp_path, keys=[first['key']])
+    assert len(part) == first['count']
+
+
+def test_resplit_rewrites_only_changed_regions(tmp_path):
+    grid = random_grid(1)
+    data = {'name': 'random'}
+    manifest, _ = write_regions(data, grid, tmp_path, size=32)
+    assert write_regions(data, grid, tmp_path, size=32)[1] == 0
+
+    # Drop every voxel of one region, recolor one voxel in another
+    gone = tuple(manifest['regions'][0]['key'])
+    keep = (grid.x // 32 != gone[0]) | (grid.z // 32 != gone[1])
+    edited = VoxelGrid.from_arrays(grid.x[keep], grid.y[keep], grid.z[keep], grid.color[keep])
+    edited.add(int(edited.x[0]), int(edited.y[0]), int(edited.z[0]), 99)
+    manifest, written = write_regions(data, edited, tmp_path, size=32)
+    assert written == 2  # the recolored region and the manifest
+    assert not (tmp_path / f"r_{gone[0]}_{gone[1]}.json").exists()
+    assert cells(load_regions(tmp_path)[1]) == cells(edited)
+
+
+def test_tampered_region_is_rejected(tmp_path):
+    manifest, _ = write_regions({'name': 'random'}, random_grid(2), tmp_path, size=32)
+    path = tmp_path / manifest['regions'][0]['file']
+    path.write_text(path.read_text().replace('"color": ', '"color": 1', 1))
+    with pytest.raises(ValueError):
+        load_regions(tmp_path)
@@ -0,0 +1,110 @@
+"""navgraph.py: nodes and edges against a cell-by-cell scan of the movement rules."""
+
+import json
+from collections import deque
+
+import numpy as np
+import pytest
+
+from conftest import REPO_ROOT
+from navgraph import CLIMB, DIRECTIONS, FALL, WALK, NavGraph, barrier_blocks
+from voxel_grid import VoxelGrid
+
+BARRIERS = {'ropeRailings': {'northSide': {'xMin': -2, 'xMax': 2, 'zLine': -3},
+                             'southSide': {'xMin': -2, 'xMax': 2, 'zLine': 3}}}
+
+
+def random_map(seed, n=500, span=6, barriers=None):
+    rng = np.random.default_rng(seed)
+    xs, zs = rng.integers(-span, span, (2, n))
+    ys = rng.integers(-4, 6, n)
+    data = {'voxels': VoxelGrid.from_arrays(xs, ys, zs, np.zeros(n, dtype=np.int64)).to_voxels()}
+    if barriers:
+        data['barriers'] = barriers
+    return data
+
+
+def brute_force(data):
+    """(nodes, {(source, target, kind)}) by checking every cell."""
+    solid = {(v['x'], v['y'], v['z']) for v in data['voxels']}
+    nodes = {(x, y + 1, z) for x, y, z in solid
+             if (x, y + 1, z) not in solid and (x, y + 2, z) not in solid}
+    low = min((y for _, y, _ in solid), default=0)
+    edges = set()
+    for x, y, z in nodes:
+        for dx, dz in DIRECTIONS:
+            tx, tz = x + dx, z + dz
+            if barrier_blocks(data.get('barriers'), np.array([tx]), np.array([tz]))[0]:
+                continue
+            if (tx, y, tz) in nodes:
+                edges.add(((x, y, z), (tx, y, tz), WALK))
+            elif (tx, y, tz) in solid:
+                if (tx, y + 1, tz) in nodes:
+                    edges.add(((x, y, z), (tx, y + 1, tz), CLIMB))
+            elif (tx, y + 1, tz) not in solid and (tx, y - 1, tz) not in solid:
+                # Land on the first solid cell below, at any height
+                below = next((s for s in range(y - 2, low - 1, -1) if (tx, s, tz) in solid), None)
+                if below is not None and (tx, below + 1, tz) in nodes:
+                    edges.add(((x, y, z), (tx, below + 1, tz), FALL))
+    return nodes, edges
+
+
+def graph_edges(graph):
+    return {(graph.position(n), graph.position(t), kind)
+            for n in range(len(graph)) for t, kind in graph.neighbors(n)}
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('barriers', [None, BARRIERS], ids=['open', 'railings'])
+def test_graph_matches_brute_force(seed, barriers):
+    data = random_map(seed, barriers=barriers)
+    graph = NavGraph.from_map(data)
+    nodes, edges = brute_force(data)
+    assert {graph.position(n) for n in range(len(graph))} == nodes
+    assert graph_edges(graph) == edges
+
+
+def test_falls_reach_below_zero():
+    # A ledge at y=0 next to a riverbed at y=-2: the fall lands at y=-1
+    data = {'voxels': [{'x': 0, 'y': 0, 'z': 0}, {'x': 1, 'y': -2, 'z': 0}]}
+    graph = NavGraph.from_map(data)
+    assert ((0, 1, 0), (1, -1, 0), FALL) in graph_edges(graph)
+
+
+def test_path_is_a_shortest_path():
+    data = random_map(7, n=900)
+    graph = NavGraph.from_map(data)
+    _, edges = brute_force(data)
+    adjacent = {}
+    for source, target, _ in edges:
+        adjacent.setdefault(source, set()).add(target)
+    start = graph.position(0)
+    distance = {start: 0}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for other in adjacent.get(node, ()):
+            if other not in distance:
+                distance[other] = distance[node] + 1
+                queue.append(other)
+    for goal, steps in distance.items():
+        path = graph.path(start, goal)
+        assert len(path) == steps + 1
+        assert all(b in adjacent[a] for a, b in zip(path, path[1:]))
+    unreachable = [graph.position(n) for n in range(len(graph)) if graph.position(n) not in distance]
+    assert all(graph.path(start, goal) is None for goal in unreachable)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    graph = NavGraph.from_map(random_map(3), source_sha='abc')
+    graph.save(tmp_path / 'map.navgraph')
+    loaded = NavGraph.load(tmp_path / 'map.navgraph')
+    assert loaded.source_sha == 'abc'
+    assert graph_edges(loaded) == graph_edges(graph)
+
+
+def test_usage_example_has_a_path():
+    with open(REPO_ROOT / 'test-maps' / 'complete-scene.json') as f:
+        graph = NavGraph.from_map(json.load(f))
+    path = graph.path((0, 2, 0), (23, 3, 0))
+    assert path is not None and path[0] == (0, 2, 0) and path[-1] == (23, 3, 0)
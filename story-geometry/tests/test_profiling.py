@@ -0,0 +1,89 @@
+"""profiling.py: stages recorded as Chrome trace events, per process and shared."""
+
+import json
+import os
+import subprocess
+import sys
+
+from conftest import STORY_GEOMETRY
+import profiling
+
+SCRIPT = """
+import time
+from profiling import stage
+with stage('outer', voxels_in=10) as outer:
+    with stage('inner', voxels_in=10) as inner:
+        data = [0] * 200_000
+        inner.voxels_out = 4
+    with stage('inner'):
+        time.sleep(0.01)
+    outer.voxels_out = 4
+"""
+
+
+def run_profiled(trace, memory='1'):
+    env = dict(os.environ, STORY_PROFILE=str(trace), STORY_PROFILE_MEMORY=memory)
+    return subprocess.run([sys.executable, '-c', SCRIPT], cwd=STORY_GEOMETRY, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def test_script_trace(tmp_path):
+    trace = tmp_path / 'trace.json'
+    result = run_profiled(trace)
+    events = json.loads(trace.read_text())
+    meta, *spans = events
+    assert meta['ph'] == 'M' and meta['args']['name'] == '-c'
+    assert [e['name'] for e in spans] == ['inner', 'inner', 'outer', '-c']
+    inner, sleep, outer, script = spans
+    assert script['cat'] == 'script' and {e['cat'] for e in (inner, sleep, outer)} == {'stage'}
+    for child, parent in ((inner, outer), (sleep, outer), (outer, script)):
+        assert parent['ts'] <= child['ts'] and child['ts'] + child['dur'] <= parent['ts'] + parent['dur'] + 1
+    assert sleep['dur'] >= 10_000
+    assert (inner['args']['voxels_in'], inner['args']['voxels_out']) == (10, 4)
+    assert 'voxels_in' not in sleep['args'] and outer['args']['voxels_out'] == 4
+    # A parent's peak includes its children's
+    assert inner['args']['peak_kb'] >= 1500 and outer['args']['peak_kb'] >= inner['args']['peak_kb']
+    assert result.stderr.startswith('- profile -c: ') and ' | inner ' in result.stderr
+    assert ' x2 10→4 | outer ' in result.stderr and result.stderr.endswith(f" → {trace}\n")
+
+
+def test_timing_only(tmp_path):
+    trace = tmp_path / 'trace.json'
+    run_profiled(trace, memory='0')
+    events = json.loads(trace.read_text())
+    assert all('peak_kb' not in e['args'] for e in events if e['ph'] == 'X')
+    assert all('cpu_ms' in e['args'] for e in events if e['ph'] == 'X')
+
+
+def test_shared_trace(tmp_path):
+    trace = tmp_path / 'trace.json'
+    profiling.start_trace(trace)
+    run_profiled(trace)
+    run_profiled(trace)
+    open_events = profiling.read_trace(trace)
+    profiling.finish_trace(trace)
+    events = json.loads(trace.read_text())
+    assert events == open_events
+    assert len({e['pid'] for e in events}) == 2 and sum(e['ph'] == 'M' for e in events) == 2
+    assert [line.split(':')[0] for line in profiling.process_summaries(events)] == ['- profile -c'] * 2
+    # A script run after the build replaces the closed trace
+    run_profiled(trace)
+    assert len({e['pid'] for e in json.loads(trace.read_text())}) == 1
+
+
+def test_summary_line():
+    events = [
+        {'name': 'load', 'cat': 'stage', 'dur': 2500, 'args': {'voxels_out': 1500}},
+        {'name': 'save', 'cat': 'stage', 'dur': 30_000, 'args': {'voxels_in': 2_500_000}},
+        {'name': 'save', 'cat': 'stage', 'dur': 15_000, 'args': {'voxels_in': 500_000}},
+        {'name': 'x.py', 'cat': 'script', 'dur': 60_000, 'args': {'cpu_ms': 55.0, 'peak_kb': 2048}},
+    ]
+    assert profiling.summary_line('x.py', events) == \
+        '- profile x.py: 60ms (cpu 55ms, peak 2.0 MB) | load 2.5ms 1.5k | save 45ms x2 3.0M'
+
+
+def test_disabled_stage_is_shared_no_op(monkeypatch):
+    monkeypatch.setattr(profiling, 'ENABLED', False)
+    with profiling.stage('load', voxels_in=3) as s:
+        s.voxels_out = 3
+    assert s is profiling.stage('save') and not hasattr(s, 'voxels_out')
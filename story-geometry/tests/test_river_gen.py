@@ -0,0 +1,100 @@
+"""river_gen.py: the vectorized presets match the original per-voxel loops."""
+
+import json
+import math
+
+import numpy as np
+import pytest
+
+from conftest import REPO_ROOT
+from river_gen import ANCIENT_RIVER, PERPENDICULAR_RIVER, iter_river, iter_river_chunks, river_grid
+from voxel_grid import VoxelGrid
+
+# ----------------------------------------------------------------------
+# The loops ancient_river.py and perpendicular_river.py ran before
+# river_gen.py, with the z range (and ancient's x clip) as arguments.
+# ----------------------------------------------------------------------
+
+
+def legacy_ancient(z_lo=-18, z_hi=18, clip=True):
+    river = VoxelGrid()
+    for z in range(z_lo, z_hi + 1):
+        primary_curve = 3.5 * math.sin(z * 0.25)
+        secondary_curve = 1.2 * math.sin(z * 0.6)
+        river_center_x = 5 + int(primary_curve + secondary_curve)
+        total_half_width = 5 + int(abs(primary_curve) * 0.8)
+        for x_var in range(-total_half_width, total_half_width + 1):
+            x = river_center_x + x_var
+            if (x == 0 or x == 11) and -1 <= z <= 1:
+                continue
+            if clip and (x < -2 or x > 13):
+                continue
+            distance_from_center = abs(x_var)
+            if distance_from_center > total_half_width - 2:
+                y = 0
+            elif distance_from_center > total_half_width - 4:
+                y = -1
+            else:
+                y = -2 if distance_from_center < 2 else -1
+            if distance_from_center < 3:
+                fill_chance = True
+            elif distance_from_center < 6:
+                fill_chance = (x + z) % 2 == 0
+            else:
+                fill_chance = (x + z) % 3 == 0
+            if fill_chance:
+                color = 2263842 if (x * 7 + z * 11) % 5 < 2 else 9127187
+                river.add(x, y, z, color)
+    return river
+
+
+def legacy_perpendicular(z_lo=-15, z_hi=15):
+    river = VoxelGrid()
+    for z in range(z_lo, z_hi + 1):
+        river_center_x = 5 + int(1.5 * math.sin(z * 0.4))
+        for x_variation in [-2, -1, 0, 1, 2]:
+            x = river_center_x + x_variation
+            if (x == 0 or x == 11) and -1 <= z <= 1:
+                continue
+            y = 0 if abs(x_variation) == 2 else -1
+            if (x + z) % 2 == 0 or abs(x_variation) <= 1:
+                color = 2263842 if (x + z) % 3 == 0 else 9127187
+                river.add(x, y, z, color)
+    return river
+
+
+def test_ancient_preset_matches_legacy_loop():
+    assert river_grid(ANCIENT_RIVER).to_voxels() == legacy_ancient().to_voxels()
+
+
+def test_committed_river_is_the_legacy_river():
+    with open(REPO_ROOT / 'test-maps' / 'river-meandered.json') as f:
+        assert json.load(f)['voxels'] == legacy_ancient().to_voxels()
+
+
+def test_perpendicular_preset_matches_legacy_loop():
+    assert river_grid(PERPENDICULAR_RIVER).to_voxels() == legacy_perpendicular().to_voxels()
+
+
+@pytest.mark.parametrize('z_range', [(-200, 200), (37, 120)])
+def test_extended_ranges_match_legacy_loop(z_range):
+    ancient = dict(ANCIENT_RIVER, z_range=z_range, x_range=None)
+    assert river_grid(ancient).to_voxels() == legacy_ancient(*z_range, clip=False).to_voxels()
+    perpendicular = dict(PERPENDICULAR_RIVER, z_range=z_range)
+    assert river_grid(perpendicular).to_voxels() == legacy_perpendicular(*z_range).to_voxels()
+
+
+def _cells(arrays):
+    x, y, z, color = (np.concatenate(a) for a in zip(*arrays))
+    return sorted(zip(x.tolist(), y.tolist(), z.tolist(), color.tolist()))
+
+
+def test_slabs_and_chunks_cover_the_same_voxels():
+    params = dict(ANCIENT_RIVER, z_range=(-300, 299), x_range=None)
+    whole = _cells(iter_river(params, slab=10_000))
+    assert _cells(iter_river(params, slab=7)) == whole
+    tiles = list(iter_river_chunks(params, chunk=16))
+    assert _cells(arrays for _, arrays in tiles) == whole
+    for (cx, cz), (x, _, z, _) in tiles:
+        assert (x // 16 == cx).all() and (z // 16 == cz).all()
+    assert len({tile for tile, _ in tiles}) == len(tiles)
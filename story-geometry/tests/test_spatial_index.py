@@ -0,0 +1,94 @@
+"""spatial_index.py: SpatialIndex against a dict of cells."""
+
+import numpy as np
+import pytest
+
+from spatial_index import CHUNK_BITS, NEIGHBORS_6, NEIGHBORS_26, SpatialIndex
+
+
+def as_dict(xs, ys, zs, colors):
+    return dict(zip(zip(xs.tolist(), ys.tolist(), zs.tolist()), colors.tolist()))
+
+
+def random_cells(rng, n, span=40):
+    xs, ys, zs = rng.integers(-span, span, (3, n))
+    return xs, ys, zs, rng.integers(0, 1 << 24, n)
+
+
+@pytest.fixture(params=range(4))
+def filled(request):
+    """(index, dict) after a mix of bulk and single inserts and removals."""
+    rng = np.random.default_rng(request.param)
+    index, cells = SpatialIndex(), {}
+    for _ in range(6):
+        xs, ys, zs, colors = random_cells(rng, 800)
+        assert index.insert_arrays(xs, ys, zs, colors) == len(set(zip(xs.tolist(), ys.tolist(), zs.tolist())) - set(cells))
+        cells.update(as_dict(xs, ys, zs, colors))
+        xs, ys, zs, _ = random_cells(rng, 600)
+        gone = {cell for cell in zip(xs.tolist(), ys.tolist(), zs.tolist()) if cell in cells}
+        assert index.remove_arrays(xs, ys, zs) == len(gone)
+        for cell in gone:
+            del cells[cell]
+        for x, y, z, color in zip(*(v.tolist() for v in random_cells(rng, 50))):
+            assert index.insert(x, y, z, color) == ((x, y, z) not in cells)
+            cells[(x, y, z)] = color
+        for x, y, z, _ in zip(*(v.tolist() for v in random_cells(rng, 50))):
+            assert index.remove(x, y, z) == ((x, y, z) in cells)
+            cells.pop((x, y, z), None)
+    return index, cells
+
+
+def test_contents_match(filled):
+    index, cells = filled
+    assert len(index) == len(cells)
+    assert as_dict(*index.to_arrays()) == cells
+    chunks = {tuple(v >> CHUNK_BITS for v in cell) for cell in cells}
+    assert set(index.chunk_keys()) == chunks
+    for cell, color in list(cells.items())[:200]:
+        assert index.has(*cell) and index.get(*cell) == color
+    assert not index.has(1000, 1000, 1000) and index.get(1000, 1000, 1000, 'none') == 'none'
+
+
+def test_box_queries(filled):
+    index, cells = filled
+    rng = np.random.default_rng(1)
+    for _ in range(30):
+        a, b = rng.integers(-45, 45, (2, 3))
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        expected = {c: v for c, v in cells.items() if all(lo[i] <= c[i] <= hi[i] for i in range(3))}
+        assert as_dict(*index.query_box(lo, hi)) == expected
+    assert len(index.query_box((5, 5, 5), (4, 9, 9))[0]) == 0
+    # Larger than the populated world
+    assert as_dict(*index.query_box((-10**5,) * 3, (10**5,) * 3)) == cells
+
+
+def test_column_and_sphere_queries(filled):
+    index, cells = filled
+    for x, y, z in list(cells)[:50]:
+        ys, colors = index.query_column(x, z, y_min=y - 10)
+        expected = sorted((cy, c) for (cx, cy, cz), c in cells.items() if cx == x and cz == z and cy >= y - 10)
+        assert list(zip(ys.tolist(), colors.tolist())) == expected
+        center, radius = (x + 0.5, y - 0.25, z), 6.5
+        expected = {c: v for c, v in cells.items()
+                    if sum((c[i] - center[i]) ** 2 for i in range(3)) <= radius * radius}
+        assert as_dict(*index.query_sphere(center, radius)) == expected
+
+
+@pytest.mark.parametrize('connectivity', [6, 26])
+def test_neighbors(filled, connectivity):
+    index, cells = filled
+    offsets = NEIGHBORS_6 if connectivity == 6 else NEIGHBORS_26
+    probe = list(cells)[:100] + [(0, 0, 0), (40, 40, 40)]
+    counts = index.neighbor_counts(*(np.array(v) for v in zip(*probe)), connectivity=connectivity)
+    for (x, y, z), count in zip(probe, counts.tolist()):
+        expected = [(x + dx, y + dy, z + dz, cells[(x + dx, y + dy, z + dz)])
+                    for dx, dy, dz in offsets if (x + dx, y + dy, z + dz) in cells]
+        assert sorted(index.neighbors(x, y, z, connectivity)) == sorted(expected)
+        assert count == len(expected)
+    with pytest.raises(ValueError):
+        index.neighbors(0, 0, 0, connectivity=8)
+
+
+def test_duplicate_cells_keep_the_last_color():
+    index = SpatialIndex.from_arrays([1, 1, 2], [0, 0, 0], [3, 3, 3], [5, 6, 7])
+    assert len(index) == 2 and index.get(1, 0, 3) == 6
@@ -0,0 +1,72 @@
+"""stress_map.py: the streamed map is exactly what json.dump would write."""
+
+import json
+import re
+
+import pytest
+
+from stress_map import COLORS, DEFAULTS, LAND_Y, WATER, WATER_Y, parse_colors, parse_count, write_map
+from voxel_grid import to_columns, voxel_arrays
+
+SMALL = dict(DEFAULTS, voxels=3000, characters=3, actions=20, barriers=3, water=0.2, seed=5)
+
+
+@pytest.mark.parametrize('columnar', [False, True], ids=['objects', 'columns'])
+def test_output_matches_json_dump(tmp_path, columnar):
+    path = tmp_path / 'stress.json'
+    stats = write_map(path, dict(SMALL, columnar=columnar))
+    text = path.read_text()
+    data = json.loads(text)
+    assert text == json.dumps(data, indent=2)
+    assert stats['bytes'] == len(text.encode())
+
+    xs, ys, zs, colors = voxel_arrays(data['voxels'])
+    assert len(set(zip(xs.tolist(), ys.tolist(), zs.tolist()))) == len(xs) == SMALL['voxels']
+    keys = list(zip(xs.tolist(), ys.tolist(), zs.tolist()))
+    assert keys == sorted(keys)
+    if columnar:
+        assert data['voxels'] == to_columns(xs, ys, zs, colors)
+
+    water = colors == WATER
+    assert abs(water.mean() - SMALL['water']) < 0.01
+    assert ((ys[water] >= WATER_Y[0]) & (ys[water] < WATER_Y[1])).all()
+    assert ((ys[~water] >= LAND_Y[0]) & (ys[~water] < LAND_Y[1])).all()
+    assert set(colors[~water].tolist()) <= {COLORS[name] for name in SMALL['colors']}
+
+    characters = data['characterGroup']['characters']
+    assert len(characters) == 3 and all(len(c['actionQueue']) == 20 for c in characters)
+    assert all(c['startPosition']['y'] == LAND_Y[1] for c in characters)
+    assert list(data['barriers']['ropeRailings'])[1:] == ['northSide', 'southSide', 'railing3']
+
+
+def test_seeded_and_deterministic(tmp_path):
+    write_map(tmp_path / 'a.json', SMALL)
+    write_map(tmp_path / 'b.json', SMALL)
+    write_map(tmp_path / 'c.json', dict(SMALL, seed=6))
+    assert (tmp_path / 'a.json').read_bytes() == (tmp_path / 'b.json').read_bytes()
+    assert (tmp_path / 'a.json').read_bytes() != (tmp_path / 'c.json').read_bytes()
+
+
+def test_hex_colors(tmp_path):
+    path = tmp_path / 'hex.json'
+    write_map(path, dict(SMALL, hex_every=10, characters=0, barriers=0))
+    assert len(re.findall(r'"color": 0x[0-9a-f]{6}\n', path.read_text())) == SMALL['voxels'] // 10
+    with pytest.raises(ValueError):
+        json.loads(path.read_text())
+    with pytest.raises(ValueError):
+        write_map(path, dict(SMALL, hex_every=10, columnar=True))
+
+
+def test_empty_sections(tmp_path):
+    path = tmp_path / 'bare.json'
+    write_map(path, dict(SMALL, voxels=0, characters=0, barriers=0))
+    text = path.read_text()
+    assert text == json.dumps(json.loads(text), indent=2)
+    assert json.loads(text)['voxels'] == []
+
+
+def test_parse_arguments():
+    assert [parse_count(t) for t in ('250k', '10m', '1.5b', '42')] == [250_000, 10_000_000, 1_500_000_000, 42]
+    assert parse_colors('grass:0.6,stone,255:2') == {'grass': 0.6, 'stone': 1.0, '255': 2.0}
+    with pytest.raises(ValueError):
+        parse_colors('lava:1')
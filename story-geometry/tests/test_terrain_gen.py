@@ -0,0 +1,85 @@
+"""terrain_gen.py: baked regions regenerate identically and match a per-column loop."""
+
+import math
+
+import numpy as np
+import pytest
+
+from greedy_mesh import default_color
+from map_regions import load_regions
+from terrain_gen import (PRESETS, SALT_PILLAR, SALT_PILLAR_HEIGHT, _check_region, bake, default_colors,
+                         hash32, world_extent)
+
+SMALL = dict(PRESETS['classic'], size=(37, 29), pillar_chance=0.2)
+
+
+def hash32_reference(x, z, seed, salt=0):
+    mask = 0xffffffff
+    h = ((x & mask) * 0x27d4eb2d & mask) ^ ((z & mask) * 0x165667b1 & mask) \
+        ^ ((seed * 0x9e3779b9 + salt * 0x85ebca6b) & mask)
+    h ^= h >> 16
+    h = h * 0x7feb352d & mask
+    h ^= h >> 15
+    h = h * 0x846ca68b & mask
+    h ^= h >> 16
+    return h / 4294967296.0
+
+
+def classic_world(params, seed):
+    """{(x, y, z): color} built one column at a time, as createTerrain() does."""
+    cells = {}
+    x_lo, x_hi, z_lo, z_hi = world_extent(params)
+    lo, hi = params['pillar_height']
+    for x in range(x_lo, x_hi + 1):
+        for z in range(z_lo, z_hi + 1):
+            height = math.sin(x * 0.3) * 2 + math.cos(z * 0.3) * 2 + math.sin(math.sqrt(x * x + z * z) * 0.2) * 3
+            ground = math.floor(height)
+            for y in range(0, max(ground, 0) + 1):
+                cells[(x, y, z)] = default_color(y)
+            if hash32_reference(x, z, seed, SALT_PILLAR) < params['pillar_chance']:
+                pillar = math.floor(hash32_reference(x, z, seed, SALT_PILLAR_HEIGHT) * (hi - lo + 1)) + lo
+                for y in range(ground + 1, ground + pillar + 1):
+                    cells[(x, y, z)] = default_color(y)
+    return cells
+
+
+def test_hash32_matches_32_bit_reference():
+    rng = np.random.default_rng(0)
+    xs, zs = rng.integers(-10**6, 10**6, (2, 500))
+    for seed, salt in [(0, 0), (7, SALT_PILLAR), (2**31 - 1, 99)]:
+        expected = [hash32_reference(x, z, seed, salt) for x, z in zip(xs.tolist(), zs.tolist())]
+        assert hash32(xs, zs, seed, salt).tolist() == expected
+
+
+def test_default_colors_match_create_voxel():
+    ys = np.arange(-3, 14)
+    assert default_colors(ys).tolist() == [default_color(y) for y in ys.tolist()]
+
+
+@pytest.mark.parametrize('size', [8, 16])
+def test_baked_world_matches_column_loop(tmp_path, size):
+    manifest, out_dir, written = bake('classic', 7, SMALL, size=size, out_dir=tmp_path, jobs=2)
+    assert written == len(manifest['regions']) + 1
+    _, grid = load_regions(out_dir)
+    assert {(x, y, z): c for x, y, z, c in grid} == classic_world(SMALL, 7)
+    for entry in manifest['regions']:
+        assert _check_region((manifest['generator']['params'], 7, entry, size))
+
+
+def test_rebake_is_cached_and_deterministic(tmp_path):
+    first, _, _ = bake('classic', 3, SMALL, size=16, out_dir=tmp_path / 'a', jobs=1)
+    assert bake('classic', 3, SMALL, size=16, out_dir=tmp_path / 'a', jobs=1) == (None, tmp_path / 'a', 0)
+    second, _, _ = bake('classic', 3, SMALL, size=16, out_dir=tmp_path / 'b', jobs=3)
+    assert [r['sha256'] for r in first['regions']] == [r['sha256'] for r in second['regions']]
+
+    # A damaged region is not a cache hit and gets rewritten
+    damaged = tmp_path / 'a' / first['regions'][0]['file']
+    damaged.write_text('{}')
+    manifest, _, written = bake('classic', 3, SMALL, size=16, out_dir=tmp_path / 'a', jobs=1)
+    assert manifest is not None and written == 1
+
+
+def test_seeds_differ(tmp_path):
+    a, _, _ = bake('classic', 1, SMALL, size=16, out_dir=tmp_path / 'a', jobs=1)
+    b, _, _ = bake('classic', 2, SMALL, size=16, out_dir=tmp_path / 'b', jobs=1)
+    assert [r['sha256'] for r in a['regions']] != [r['sha256'] for r in b['regions']]
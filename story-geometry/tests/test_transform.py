@@ -0,0 +1,121 @@
+"""transform.py: chained transforms against a voxel-by-voxel, step-by-step oracle."""
+
+import math
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from transform import Transform, parse_steps, transform_map
+from voxel_grid import VoxelGrid
+
+AXIS = {'x': 0, 'y': 1, 'z': 2}
+
+
+def pivot_of(step, points):
+    pivot = step['pivot']
+    low = [min(p[i] for p in points) for i in range(3)]
+    high = [max(p[i] for p in points) for i in range(3)]
+    if pivot == 'center':
+        return [(low[i] + high[i]) // 2 for i in range(3)]
+    if pivot == 'min':
+        return low
+    return [Fraction(v) for v in pivot]
+
+
+def oracle(steps, points):
+    """Apply each step to each point in turn, rotating with cos/sin."""
+    for step in steps:
+        # Half-cell pivots may cancel out, but only between scale steps
+        if step['op'] == 'scale' and any(Fraction(c).denominator != 1 for p in points for c in p):
+            raise ValueError('off the grid')
+        if step['op'] == 'translate':
+            points = [tuple(p[i] + step['offset'][i] for i in range(3)) for p in points]
+        elif step['op'] == 'scale':
+            k = step['k']
+            pivot = [math.floor(v) for v in pivot_of(step, points)]
+            points = [tuple(pivot[i] + k * (p[i] - pivot[i]) + (dx, dy, dz)[i] for i in range(3))
+                      for p in points for dx in range(k) for dy in range(k) for dz in range(k)]
+        else:
+            pivot = pivot_of(step, points)
+            a = AXIS[step['axis']]
+            u, v = (a + 1) % 3, (a + 2) % 3
+            moved = []
+            for p in points:
+                q = [p[i] - pivot[i] for i in range(3)]
+                if step['op'] == 'mirror':
+                    q[a] = -q[a]
+                else:
+                    angle = math.radians(step['degrees'])
+                    c, s = round(math.cos(angle)), round(math.sin(angle))
+                    q[u], q[v] = c * q[u] - s * q[v], s * q[u] + c * q[v]
+                moved.append(tuple(q[i] + pivot[i] for i in range(3)))
+            points = moved
+    if any(Fraction(c).denominator != 1 for p in points for c in p):
+        raise ValueError('off the grid')
+    return [tuple(int(c) for c in p) for p in points]
+
+
+def random_transform(rng):
+    transform = Transform()
+    pivots = ['center', 'min', (3, -2, 5), (4.5, 0.5, -1.5), (4.5, 0, -1)]
+    for _ in range(int(rng.integers(1, 6))):
+        op = rng.choice(['rotate', 'mirror', 'translate', 'scale'], p=[0.4, 0.25, 0.25, 0.1])
+        pivot = pivots[int(rng.integers(len(pivots)))]
+        if op == 'rotate':
+            transform.rotate(str(rng.choice(list(AXIS))), int(rng.choice([90, 180, 270, -90])), pivot)
+        elif op == 'mirror':
+            transform.mirror(str(rng.choice(list(AXIS))), pivot)
+        elif op == 'translate':
+            transform.translate(*(int(v) for v in rng.integers(-5, 6, 3)))
+        else:
+            transform.scale(int(rng.integers(1, 3)), pivot)
+    return transform
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_matches_step_by_step_oracle(seed):
+    rng = np.random.default_rng(seed)
+    xs, ys, zs = rng.integers(-6, 7, (3, 40))
+    transform = random_transform(rng)
+    points = list(zip(xs.tolist(), ys.tolist(), zs.tolist()))
+    try:
+        expected = oracle(transform.steps, points)
+    except ValueError:
+        with pytest.raises(ValueError):
+            transform.apply_arrays(xs, ys, zs)
+        return
+    got = transform.apply_arrays(xs, ys, zs)
+    assert list(zip(*(v.tolist() for v in got[:3]))) == expected
+
+
+def test_four_quarter_turns_are_the_identity():
+    grid = VoxelGrid.from_arrays([0, 1, 2, 2], [0, 0, 1, 3], [5, 5, 6, 7], [1, 2, 3, 4])
+    for axis in AXIS:
+        transform = Transform()
+        for _ in range(4):
+            transform.rotate(axis, 90, pivot=(1, 1, 1))
+        assert list(transform.apply(grid)) == list(grid)
+
+
+def test_center_rotation_stays_in_place():
+    # Odd extents: the center is a cell, so the bounds do not move
+    grid = VoxelGrid.from_arrays([10, 11, 12, 12], [0, 0, 0, 1], [3, 3, 3, 5], [1, 1, 1, 1])
+    moved = Transform().rotate('y', 180).apply(grid)
+    assert moved.bounds() == grid.bounds()
+
+
+def test_transform_map_records_the_steps():
+    data = {'notes': 'old note'}
+    grid = VoxelGrid.from_arrays([0], [0], [0], [9])
+    transform = parse_steps(['rotate', 'y', '90', '@0,0,0', 'translate', '1,2,3', 'scale', '2'])
+    moved = transform_map(data, grid, transform)
+    assert len(moved) == 8 and set(moved.color.tolist()) == {9}
+    assert data['notes'] == {'previous': 'old note', 'transforms': [
+        'rotate y 90° about (0, 0, 0)', 'translate (1, 2, 3)', 'scale 2 about min']}
+
+
+@pytest.mark.parametrize('bad', [lambda t: t.rotate('y', 45), lambda t: t.scale(0), lambda t: t.scale(1.5)])
+def test_invalid_steps(bad):
+    with pytest.raises(ValueError):
+        bad(Transform())
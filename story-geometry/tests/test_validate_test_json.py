@@ -0,0 +1,48 @@
+"""validate-test-json.py: --stream reports what the whole-file validator reports."""
+
+import importlib.util
+import json
+
+import pytest
+
+from conftest import REPO_ROOT
+
+_spec = importlib.util.spec_from_file_location('validate_test_json', REPO_ROOT / 'validate-test-json.py')
+validator = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(validator)
+
+
+def columns(**overrides):
+    voxels = {'x': [0, 0, 1], 'y': [0, 1, 0], 'z': [0, 0, 0], 'c': [0, 1, 1], 'palette': [5, None]}
+    voxels.update(overrides)
+    return {'name': 'columns', 'voxels': voxels}
+
+
+CASES = {
+    'columnar': (json.dumps(columns(), indent=2), None),
+    'list': (json.dumps({'voxels': [{'x': 0, 'y': 0, 'z': 0, 'color': 5}]}, indent=2), None),
+    'negative c': (json.dumps(columns(c=[-1, 0, 1])), 'c=-1 is outside the palette (size 2)'),
+    'negative c in a run': (json.dumps(columns(c=[0, 1, -3])), 'c=-3 is outside the palette (size 2)'),
+    'c past palette': (json.dumps(columns(c=[0, 2, 1])), 'c=2 is outside the palette (size 2)'),
+    'short column': (json.dumps(columns(z=[0, 0])), 'columns differ in length'),
+    'float column': (json.dumps(columns(y=[0, 1.5, 0])), 'y must be integer, got float'),
+    'string palette': (json.dumps(columns(palette=[5, 'red'])), 'Palette 1: color must be integer'),
+    'hex color': ('{"voxels": [{"x": 0, "y": 0, "z": 0, "color": 0x228b22}]}', 'hex notation'),
+    'string color': (json.dumps({'voxels': [{'x': 0, 'y': 0, 'z': 0, 'color': '#fff'}]}),
+                     'color must be integer (decimal), got str'),
+}
+
+
+@pytest.mark.parametrize('case', list(CASES))
+@pytest.mark.parametrize('chunk_size', [7, 1 << 20])
+def test_stream_matches_file_validator(tmp_path, case, chunk_size):
+    text, expected = CASES[case]
+    path = tmp_path / 'map.json'
+    path.write_text(text)
+    whole = validator.validate_json_file(path)
+    stream = validator.validate_json_stream(path, chunk_size)
+    assert bool(stream) == bool(whole)
+    if expected is not None:
+        # Same message in both modes (the file validator adds the voxel index)
+        assert any(expected.lower() in line.lower() for line in stream), stream
+        assert any(expected.lower() in line.lower() for line in whole), whole
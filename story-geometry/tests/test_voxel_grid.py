@@ -0,0 +1,43 @@
+"""voxel_grid.py: VoxelGrid against a dict of cells, and uncolored voxels."""
+
+import numpy as np
+import pytest
+
+from voxel_grid import NO_COLOR, VoxelGrid, to_columns
+
+
+def cells(grid):
+    return {(x, y, z): c for x, y, z, c in grid}
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_edits_match_a_dict(seed):
+    rng = np.random.default_rng(seed)
+    grid, expected = VoxelGrid(), {}
+    for _ in range(20):
+        xs, ys, zs = rng.integers(-5, 5, (3, 50))
+        colors = rng.integers(0, 4, 50)
+        if rng.random() < 0.5:
+            grid.add_arrays(xs, ys, zs, colors)
+            expected.update(zip(zip(xs.tolist(), ys.tolist(), zs.tolist()), colors.tolist()))
+        else:
+            for cell in zip(xs.tolist(), ys.tolist(), zs.tolist()):
+                assert grid.remove(*cell) == (expected.pop(cell, None) is not None)
+        assert cells(grid) == expected
+        assert all(grid.has(*cell) for cell in expected)
+
+
+VOXELS = [{'x': 0, 'y': 0, 'z': 0}, {'x': 1, 'y': 0, 'z': 0, 'color': 5}, {'x': 2, 'y': 1, 'z': 0}]
+
+
+@pytest.mark.parametrize('voxels', [VOXELS, to_columns([0, 1, 2], [0, 0, 1], [0, 0, 0], [NO_COLOR, 5, NO_COLOR])],
+                         ids=['list', 'columns'])
+def test_uncolored_voxels_round_trip(voxels):
+    grid = VoxelGrid.from_voxels(voxels)
+    assert cells(grid) == {(0, 0, 0): NO_COLOR, (1, 0, 0): 5, (2, 1, 0): NO_COLOR}
+    assert grid.to_voxels() == VOXELS
+    assert grid.to_columns()['palette'] == [None, 5]
+
+    extended = VoxelGrid()
+    extended.extend(voxels)
+    assert cells(extended) == cells(grid)
@@ -0,0 +1,66 @@
+"""voxmap.py: lossless round-trip in the list and columnar layouts."""
+
+import json
+
+import pytest
+
+import voxmap
+from conftest import REPO_ROOT
+from voxel_grid import to_columns, voxel_arrays
+
+MAPS = ['complete-scene', 'ruins-test', 'cutscene-act-1-2-3', 'testWalkOffLedge']
+
+
+def load(name):
+    with open(REPO_ROOT / 'test-maps' / f'{name}.json') as f:
+        return json.load(f)
+
+
+def columnar(data):
+    return dict(data, voxels=to_columns(*voxel_arrays(data['voxels'])))
+
+
+@pytest.mark.parametrize('name', MAPS)
+def test_list_layout_round_trips(name):
+    data = load(name)
+    decoded = voxmap.decode(voxmap.encode(data))
+    assert isinstance(decoded['voxels'], list)
+    assert list(decoded) == list(data)
+    assert voxmap._canonical(decoded) == voxmap._canonical(data)
+
+
+@pytest.mark.parametrize('name', MAPS)
+def test_columnar_layout_round_trips(name):
+    data = columnar(load(name))
+    decoded = voxmap.decode(voxmap.encode(data))
+    # Canonical columns are already in cell order: exact equality
+    assert decoded['voxels'] == data['voxels']
+    assert voxmap.round_trips(data)
+
+
+def test_columnar_keeps_palette_order_and_duplicates():
+    voxels = {'x': [2, 0, 0, 1], 'y': [0, 0, 0, 1], 'z': [0, 0, 0, -3],
+              'c': [0, 2, 1, 2], 'palette': [9127187, None, 2263842]}
+    data = {'name': 'columns', 'voxels': voxels, 'goal': {'x': 0, 'y': 1, 'z': 0}}
+    decoded = voxmap.decode(voxmap.encode(data))
+    assert decoded['voxels']['palette'] == voxels['palette']
+    assert decoded['voxels']['x'] == [0, 0, 1, 2]
+    # Duplicate cell (0, 0, 0) keeps both entries in their original order
+    assert decoded['voxels']['c'] == [2, 1, 2, 0]
+    assert voxmap.round_trips(data)
+
+
+def test_list_layout_keeps_extra_keys_and_missing_colors():
+    data = {'voxels': [{'x': 1, 'y': 0, 'z': 0, 'type': 'water'},
+                       {'x': 0, 'y': 0, 'z': 0, 'color': 5}]}
+    decoded = voxmap.decode(voxmap.encode(data))
+    assert decoded['voxels'] == [{'x': 0, 'y': 0, 'z': 0, 'color': 5},
+                                 {'x': 1, 'y': 0, 'z': 0, 'type': 'water'}]
+
+
+def test_heightmap_is_rebaked_not_stored():
+    data = load('complete-scene')
+    assert 'heightmap' in data
+    blob = voxmap.encode(data)
+    assert b'"heightmap":null' in blob
+    assert voxmap.decode(blob)['heightmap'] == data['heightmap']
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Vectorized affine transforms for voxel assets: 90-degree rotations about
+any axis, mirroring, translation and integer scaling, each about a chosen
+pivot, chained and applied to whole coordinate arrays at once.
+
+Coordinates are cell centers (index.html draws a voxel centered on x, y, z),
+so rotating about pivot 17 maps x to 34 - x. An explicit pivot may sit on a
+half cell (e.g. 16.5 mirrors an even-sized asset exactly in place): the math
+runs in doubled coordinates and raises ValueError if a step would move
+voxels off the grid.
+
+    from transform import Transform
+
+    t = Transform().rotate('y', 180, pivot=(17, 0, 0)).translate(3, 0, 0)
+    moved = t.apply(grid)                       # new VoxelGrid
+    t.describe()   # ['rotate y 180° about (17, 0, 0)', 'translate (3, 0, 0)']
+
+    moved = transform_map(data, grid, t)        # + appends to data['notes']['transforms']
+
+Pivots: a point (x, y, z), 'center' (bounding-box center of the asset as it
+is at that step, rounded down to a cell) or 'min' (its bounding-box minimum
+corner). The default is 'center', which means "in place".
+
+Rotations, mirrors and translations between two scale steps fold into one
+integer matrix, applied in a single pass. scale(k) turns each voxel into
+a k x k x k block: cell p becomes pivot + k * (p - pivot) + [0, k) per axis,
+with the pivot rounded down to a cell.
+
+Only voxels are transformed; playerStart, goal and other keys stay as they
+are.
+
+Usage:
+    python3 story-geometry/transform.py <in.json> <out.json> <step> [<step> ...]
+    steps: rotate <x|y|z> <90|180|270> [@pivot] | mirror <x|y|z> [@pivot]
+           | translate dx,dy,dz | scale k [@pivot]
+    pivot: @x,y,z | @center | @min
+
+    python3 story-geometry/transform.py story-geometry/ruins-complete.json /tmp/ruins.json \\
+        rotate y 90 @center translate 0,0,12
+"""
+
+import sys
+
+import numpy as np
+
+from heightmap import save_map
+from profiling import stage
+from voxel_grid import VoxelGrid, load_map
+
+AXES = {'x': 0, 'y': 1, 'z': 2}
+
+
+def _rotation(axis, degrees):
+    """Integer 3x3 matrix for a right-handed rotation by a multiple of 90 degrees."""
+    if degrees % 90:
+        raise ValueError(f"Rotation must be a multiple of 90 degrees, got {degrees}")
+    turns = (degrees // 90) % 4
+    c, s = [1, 0, -1, 0][turns], [0, 1, 0, -1][turns]
+    a = AXES[axis]
+    u, v = (a + 1) % 3, (a + 2) % 3
+    matrix = np.eye(3, dtype=np.int64)
+    matrix[u, u], matrix[u, v] = c, -s
+    matrix[v, u], matrix[v, v] = s, c
+    return matrix
+
+
+def _format_point(point):
+    text = ', '.join(f"{v:g}" for v in point)
+    return f"({text})"
+
+
+class Transform:
+    """A chain of transform steps. Builder methods return self."""
+
+    def __init__(self):
+        self.steps = []
+
+    # ---- Building ----
+
+    def rotate(self, axis, degrees, pivot='center'):
+        self.steps.append({'op': 'rotate', 'axis': axis, 'degrees': degrees, 'pivot': pivot,
+                           'matrix': _rotation(axis, degrees)})
+        return self
+
+    def mirror(self, axis, pivot='center'):
+        matrix = np.eye(3, dtype=np.int64)
+        matrix[AXES[axis], AXES[axis]] = -1
+        self.steps.append({'op': 'mirror', 'axis': axis, 'pivot': pivot, 'matrix': matrix})
+        return self
+
+    def translate(self, dx, dy, dz):
+        self.steps.append({'op': 'translate', 'offset': (dx, dy, dz)})
+        return self
+
+    def scale(self, k, pivot='min'):
+        if int(k) != k or k < 1:
+            raise ValueError(f"Scale must be a positive integer, got {k}")
+        self.steps.append({'op': 'scale', 'k': int(k), 'pivot': pivot})
+        return self
+
+    def then(self, other):
+        """Append another Transform's steps (chaining)."""
+        self.steps.extend(other.steps)
+        return self
+
+    def describe(self):
+        """Human-readable step list, for notes provenance."""
+        lines = []
+        for step in self.steps:
+            pivot = step.get('pivot')
+            about = f" about {_format_point(pivot) if isinstance(pivot, tuple) else pivot}" if pivot is not None else ''
+            if step['op'] == 'rotate':
+                lines.append(f"rotate {step['axis']} {step['degrees']}°{about}")
+            elif step['op'] == 'mirror':
+                lines.append(f"mirror {step['axis']}{about}")
+            elif step['op'] == 'translate':
+                lines.append(f"translate {_format_point(step['offset'])}")
+            else:
+                lines.append(f"scale {step['k']}{about}")
+        return lines
+
+    # ---- Applying ----
+
+    @staticmethod
+    def _pivot2(pivot, low2, high2):
+        """Pivot in doubled coordinates."""
+        if pivot == 'center':
+            # Rounded down to a cell so any rotation stays on the grid
+            return (low2 + high2) // 4 * 2
+        if pivot == 'min':
+            return low2.copy()
+        return np.array([round(2 * v) for v in pivot], dtype=np.int64)
+
+    def apply_arrays(self, xs, ys, zs, colors=None):
+        """
+        Transform coordinate arrays. Returns (xs, ys, zs, colors); with a
+        scale step the arrays grow by k^3.
+        """
+        points = np.stack([np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64),
+                           np.asarray(zs, dtype=np.int64)], axis=1)
+        colors = None if colors is None else np.asarray(colors, dtype=np.int64)
+        if len(points) == 0 or not self.steps:
+            return points[:, 0], points[:, 1], points[:, 2], colors
+
+        # Pending affine map in doubled coordinates: p2' = linear @ p2 + offset2
+        linear = np.eye(3, dtype=np.int64)
+        offset2 = np.zeros(3, dtype=np.int64)
+        low2, high2 = 2 * points.min(axis=0), 2 * points.max(axis=0)
+
+        def flush():
+            nonlocal points, linear, offset2
+            # 2 * linear @ p is even, so only the offset can land on a half cell
+            if (offset2 % 2).any():
+                raise ValueError("Transform moves voxels off the grid (half-cell pivot on an odd-parity axis)")
+            points = points @ linear.T + offset2 // 2
+            linear = np.eye(3, dtype=np.int64)
+            offset2 = np.zeros(3, dtype=np.int64)
+
+        for step in self.steps:
+            if step['op'] == 'translate':
+                shift2 = 2 * np.array(step['offset'], dtype=np.int64)
+                offset2 += shift2
+                low2, high2 = low2 + shift2, high2 + shift2
+            elif step['op'] in ('rotate', 'mirror'):
+                matrix = step['matrix']
+                pivot2 = self._pivot2(step['pivot'], low2, high2)
+                # p' = M (p - pivot) + pivot, folded into the pending map
+                linear = matrix @ linear
+                offset2 = matrix @ (offset2 - pivot2) + pivot2
+                corners = np.stack([matrix @ (low2 - pivot2) + pivot2, matrix @ (high2 - pivot2) + pivot2])
+                low2, high2 = corners.min(axis=0), corners.max(axis=0)
+            else:
+                flush()
+                k = step['k']
+                pivot = self._pivot2(step['pivot'], low2, high2) // 2
+                base = pivot + k * (points - pivot)
+                block = np.stack(np.meshgrid(*[np.arange(k)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+                points = (base[:, None, :] + block[None, :, :]).reshape(-1, 3)
+                if colors is not None:
+                    colors = np.repeat(colors, len(block))
+                low2, high2 = 2 * points.min(axis=0), 2 * points.max(axis=0)
+        flush()
+        return points[:, 0], points[:, 1], points[:, 2], colors
+
+    def apply(self, grid):
+        """New VoxelGrid with every voxel transformed (row order kept)."""
+        with stage('transform', voxels_in=len(grid)) as s:
+            xs, ys, zs, colors = self.apply_arrays(grid.x, grid.y, grid.z, grid.color)
+            moved = VoxelGrid.from_arrays(xs, ys, zs, colors)
+            s.voxels_out = len(moved)
+        return moved
+
+
+def transform_map(data, grid, transform):
+    """Transform a map's voxels and record the steps in data['notes']['transforms']."""
+    moved = transform.apply(grid)
+    notes = data.setdefault('notes', {})
+    if not isinstance(notes, dict):
+        notes = data['notes'] = {'previous': notes}
+    notes.setdefault('transforms', []).extend(transform.describe())
+    return moved
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def _parse_pivot(text):
+    if text in ('center', 'min'):
+        return text
+    return tuple(float(v) if '.' in v else int(v) for v in text.split(','))
+
+
+def parse_steps(args):
+    """['rotate', 'y', '90', '@center', 'translate', '1,0,0', ...] -> Transform."""
+    transform = Transform()
+    i = 0
+
+    def pivot_arg(default):
+        nonlocal i
+        if i < len(args) and args[i].startswith('@'):
+            i += 1
+            return _parse_pivot(args[i - 1][1:])
+        return default
+
+    while i < len(args):
+        op = args[i]
+        if op == 'rotate':
+            axis, degrees = args[i + 1], int(args[i + 2])
+            i += 3
+            transform.rotate(axis, degrees, pivot_arg('center'))
+        elif op == 'mirror':
+            axis = args[i + 1]
+            i += 2
+            transform.mirror(axis, pivot_arg('center'))
+        elif op == 'translate':
+            dx, dy, dz = (int(v) for v in args[i + 1].split(','))
+            i += 2
+            transform.translate(dx, dy, dz)
+        elif op == 'scale':
+            k = int(args[i + 1])
+            i += 2
+            transform.scale(k, pivot_arg('min'))
+        else:
+            raise ValueError(f"Unknown step {op!r}")
+    return transform
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("Usage: python3 story-geometry/transform.py <in.json> <out.json> <step> [<step> ...]")
+        print("  steps: rotate <x|y|z> <deg> [@pivot] | mirror <axis> [@pivot] | translate dx,dy,dz | scale k [@pivot]")
+        print("\nExample:")
+        print("  python3 story-geometry/transform.py story-geometry/ruins-complete.json /tmp/ruins.json "
+              "rotate y 90 @center translate 0,0,12")
+        sys.exit(1)
+
+    in_path, out_path = sys.argv[1], sys.argv[2]
+    try:
+        transform = parse_steps(sys.argv[3:])
+        data, grid = load_map(in_path)
+        moved = transform_map(data, grid, transform)
+    except (OSError, ValueError, IndexError, KeyError) as error:
+        print(f"❌ {error}")
+        sys.exit(1)
+
+    save_map(data, moved, out_path)
+    print(f"✓ {in_path} → {out_path}: {len(grid)} → {len(moved)} voxels")
+    for line in transform.describe():
+        print(f"  {line}")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
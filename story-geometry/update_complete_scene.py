@@ -1,15 +1,19 @@
-import json
+from compose import compose, format_report, layer
+from heightmap import save_map
+from voxel_grid import load_map
 
 # Read bridge + forest floor
-with open('story-geometry/bridge-over-forest-floor.json', 'r') as f:
-    bridge_data = json.load(f)
+bridge_data, bridge_grid = load_map('story-geometry/bridge-over-forest-floor.json')
 
 # Read updated ruins
-with open('story-geometry/ruins-complete.json', 'r') as f:
-    ruins_data = json.load(f)
+ruins_data, ruins_grid = load_map('story-geometry/ruins-complete.json')
 
-# Combine voxels
-combined_voxels = bridge_data['voxels'] + ruins_data['voxels']
+# Combine voxels (ruins win where cells overlap)
+combined_voxels, overlaps = compose([
+    layer('bridge', bridge_grid),
+    layer('ruins', ruins_grid),
+])
+print('\n'.join(format_report(overlaps)))
 
 # Create complete scene
 complete_scene = {
@@ -18,7 +22,6 @@ complete_scene = {
     'category': 'story-geometry',
     'playerStart': {'x': 0, 'y': 1, 'z': 0},
     'goal': {'x': 23, 'y': 2, 'z': 0},  # Updated for pushed-back ruins
-    'voxels': combined_voxels,
     'notes': {
         'components': [
             'Rope bridge (X: 0-11)',
@@ -30,15 +33,11 @@ complete_scene = {
 }
 
 # Write complete scene
-with open('story-geometry/complete-scene.json', 'w') as f:
-    json.dump(complete_scene, f, indent=2)
+save_map(complete_scene, combined_voxels, 'story-geometry/complete-scene.json', heightmap=True)
 
 # Update test maps
-with open('test-maps/ruins-test.json', 'w') as f:
-    json.dump(ruins_data, f, indent=2)
-
-with open('test-maps/complete-scene.json', 'w') as f:
-    json.dump(complete_scene, f, indent=2)
+save_map(ruins_data, None, 'test-maps/ruins-test.json')
+save_map(complete_scene, combined_voxels, 'test-maps/complete-scene.json')
 
 print("Updated complete-scene.json and test maps")
 print(f"Total voxels in complete scene: {len(combined_voxels)}")
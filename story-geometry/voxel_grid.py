@@ -0,0 +1,448 @@
+"""
+Array-backed voxel storage shared by the story-geometry scripts.
+
+A scene is held as four NumPy columns (x, y, z, color) plus a dict index
+keyed on packed integer coordinates, so "is there a voxel here?" is O(1)
+instead of a scan over a list of {'x','y','z','color'} dicts.
+
+Scripts are run from the repo root (python3 story-geometry/<script>.py),
+which puts this directory on sys.path:
+
+    from voxel_grid import VoxelGrid, load_map, save_map
+
+    data, grid = load_map('story-geometry/ruins-complete.json')
+    if not grid.has(14, 0, -4):
+        grid.add(14, 0, -4, 2263842)
+    save_map(data, grid, 'story-geometry/ruins-complete.json')
+"""
+
+import json
+
+import numpy as np
+
+from asset_store import write_json
+from profiling import stage
+
+# Each axis gets 21 bits, biased so negative coordinates (river bed at
+# y=-2, zombie at y=-1) pack into a non-negative int64.
+COORD_BITS = 21
+COORD_BIAS = 1 << (COORD_BITS - 1)
+COORD_MASK = (1 << COORD_BITS) - 1
+COORD_MIN = -COORD_BIAS
+COORD_MAX = COORD_BIAS - 1
+
+
+def pack(x, y, z):
+    """Pack integer coordinates into a single int key."""
+    return (((x + COORD_BIAS) & COORD_MASK) << (2 * COORD_BITS)) | \
+           (((y + COORD_BIAS) & COORD_MASK) << COORD_BITS) | \
+           ((z + COORD_BIAS) & COORD_MASK)
+
+
+def unpack(key):
+    """Inverse of pack(): key -> (x, y, z)."""
+    x = ((key >> (2 * COORD_BITS)) & COORD_MASK) - COORD_BIAS
+    y = ((key >> COORD_BITS) & COORD_MASK) - COORD_BIAS
+    z = (key & COORD_MASK) - COORD_BIAS
+    return x, y, z
+
+
+def pack_arrays(xs, ys, zs):
+    """Vectorized pack() over coordinate arrays, returns int64 keys."""
+    xs = np.asarray(xs, dtype=np.int64) + COORD_BIAS
+    ys = np.asarray(ys, dtype=np.int64) + COORD_BIAS
+    zs = np.asarray(zs, dtype=np.int64) + COORD_BIAS
+    return ((xs & COORD_MASK) << (2 * COORD_BITS)) | \
+           ((ys & COORD_MASK) << COORD_BITS) | \
+           (zs & COORD_MASK)
+
+
+def unpack_arrays(keys):
+    """Vectorized unpack(), returns (xs, ys, zs) int32 arrays."""
+    keys = np.asarray(keys, dtype=np.int64)
+    xs = ((keys >> (2 * COORD_BITS)) & COORD_MASK) - COORD_BIAS
+    ys = ((keys >> COORD_BITS) & COORD_MASK) - COORD_BIAS
+    zs = (keys & COORD_MASK) - COORD_BIAS
+    return xs.astype(np.int32), ys.astype(np.int32), zs.astype(np.int32)
+
+
+class VoxelGrid:
+    """
+    One voxel per cell, stored column-wise.
+
+    Rows 0..len-1 of the column arrays are live; the dict index maps a
+    packed key to its row. Removing a voxel moves the last row into the
+    hole, so row order is insertion order until the first removal.
+    """
+
+    def __init__(self, capacity=64):
+        capacity = max(int(capacity), 1)
+        self._x = np.empty(capacity, dtype=np.int32)
+        self._y = np.empty(capacity, dtype=np.int32)
+        self._z = np.empty(capacity, dtype=np.int32)
+        self._color = np.empty(capacity, dtype=np.int64)
+        self._keys = np.empty(capacity, dtype=np.int64)
+        self._index = {}
+        self._size = 0
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_voxels(cls, voxels):
+        """
+        Build from map JSON voxels: a list of {'x','y','z','color'} dicts or
+        columns. Voxels without a color get NO_COLOR.
+        """
+        return cls.from_arrays(*voxel_arrays(voxels))
+
+    @classmethod
+    def from_arrays(cls, xs, ys, zs, colors):
+        grid = cls(capacity=len(xs))
+        grid.add_arrays(xs, ys, zs, colors)
+        return grid
+
+    def copy(self):
+        grid = VoxelGrid(capacity=self._size)
+        n = self._size
+        grid._x[:n] = self._x[:n]
+        grid._y[:n] = self._y[:n]
+        grid._z[:n] = self._z[:n]
+        grid._color[:n] = self._color[:n]
+        grid._keys[:n] = self._keys[:n]
+        grid._index = dict(self._index)
+        grid._size = n
+        return grid
+
+    # ------------------------------------------------------------------
+    # Column views (live rows only - do not hold across mutations)
+    # ------------------------------------------------------------------
+
+    @property
+    def x(self):
+        return self._x[:self._size]
+
+    @property
+    def y(self):
+        return self._y[:self._size]
+
+    @property
+    def z(self):
+        return self._z[:self._size]
+
+    @property
+    def color(self):
+        return self._color[:self._size]
+
+    @property
+    def keys(self):
+        return self._keys[:self._size]
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, xyz):
+        return pack(*xyz) in self._index
+
+    def has(self, x, y, z):
+        return pack(x, y, z) in self._index
+
+    def get(self, x, y, z, default=None):
+        """Color at (x, y, z), or default if the cell is empty."""
+        row = self._index.get(pack(x, y, z))
+        if row is None:
+            return default
+        return int(self._color[row])
+
+    def has_keys(self, keys):
+        """Vectorized occupancy test for an array of packed keys."""
+        index = self._index
+        return np.fromiter((k in index for k in np.asarray(keys).tolist()),
+                           dtype=bool, count=len(keys))
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+
+    def _reserve(self, needed):
+        capacity = len(self._x)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('_x', '_y', '_z', '_color', '_keys'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def add(self, x, y, z, color):
+        """
+        Place a voxel. An existing voxel in the same cell is recolored.
+        Returns True if the cell was previously empty.
+        """
+        key = pack(x, y, z)
+        row = self._index.get(key)
+        if row is not None:
+            self._color[row] = color
+            return False
+        self._reserve(self._size + 1)
+        row = self._size
+        self._x[row] = x
+        self._y[row] = y
+        self._z[row] = z
+        self._color[row] = color
+        self._keys[row] = key
+        self._index[key] = row
+        self._size += 1
+        return True
+
+    def add_if_empty(self, x, y, z, color):
+        """Place a voxel only if the cell is free. Returns True if placed."""
+        if pack(x, y, z) in self._index:
+            return False
+        return self.add(x, y, z, color)
+
+    def add_arrays(self, xs, ys, zs, colors):
+        """
+        Bulk add. Later entries win over earlier ones (within the batch
+        and against voxels already in the grid), matching add() in a loop.
+        Returns the number of newly occupied cells.
+        """
+        xs = np.asarray(xs, dtype=np.int32)
+        ys = np.asarray(ys, dtype=np.int32)
+        zs = np.asarray(zs, dtype=np.int32)
+        colors = np.asarray(colors, dtype=np.int64)
+        if len(xs) == 0:
+            return 0
+        keys = pack_arrays(xs, ys, zs)
+
+        # Keep the last occurrence of each key, in first-seen order
+        rev_keys = keys[::-1]
+        _, rev_first = np.unique(rev_keys, return_index=True)
+        last = len(keys) - 1 - rev_first
+        _, first = np.unique(keys, return_index=True)
+        order = np.argsort(first, kind='stable')
+        keep_first = first[order]
+        keep_last = last[order]
+
+        index = self._index
+        key_list = keys[keep_first].tolist()
+        existing = np.fromiter((k in index for k in key_list),
+                               dtype=bool, count=len(key_list))
+
+        # Recolor cells that are already occupied
+        if existing.any():
+            rows = np.fromiter((index[k] for k, e in zip(key_list, existing) if e),
+                               dtype=np.int64)
+            self._color[rows] = colors[keep_last[existing]]
+
+        # Append new cells
+        new_src = keep_last[~existing]
+        n_new = len(new_src)
+        if n_new:
+            start = self._size
+            self._reserve(start + n_new)
+            end = start + n_new
+            self._x[start:end] = xs[new_src]
+            self._y[start:end] = ys[new_src]
+            self._z[start:end] = zs[new_src]
+            self._color[start:end] = colors[new_src]
+            self._keys[start:end] = keys[new_src]
+            for offset, k in enumerate(self._keys[start:end].tolist()):
+                index[k] = start + offset
+            self._size = end
+        return n_new
+
+    def extend(self, other):
+        """Add every voxel from another grid, list of voxel dicts or columns."""
+        if isinstance(other, VoxelGrid):
+            return self.add_arrays(other.x, other.y, other.z, other.color)
+        return self.add_arrays(*voxel_arrays(other))
+
+    def remove(self, x, y, z):
+        """Remove the voxel at (x, y, z). Returns True if one was there."""
+        row = self._index.pop(pack(x, y, z), None)
+        if row is None:
+            return False
+        last = self._size - 1
+        if row != last:
+            self._x[row] = self._x[last]
+            self._y[row] = self._y[last]
+            self._z[row] = self._z[last]
+            self._color[row] = self._color[last]
+            self._keys[row] = self._keys[last]
+            self._index[int(self._keys[row])] = row
+        self._size = last
+        return True
+
+    def select(self, mask):
+        """New grid holding only the rows where mask is True."""
+        mask = np.asarray(mask, dtype=bool)
+        return VoxelGrid.from_arrays(self.x[mask], self.y[mask],
+                                     self.z[mask], self.color[mask])
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def __iter__(self):
+        """Yield (x, y, z, color) tuples in row order."""
+        return zip(self.x.tolist(), self.y.tolist(),
+                   self.z.tolist(), self.color.tolist())
+
+    def to_voxels(self):
+        """List of {'x','y','z','color'} dicts for the map JSON schema (no 'color' for NO_COLOR)."""
+        return [{'x': x, 'y': y, 'z': z} if c == NO_COLOR else {'x': x, 'y': y, 'z': z, 'color': c}
+                for x, y, z, c in self]
+
+    def to_columns(self):
+        """Columnar map JSON voxels in canonical order (see to_columns())."""
+        return to_columns(self.x, self.y, self.z, self.color)
+
+    def bounds(self):
+        """((min_x, min_y, min_z), (max_x, max_y, max_z)) or None if empty."""
+        if self._size == 0:
+            return None
+        return ((int(self.x.min()), int(self.y.min()), int(self.z.min())),
+                (int(self.x.max()), int(self.y.max()), int(self.z.max())))
+
+    def color_counts(self):
+        """{color: count} for every color in the grid."""
+        colors, counts = np.unique(self.color, return_counts=True)
+        return dict(zip(colors.tolist(), counts.tolist()))
+
+
+# ----------------------------------------------------------------------
+# Columnar layout
+# ----------------------------------------------------------------------
+# A map's "voxels" may also be stored as columns:
+#
+#     "voxels": {"x": [...], "y": [...], "z": [...], "c": [...], "palette": [...]}
+#
+# One row per cell, sorted by (x, y, z); c indexes palette (sorted colors,
+# null for voxels without a color). Parsing makes five lists of numbers
+# instead of one dict per voxel, and because the order is canonical,
+# regenerating a scene only changes the rows that really changed.
+
+COLUMN_KEYS = ('x', 'y', 'z', 'c')
+NO_COLOR = -1  # voxels without a color (index.html picks one by height)
+
+
+def is_columnar(voxels):
+    return isinstance(voxels, dict)
+
+
+def voxel_arrays(voxels):
+    """
+    (xs, ys, zs, colors) int64 arrays from map JSON voxels in either layout,
+    NO_COLOR where a voxel has no color. Raises ValueError on bad columns.
+    """
+    if not is_columnar(voxels):
+        voxels = list(voxels or [])
+        return (np.array([v['x'] for v in voxels], dtype=np.int64),
+                np.array([v['y'] for v in voxels], dtype=np.int64),
+                np.array([v['z'] for v in voxels], dtype=np.int64),
+                np.array([NO_COLOR if v.get('color') is None else v['color'] for v in voxels], dtype=np.int64))
+    if len({len(voxels.get(k, ())) for k in COLUMN_KEYS}) != 1:
+        raise ValueError("Columnar voxels: x, y, z and c must have the same length")
+    palette = np.array([NO_COLOR if c is None else c for c in voxels.get('palette', [])], dtype=np.int64)
+    c = np.asarray(voxels['c'], dtype=np.int64)
+    if len(c) and (c.min() < 0 or c.max() >= len(palette)):
+        raise ValueError(f"Columnar voxels: c must index the palette (0..{len(palette) - 1})")
+    return (np.asarray(voxels['x'], dtype=np.int64), np.asarray(voxels['y'], dtype=np.int64),
+            np.asarray(voxels['z'], dtype=np.int64), palette[c])
+
+
+def to_columns(xs, ys, zs, colors):
+    """Canonical columnar voxels. Duplicate cells keep the last color."""
+    keys = pack_arrays(xs, ys, zs)
+    colors = np.asarray(colors, dtype=np.int64)
+    # Last occurrence of each cell, in key (x, y, z) order
+    keys, first = np.unique(keys[::-1], return_index=True)
+    palette, c = np.unique(colors[::-1][first], return_inverse=True)
+    xs, ys, zs = unpack_arrays(keys)
+    return {'x': xs.tolist(), 'y': ys.tolist(), 'z': zs.tolist(), 'c': c.tolist(),
+            'palette': [None if p == NO_COLOR else p for p in palette.tolist()]}
+
+
+# ----------------------------------------------------------------------
+# Content hash
+# ----------------------------------------------------------------------
+# Baked artifacts (heightmap sidecar, <map>.glb) record the hash of the
+# voxels they were built from; index.html recomputes it (voxelHash()) and
+# ignores an artifact whose hash differs. Each voxel is hashed on its own
+# (two 32-bit murmur-style lanes over x, y, z and optionally color) and the
+# lanes are summed mod 2^32, so the hash is independent of voxel order and
+# cheap to compute in JavaScript with Math.imul.
+
+HASH_SEEDS = (0x243F6A88, 0x85A308D3)
+_U32 = 0xFFFFFFFF
+
+
+def _fmix32(h):
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & _U32
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & _U32
+    h ^= h >> 16
+    return h
+
+
+def voxel_hash(xs, ys, zs, colors=None):
+    """16 hex digits identifying a set of cells (and their colors, if given)."""
+    values = [np.asarray(v, dtype=np.int64) for v in (xs, ys, zs)]
+    if colors is not None:
+        values.append(np.asarray(colors, dtype=np.int64))
+    values = [(v & _U32).astype(np.uint64) for v in values]
+    digits = ''
+    for seed in HASH_SEEDS:
+        h = np.full(len(values[0]), seed, dtype=np.uint64)
+        for v in values:
+            h = _fmix32((h + v * 0x9E3779B1) & _U32)
+        digits += f"{int(h.sum()) & _U32:08x}"
+    return digits
+
+
+def voxel_list(voxels):
+    """Map JSON voxels as a list of dicts (voxels without a color have no 'color' key)."""
+    if not is_columnar(voxels):
+        return list(voxels or [])
+    xs, ys, zs, colors = voxel_arrays(voxels)
+    return [{'x': x, 'y': y, 'z': z} if c == NO_COLOR else {'x': x, 'y': y, 'z': z, 'color': c}
+            for x, y, z, c in zip(xs.tolist(), ys.tolist(), zs.tolist(), colors.tolist())]
+
+
+def load_map(path):
+    """Read a map JSON file. Returns (data, grid)."""
+    with stage('load') as s:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        grid = VoxelGrid.from_voxels(data.get('voxels', []))
+        s.voxels_out = len(grid)
+    return data, grid
+
+
+def save_map(data, grid, *paths):
+    """
+    Write data with grid as its 'voxels' to each path (indent=2), keeping
+    the layout data['voxels'] already has (list or columns). Paths shared
+    through asset_store.py are stored once; unchanged files are not
+    rewritten. A heightmap sidecar that no longer matches the voxels is
+    dropped; heightmap.save_map() re-bakes it instead.
+    """
+    with stage('save', voxels_in=None if grid is None else len(grid)):
+        if grid is not None:
+            data['voxels'] = grid.to_columns() if is_columnar(data.get('voxels')) else grid.to_voxels()
+        sidecar = data.get('heightmap')
+        if sidecar is not None:
+            cells = grid if grid is not None else VoxelGrid.from_voxels(data.get('voxels', []))
+            if sidecar.get('voxelHash') != voxel_hash(cells.x, cells.y, cells.z):
+                del data['heightmap']
+        for path in paths:
+            write_json(path, data)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Convert maps between the two JSON voxel layouts and compare their cost.
+
+    objects   "voxels": [{"x": 0, "y": 0, "z": 0, "color": 2263842}, ...]
+    columnar  "voxels": {"x": [...], "y": [...], "z": [...], "c": [...], "palette": [...]}
+
+The columnar layout (see voxel_grid.py) is sorted by (x, y, z) with c
+indexing a sorted color palette, so the same scene always serializes to the
+same bytes. Both stay plain indent=2 JSON and every reader accepts either:
+voxel_grid.load_map(), greedy_mesh.grid_from_map(), validate-test-json.py
+and index.html (loadTestMap). save_map() keeps whichever layout a map was
+loaded in.
+
+Conversion goes through asset_store.write_json(), so shared maps stay
+shared and unchanged files are not rewritten. Voxels with keys other than
+x, y, z and color cannot be stored in columns and are refused.
+
+Usage:
+    python3 story-geometry/voxel_layout.py columnar test-maps/cutscene-act-1-2-3.json
+    python3 story-geometry/voxel_layout.py objects test-maps/cutscene-act-1-2-3.json
+    python3 story-geometry/voxel_layout.py stats test-maps/*.json
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from asset_store import write_json
+from voxel_grid import is_columnar, to_columns, voxel_arrays, voxel_list
+
+VOXEL_KEYS = {'x', 'y', 'z', 'color'}
+
+
+def convert(data, layout):
+    """data with its voxels in layout ('columnar' or 'objects'), key order kept."""
+    voxels = data.get('voxels')
+    if voxels is None:
+        return data
+    if layout == 'columnar':
+        if not is_columnar(voxels):
+            extra = next((v for v in voxels if not VOXEL_KEYS.issuperset(v)), None)
+            if extra is not None:
+                raise ValueError(f"voxel {extra} has keys the columnar layout cannot hold")
+        voxels = to_columns(*voxel_arrays(voxels))
+    else:
+        voxels = voxel_list(voxels)
+    return {k: (voxels if k == 'voxels' else v) for k, v in data.items()}
+
+
+def parse_cost(text):
+    """(seconds, peak bytes) to json.loads text; timed without tracing."""
+    start = time.perf_counter()
+    json.loads(text)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    json.loads(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ('columnar', 'objects', 'stats'):
+        print("Usage: python3 story-geometry/voxel_layout.py <columnar|objects|stats> <maps>")
+        print("\nExample:")
+        print("  python3 story-geometry/voxel_layout.py columnar test-maps/cutscene-act-1-2-3.json")
+        print("  python3 story-geometry/voxel_layout.py stats test-maps/*.json")
+        sys.exit(1)
+
+    command = args[0]
+    all_ok = True
+    for filepath in args[1:]:
+        path = Path(filepath)
+        if not path.exists():
+            print(f"❌ {filepath}: File not found")
+            all_ok = False
+            continue
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if 'voxels' not in data:
+            continue
+        layout = 'columnar' if is_columnar(data['voxels']) else 'objects'
+
+        try:
+            if command == 'stats':
+                sizes = {}
+                for target in ('objects', 'columnar'):
+                    text = json.dumps(convert(data, target), indent=2)
+                    seconds, peak = parse_cost(text)
+                    sizes[target] = (len(text), seconds, peak)
+                (ob, ot, om), (cb, ct, cm) = sizes['objects'], sizes['columnar']
+                print(f"✓ {filepath} ({layout}, {len(voxel_arrays(data['voxels'])[0])} voxels): "
+                      f"objects {ob} bytes {ot * 1000:.1f}ms {om >> 10} KB, "
+                      f"columnar {cb} bytes {ct * 1000:.1f}ms {cm >> 10} KB "
+                      f"({ot / max(ct, 1e-9):.1f}x faster, {om / max(cm, 1):.1f}x less memory)")
+                continue
+            before = path.stat().st_size
+            written = write_json(path, convert(data, command))
+        except ValueError as error:
+            print(f"❌ {filepath}: {error}")
+            all_ok = False
+            continue
+        status = f"{before} → {path.stat().st_size} bytes" if written else "unchanged"
+        print(f"✓ {filepath}: {layout} → {command} ({status})")
+
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
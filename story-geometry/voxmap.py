@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Compact binary voxel map format (.voxmap) with lossless JSON round-trip.
+
+Layout (all integers are LEB128 varints unless noted):
+
+    magic           4 bytes  b'VXMP'
+    version         1 byte
+    header          length + UTF-8 JSON of every top-level key except the
+                    voxel list (playerStart, goal, notes, characterGroup...).
+                    'voxels' is kept as a placeholder so key order
+                    survives the round-trip: null for a list of voxel
+                    objects, "columnar" for the columnar layout
+                    (voxel_grid.py). So is 'heightmap': the
+                    sidecar is derived data (heightmap.py), so it is
+                    re-baked on decode instead of bloating the header.
+    bounds          min x/y/z (zigzag), then size x/y/z
+    palette         count, then per entry: color + 1 (0 = no color) and
+                    the length + JSON of any extra voxel keys ('type').
+                    A columnar map stores its own palette, in order
+    voxel count
+    coordinates     byte length + varint deltas of the linear cell index
+                    ((x * size_y + y) * size_z + z, relative to bounds),
+                    sorted ascending; duplicate cells encode as delta 0
+    palette indices byte length + one varint per voxel, same order
+
+Voxels come back sorted by (x, y, z), in the layout they were encoded
+from. Everything else - metadata, voxel attributes, duplicate cells, a
+columnar palette - round-trips exactly.
+
+Usage:
+    python3 story-geometry/voxmap.py encode test-maps/complete-scene.json
+    python3 story-geometry/voxmap.py decode test-maps/complete-scene.voxmap
+    python3 story-geometry/voxmap.py check test-maps/*.json
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from asset_store import write_json
+from heightmap import bake
+from voxel_grid import is_columnar, voxel_arrays
+
+MAGIC = b'VXMP'
+VERSION = 1
+
+
+# ----------------------------------------------------------------------
+# Varint helpers
+# ----------------------------------------------------------------------
+
+def _write_varint(out, value):
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(n):
+    return (n << 1) if n >= 0 else ((-n << 1) - 1)
+
+
+def _unzigzag(n):
+    return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+
+
+def encode_varints(values):
+    """Vectorized varint encoding of a non-negative integer array."""
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return b''
+    nbytes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        nbytes += rest > 0
+        rest >>= np.uint64(7)
+    starts = np.cumsum(nbytes) - nbytes
+    out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+    for i in range(int(nbytes.max())):
+        sel = nbytes > i
+        byte = (values[sel] >> np.uint64(7 * i)) & np.uint64(0x7f)
+        more = (nbytes[sel] > i + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[sel] + i] = (byte | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def decode_varints(data):
+    """Vectorized inverse of encode_varints(), returns a uint64 array."""
+    b = np.frombuffer(data, dtype=np.uint8)
+    if len(b) == 0:
+        return np.empty(0, dtype=np.uint64)
+    ends = np.flatnonzero(b < 0x80)
+    starts = np.empty(len(ends), dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts + 1
+    shift = np.arange(len(b), dtype=np.int64) - np.repeat(starts, lengths)
+    parts = (b & 0x7f).astype(np.uint64) << (7 * shift).astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+
+# ----------------------------------------------------------------------
+# Encode / decode
+# ----------------------------------------------------------------------
+
+def _palette_entry(voxel):
+    extra = {k: v for k, v in voxel.items() if k not in ('x', 'y', 'z', 'color')}
+    extra_json = json.dumps(extra, separators=(',', ':')) if extra else ''
+    return voxel.get('color'), extra_json
+
+
+def encode(data):
+    """Encode a map document (the JSON schema as a dict) to bytes."""
+    voxels = data.get('voxels')
+    layout = 'columnar' if is_columnar(voxels) else None
+    header = {k: (layout if k == 'voxels' else None if k == 'heightmap' else v)
+              for k, v in data.items()}
+
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    _write_varint(out, len(header_bytes))
+    out += header_bytes
+
+    if layout:
+        xs, ys, zs, _ = voxel_arrays(voxels)
+        n = len(xs)
+        palette = [(color, '') for color in voxels.get('palette', [])]
+        indices = np.asarray(voxels['c'], dtype=np.int64)
+    else:
+        voxels = list(voxels or [])
+        n = len(voxels)
+        xs = np.fromiter((v['x'] for v in voxels), dtype=np.int64, count=n)
+        ys = np.fromiter((v['y'] for v in voxels), dtype=np.int64, count=n)
+        zs = np.fromiter((v['z'] for v in voxels), dtype=np.int64, count=n)
+        palette = {}
+        indices = np.fromiter((palette.setdefault(_palette_entry(v), len(palette))
+                               for v in voxels), dtype=np.int64, count=n)
+
+    if n:
+        lo = (int(xs.min()), int(ys.min()), int(zs.min()))
+        size = (int(xs.max()) - lo[0] + 1,
+                int(ys.max()) - lo[1] + 1,
+                int(zs.max()) - lo[2] + 1)
+    else:
+        lo, size = (0, 0, 0), (0, 0, 0)
+    for v in lo:
+        _write_varint(out, _zigzag(v))
+    for v in size:
+        _write_varint(out, v)
+
+    _write_varint(out, len(palette))
+    for color, extra_json in palette:
+        _write_varint(out, 0 if color is None else color + 1)
+        extra_bytes = extra_json.encode('utf-8')
+        _write_varint(out, len(extra_bytes))
+        out += extra_bytes
+
+    _write_varint(out, n)
+    cells = ((xs - lo[0]) * size[1] + (ys - lo[1])) * size[2] + (zs - lo[2])
+    order = np.argsort(cells, kind='stable')
+    cells = cells[order]
+    deltas = np.diff(cells, prepend=0)
+    coord_bytes = encode_varints(deltas)
+    color_bytes = encode_varints(indices[order])
+    _write_varint(out, len(coord_bytes))
+    out += coord_bytes
+    _write_varint(out, len(color_bytes))
+    out += color_bytes
+    return bytes(out)
+
+
+def decode_arrays(buf):
+    """
+    Decode to (header, xs, ys, zs, palette_indices, palette) without
+    building voxel dicts. palette is a list of (color, extra_dict).
+    """
+    buf = memoryview(buf)
+    if bytes(buf[:4]) != MAGIC:
+        raise ValueError('Not a voxmap file (bad magic)')
+    if buf[4] != VERSION:
+        raise ValueError(f'Unsupported voxmap version {buf[4]}')
+    pos = 5
+
+    length, pos = _read_varint(buf, pos)
+    header = json.loads(bytes(buf[pos:pos + length]).decode('utf-8'))
+    pos += length
+
+    lo = []
+    for _ in range(3):
+        v, pos = _read_varint(buf, pos)
+        lo.append(_unzigzag(v))
+    size = []
+    for _ in range(3):
+        v, pos = _read_varint(buf, pos)
+        size.append(v)
+
+    count, pos = _read_varint(buf, pos)
+    palette = []
+    for _ in range(count):
+        color, pos = _read_varint(buf, pos)
+        length, pos = _read_varint(buf, pos)
+        extra = json.loads(bytes(buf[pos:pos + length]).decode('utf-8')) if length else {}
+        pos += length
+        palette.append((None if color == 0 else color - 1, extra))
+
+    n, pos = _read_varint(buf, pos)
+    length, pos = _read_varint(buf, pos)
+    cells = np.cumsum(decode_varints(buf[pos:pos + length]).astype(np.int64))
+    pos += length
+    length, pos = _read_varint(buf, pos)
+    indices = decode_varints(buf[pos:pos + length]).astype(np.int64)
+    if len(cells) != n or len(indices) != n:
+        raise ValueError(f'Truncated voxmap: expected {n} voxels')
+
+    size_y, size_z = max(size[1], 1), max(size[2], 1)
+    xs = cells // (size_y * size_z) + lo[0]
+    ys = (cells // size_z) % size_y + lo[1]
+    zs = cells % size_z + lo[2]
+    return header, xs, ys, zs, indices, palette
+
+
+def _columns(xs, ys, zs, indices, palette):
+    return {'x': xs.tolist(), 'y': ys.tolist(), 'z': zs.tolist(), 'c': indices.tolist(),
+            'palette': [color for color, _ in palette]}
+
+
+def decode(buf):
+    """Decode bytes back to a map document in the JSON schema, in its original layout."""
+    header, xs, ys, zs, indices, palette = decode_arrays(buf)
+    if header.get('voxels') == 'columnar':
+        header['voxels'] = _columns(xs, ys, zs, indices, palette)
+        if 'heightmap' in header:
+            bake(header)
+        return header
+
+    entries = []
+    for color, extra in palette:
+        base = {} if color is None else {'color': color}
+        base.update(extra)
+        entries.append(base)
+
+    voxels = []
+    for x, y, z, i in zip(xs.tolist(), ys.tolist(), zs.tolist(), indices.tolist()):
+        voxel = {'x': x, 'y': y, 'z': z}
+        voxel.update(entries[i])
+        voxels.append(voxel)
+
+    if 'voxels' in header:
+        header['voxels'] = voxels
+    elif voxels:
+        header['voxels'] = voxels
+    if 'heightmap' in header:
+        bake(header)
+    return header
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        return decode(f.read())
+
+
+def save(data, path):
+    with open(path, 'wb') as f:
+        f.write(encode(data))
+
+
+def _canonical(data):
+    """
+    Map document with voxels in sorted cell order, for comparison. A
+    heightmap only has to be present: decode re-bakes it from the voxels.
+    """
+    result = dict(data)
+    if 'heightmap' in result:
+        result['heightmap'] = True
+    voxels = result.get('voxels')
+    if is_columnar(voxels):
+        order = np.lexsort((voxels['z'], voxels['y'], voxels['x']))
+        result['voxels'] = dict(voxels)
+        for key in ('x', 'y', 'z', 'c'):
+            result['voxels'][key] = np.asarray(voxels[key], dtype=np.int64)[order].tolist()
+    elif voxels is not None:
+        result['voxels'] = sorted(voxels, key=lambda v: (v['x'], v['y'], v['z']))
+    return result
+
+
+def round_trips(data):
+    """True if data survives encode -> decode (modulo voxel order)."""
+    return _canonical(decode(encode(data))) == _canonical(data)
+
+
+# ----------------------------------------------------------------------
+# Converter CLI
+# ----------------------------------------------------------------------
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('encode', 'decode', 'check'):
+        print("Usage: python3 story-geometry/voxmap.py <encode|decode|check> <files>")
+        print("\nExample:")
+        print("  python3 story-geometry/voxmap.py encode test-maps/complete-scene.json")
+        print("  python3 story-geometry/voxmap.py decode test-maps/complete-scene.voxmap")
+        print("  python3 story-geometry/voxmap.py check test-maps/*.json")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    all_ok = True
+
+    for filepath in sys.argv[2:]:
+        path = Path(filepath)
+        if not path.exists():
+            print(f"❌ {filepath}: File not found")
+            all_ok = False
+            continue
+
+        if command == 'encode':
+            with open(path, 'r') as f:
+                data = json.load(f)
+            target = path.with_suffix('.voxmap')
+            save(data, target)
+            before = path.stat().st_size
+            after = target.stat().st_size
+            print(f"✓ {filepath} → {target} ({before} → {after} bytes, {before / max(after, 1):.1f}x)")
+
+        elif command == 'decode':
+            data = load(path)
+            target = path.with_suffix('.json')
+            write_json(target, data)
+            print(f"✓ {filepath} → {target}")
+
+        else:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if round_trips(data):
+                print(f"✓ {filepath}: round-trips ({len(encode(data))} bytes)")
+            else:
+                print(f"❌ {filepath}: round-trip mismatch")
+                all_ok = False
+
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
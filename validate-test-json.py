@@ -2,12 +2,29 @@
 """
 Validate test map JSON files for common errors.
 Usage: python3 validate-test-json.py test-maps/*.json
+
+Batch mode (parallel, cached, machine-readable reports):
+  python3 validate-test-json.py --batch test-maps story-geometry
+  python3 validate-test-json.py --batch --jobs 8 --report out.json --junit out.xml test-maps
+  python3 validate-test-json.py --batch --no-cache test-maps/*.json
+
+Streaming mode (constant memory, exact hex positions; batch mode streams
+files over 64 MB automatically):
+  python3 validate-test-json.py --stream huge-world.json
 """
 
+import codecs
+import hashlib
 import json
+import os
 import sys
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from xml.etree import ElementTree
+
+CACHE_FILE = Path(__file__).resolve().parent / '.validate-cache.json'
 
 def validate_json_file(filepath):
     """Validate a single JSON file."""
@@ -36,7 +53,9 @@ def validate_json_file(filepath):
         return errors
 
     # Validate structure
-    if 'voxels' in data:
+    if isinstance(data.get('voxels'), dict):
+        errors.extend(validate_voxel_columns(data['voxels']))
+    elif 'voxels' in data:
         for i, voxel in enumerate(data['voxels']):
             if 'color' in voxel:
                 if not isinstance(voxel['color'], int):
@@ -52,12 +71,618 @@ def validate_json_file(filepath):
 
     return errors
 
+COLUMN_KEYS = ('x', 'y', 'z', 'c')
+
+
+def validate_voxel_columns(voxels):
+    """
+    Columnar voxels ({"x", "y", "z", "c", "palette"}, see
+    story-geometry/voxel_layout.py): equal-length integer columns, c indexing
+    the palette, integer (or null) palette colors, rows in canonical
+    (x, y, z) order without duplicates.
+    """
+    errors = []
+    missing = [k for k in COLUMN_KEYS + ('palette',) if not isinstance(voxels.get(k), list)]
+    if missing:
+        return [f"Columnar voxels: missing {', '.join(missing)} column(s)"]
+    lengths = {k: len(voxels[k]) for k in COLUMN_KEYS}
+    if len(set(lengths.values())) != 1:
+        return [f"Columnar voxels: columns differ in length {lengths}"]
+    for key in COLUMN_KEYS:
+        bad = next((i for i, v in enumerate(voxels[key]) if not isinstance(v, int) or isinstance(v, bool)), None)
+        if bad is not None:
+            errors.append(f"Voxel {bad}: {key} must be integer, got {type(voxels[key][bad]).__name__}")
+    for i, color in enumerate(voxels['palette']):
+        if color is not None and not isinstance(color, int):
+            errors.append(f"Palette {i}: color must be integer (decimal), got {type(color).__name__}")
+    if errors:
+        return errors
+    size = len(voxels['palette'])
+    bad = next((i for i, c in enumerate(voxels['c']) if not 0 <= c < size), None)
+    if bad is not None:
+        errors.append(f"Voxel {bad}: c={voxels['c'][bad]} is outside the palette (size {size})")
+    rows = list(zip(voxels['x'], voxels['y'], voxels['z']))
+    bad = next((i for i in range(1, len(rows)) if rows[i - 1] >= rows[i]), None)
+    if bad is not None:
+        errors.append(f"Voxel {bad}: {rows[bad]} is out of order or repeated - columns must be sorted by (x, y, z)")
+        errors.append("  → Run: python3 story-geometry/voxel_layout.py columnar <map>")
+    return errors
+
+# ----------------------------------------------------------------------
+# Streaming validation (bounded memory, for very large maps)
+# ----------------------------------------------------------------------
+
+STREAM_CHUNK_SIZE = 1 << 20
+STREAM_THRESHOLD = 64 << 20  # batch mode streams files larger than this
+MAX_STREAM_ERRORS = 100
+_LOOKAHEAD = 64  # scalars this close to the buffer end wait for more data
+
+# One JSON token (plus leading whitespace) per match. Hex literals are
+# matched before numbers so '0x228b22' is one token, not '0' + garbage.
+_TOKEN = re.compile(r'''[ \t\r\n]*(?:
+      (?P<hex>-?0[xX][0-9a-fA-F]+)
+    | (?P<num>-?(?:0|[1-9][0-9]*)(?P<frac>\.[0-9]+)?(?P<exp>[eE][+-]?[0-9]+)?)
+    | (?P<str>"(?:[^"\\\r\n]|\\.)*(?P<close>")?)
+    | (?P<lit>true|false|null)
+    | (?P<punct>[{}\[\]:,])
+    | (?P<bad>[^ \t\r\n])
+)''', re.X | re.S)
+
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+# Decimal integers, each followed by a comma: a run of column elements
+_INT_RUN = re.compile(r'(?:[ \t\r\n]*-?(?:0|[1-9][0-9]*)[ \t\r\n]*,)+')
+_TOKEN_KINDS = ('hex', 'num', 'str', 'lit', 'punct', 'bad')
+_LITERAL_TYPES = {'true': 'bool', 'false': 'bool', 'null': 'NoneType'}
+
+
+class _StreamError(Exception):
+    pass
+
+
+class _StreamValidator:
+    """
+    Push-parser over JSON tokens. Keeps only the container stack, so
+    memory does not grow with the voxel count. Applies the same rules as
+    validate_json_file() to each value as it streams past.
+
+    Stack frames are [container, state, key, index, column]:
+      container  '{' or '['
+      state      'open' (just opened), 'key', 'colon', 'value', 'comma'
+      key        raw text of the current key token (objects)
+      index      current element index (arrays)
+      column     decoded key, set only on the columnar voxels object
+    """
+
+    def __init__(self):
+        self.errors = []
+        self.suppressed = 0
+        self.hex_count = 0
+        self.stack = []
+        self.done = False
+        self.char_id = None
+        self.char_errors = []
+        self.column_lengths = {}
+        self.min_c = 0
+        self.max_c = -1
+
+    def error(self, message):
+        if len(self.errors) < MAX_STREAM_ERRORS:
+            self.errors.append(message)
+        else:
+            self.suppressed += 1
+
+    # -- schema checks -------------------------------------------------
+
+    def _in_voxels(self):
+        s = self.stack
+        return len(s) >= 2 and s[0][0] == '{' and s[0][2] == '"voxels"' and s[1][0] == '['
+
+    def _voxel_column(self):
+        """Column name while inside columnar voxels ("voxels": {"x": [...], ...}), else None."""
+        s = self.stack
+        if len(s) >= 3 and s[1][4] is not None and s[2][0] == '[':
+            return s[1][4]
+        return None
+
+    def _check_column_value(self, column, index, type_name, value):
+        if column == 'palette':
+            if type_name not in ('int', 'bool', 'NoneType'):
+                self.error(f"Palette {index}: color must be integer (decimal), got {type_name}")
+        elif column in COLUMN_KEYS:
+            if type_name != 'int':
+                self.error(f"Voxel {index}: {column} must be integer, got {type_name}")
+            elif column == 'c':
+                self.min_c = min(self.min_c, value)
+                self.max_c = max(self.max_c, value)
+
+    def _check_columns(self):
+        """At the end of columnar voxels: equal lengths, c within the palette."""
+        lengths = {k: self.column_lengths.get(k) for k in COLUMN_KEYS + ('palette',)}
+        missing = [k for k, n in lengths.items() if n is None]
+        if missing:
+            self.error(f"Columnar voxels: missing {', '.join(missing)} column(s)")
+        elif len({lengths[k] for k in COLUMN_KEYS}) != 1:
+            self.error(f"Columnar voxels: columns differ in length "
+                       f"{ {k: lengths[k] for k in COLUMN_KEYS} }")
+        elif self.min_c < 0:
+            self.error(f"Columnar voxels: c={self.min_c} is outside the palette (size {lengths['palette']})")
+        elif self.max_c >= lengths['palette']:
+            self.error(f"Columnar voxels: c={self.max_c} is outside the palette (size {lengths['palette']})")
+
+    def _in_characters(self):
+        s = self.stack
+        return len(s) >= 3 and s[0][0] == '{' and s[0][2] == '"characterGroup"' \
+            and s[1][0] == '{' and s[1][2] == '"characters"' and s[2][0] == '['
+
+    def _check_value(self, type_name, token):
+        """Rules for a value arriving token by token."""
+        s = self.stack
+        depth = len(s)
+        # Bools pass: validate_json_file uses isinstance(value, int)
+        if depth == 3 and s[2][0] == '{' and s[2][2] == '"color"' and self._in_voxels():
+            if type_name not in ('int', 'bool'):
+                self.error(f"Voxel {s[1][3]}: color must be integer (decimal), got {type_name}")
+        elif depth == 5 and s[3][2] == '"colors"' and s[4][0] == '{' and self._in_characters():
+            if type_name not in ('int', 'bool'):
+                self.char_errors.append((json.loads(s[4][2]), type_name))
+        elif depth == 4 and s[3][0] == '{' and s[3][2] == '"id"' and self._in_characters():
+            if type_name not in ('dict', 'list'):
+                self.char_id = json.loads(token)
+        elif depth == 3 and self._voxel_column() is not None:
+            value = json.loads(token) if type_name == 'int' else None
+            self._check_column_value(self._voxel_column(), s[2][3], type_name, value)
+
+    def _check_element(self, value):
+        """Rules for a whole array element decoded in one go."""
+        depth = len(self.stack)
+        if depth == 2 and self._in_voxels():
+            if isinstance(value, dict) and 'color' in value and not isinstance(value['color'], int):
+                self.error(f"Voxel {self.stack[1][3]}: color must be integer (decimal), "
+                           f"got {type(value['color']).__name__}")
+        elif depth == 3 and self._voxel_column() is not None:
+            type_name = 'int' if isinstance(value, int) and not isinstance(value, bool) else type(value).__name__
+            self._check_column_value(self._voxel_column(), self.stack[2][3], type_name, value)
+        elif depth == 3 and self._in_characters():
+            if isinstance(value, dict) and isinstance(value.get('colors'), dict):
+                for color_key, color_val in value['colors'].items():
+                    if not isinstance(color_val, int):
+                        self.error(f"Character {value.get('id')}: {color_key} must be integer, "
+                                   f"got {type(color_val).__name__}")
+
+    def int_run(self, text):
+        """A run of integer elements of a voxel column, as matched by _INT_RUN."""
+        if self._voxel_column() == 'c':
+            values = [int(v) for v in text.replace(',', ' ').split()]
+            self.min_c = min(self.min_c, min(values))
+            self.max_c = max(self.max_c, max(values))
+        frame = self.stack[-1]
+        frame[3] += text.count(',')
+        frame[1] = 'value'
+
+    # -- grammar -------------------------------------------------------
+
+    def expects_element(self):
+        """True when the next value is an element of a nested array."""
+        s = self.stack
+        return len(s) >= 2 and s[-1][0] == '[' and s[-1][1] in ('open', 'value')
+
+    def _begin_value(self):
+        if self.done:
+            raise _StreamError('Extra data')
+        if not self.stack:
+            return
+        frame = self.stack[-1]
+        if frame[0] == '[':
+            if frame[1] not in ('open', 'value'):
+                raise _StreamError("Expecting ',' delimiter")
+            frame[3] += 1
+        elif frame[1] != 'value':
+            raise _StreamError("Expecting ':' delimiter" if frame[1] == 'colon'
+                               else "Expecting ',' delimiter" if frame[1] == 'comma'
+                               else 'Expecting property name enclosed in double quotes')
+
+    def _end_value(self):
+        if self.stack:
+            self.stack[-1][1] = 'comma'
+        else:
+            self.done = True
+
+    def element(self, value):
+        self._begin_value()
+        self._check_element(value)
+        self._end_value()
+
+    def scalar(self, type_name, token):
+        self._begin_value()
+        self._check_value(type_name, token)
+        self._end_value()
+
+    def string(self, token):
+        frame = self.stack[-1] if self.stack else None
+        if frame is not None and frame[0] == '{' and frame[1] in ('open', 'key'):
+            frame[2] = token
+            frame[1] = 'colon'
+            # Decode a column name once, not per element (_voxel_column)
+            if len(self.stack) == 2 and self.stack[0][2] == '"voxels"':
+                frame[4] = json.loads(token)
+        else:
+            self.scalar('str', token)
+
+    def punct(self, char):
+        frame = self.stack[-1] if self.stack else None
+        if char == '{' or char == '[':
+            self._begin_value()
+            self._check_value('dict' if char == '{' else 'list', None)
+            self.stack.append([char, 'open', None, -1, None])
+            if char == '{' and len(self.stack) == 4 and self._in_characters():
+                self.char_id = None
+                self.char_errors = []
+        elif frame is None:
+            raise _StreamError('Extra data' if self.done else 'Expecting value')
+        elif char == '}' or char == ']':
+            if frame[0] != ('{' if char == '}' else '['):
+                raise _StreamError(f"Unexpected '{char}'")
+            if frame[1] not in ('open', 'comma'):
+                raise _StreamError("Expecting ':' delimiter" if frame[1] == 'colon'
+                                   else 'Expecting property name enclosed in double quotes'
+                                   if frame[1] == 'key' else 'Expecting value')
+            if char == '}' and len(self.stack) == 4 and self._in_characters():
+                for color_key, type_name in self.char_errors:
+                    self.error(f"Character {self.char_id}: {color_key} must be integer, got {type_name}")
+            if char == ']' and len(self.stack) == 3 and self._voxel_column() is not None:
+                self.column_lengths[self._voxel_column()] = frame[3] + 1
+            if char == '}' and len(self.stack) == 2 and self.stack[0][2] == '"voxels"':
+                self._check_columns()
+            self.stack.pop()
+            self._end_value()
+        elif char == ':':
+            if frame[0] != '{' or frame[1] != 'colon':
+                raise _StreamError("Unexpected ':'")
+            frame[1] = 'value'
+        else:  # ','
+            if frame[1] != 'comma':
+                raise _StreamError("Unexpected ','")
+            frame[1] = 'key' if frame[0] == '{' else 'value'
+
+
+def validate_json_stream(filepath, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Validate a file incrementally in bounded memory. Hex literals are
+    reported at their exact line, column and byte offset; voxel and
+    characterGroup colors are checked as they stream past. Columnar voxels
+    get type, length and palette checks; their (x, y, z) order is only
+    checked by validate_json_file().
+
+    Elements of nested arrays (voxels, characters, actions) that fit in
+    the buffer are parsed whole by the C json decoder; anything it rejects
+    (hex, syntax errors, elements split across chunks) goes through the
+    tokenizer, which keeps exact positions. Integer runs inside a voxel
+    column ("1, 2, 3,") are consumed by one regex match.
+    """
+    try:
+        f = open(filepath, 'rb')
+    except Exception as e:
+        return [f"Cannot read file: {e}"]
+
+    v = _StreamValidator()
+    raw_decode = json.JSONDecoder().raw_decode
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    base = 0          # file byte offset of buf[0]
+    line = 1          # line number at buf[0]
+    line_start = 0    # file byte offset where that line begins
+
+    def where(at):
+        n = buf.count('\n', 0, at)
+        if n:
+            nl = buf.rindex('\n', 0, at)
+            start = base + len(buf[:nl + 1].encode('utf-8'))
+        else:
+            start = line_start
+        offset = base + len(buf[:at].encode('utf-8'))
+        return f"line {line + n} column {offset - start + 1} (byte {offset})"
+
+    try:
+        with f:
+            eof = False
+            while not eof:
+                data = f.read(chunk_size)
+                eof = not data
+                buf += utf8.decode(data, final=eof)
+                pos = 0
+                end = len(buf)
+                skip_fast = -1
+                while pos < end:
+                    # Fastest path: integers in a voxel column, many per match
+                    if v.expects_element() and v._voxel_column() is not None:
+                        m = _INT_RUN.match(buf, pos)
+                        if m is not None:
+                            v.int_run(m.group())
+                            pos = m.end()
+                            continue
+                    # Fast path: whole array element via the C decoder
+                    if pos != skip_fast and v.expects_element():
+                        start = _WHITESPACE.match(buf, pos).end()
+                        try:
+                            value, stop = raw_decode(buf, start)
+                        except ValueError:
+                            skip_fast = pos
+                            continue
+                        if not eof and stop > end - _LOOKAHEAD and not isinstance(value, (dict, list)):
+                            break
+                        v.element(value)
+                        pos = stop
+                        continue
+
+                    m = _TOKEN.match(buf, pos)
+                    if m is None:
+                        break  # only whitespace left
+                    kind = next(k for k in _TOKEN_KINDS if m.start(k) >= 0)
+                    start = m.start(kind)
+                    closed = kind != 'str' or m.start('close') >= 0
+                    # Token may continue in the next chunk (numbers and
+                    # literals are short; strings must see their close quote)
+                    if not eof and (not closed or end - start < _LOOKAHEAD):
+                        break
+                    try:
+                        if kind == 'punct':
+                            v.punct(buf[start])
+                        elif kind == 'str':
+                            if not closed:
+                                raise _StreamError('Unterminated string')
+                            v.string(m.group(kind))
+                        elif kind == 'num':
+                            is_float = m.start('frac') >= 0 or m.start('exp') >= 0
+                            v.scalar('float' if is_float else 'int', m.group(kind))
+                        elif kind == 'hex':
+                            token = m.group(kind)
+                            value = int(token, 16)
+                            v.hex_count += 1
+                            v.error(f"Hex notation (invalid JSON) at {where(start)}: {token} → {value}")
+                            v.scalar('int', str(value))
+                        elif kind == 'lit':
+                            token = m.group(kind)
+                            v.scalar(_LITERAL_TYPES[token], token)
+                        else:
+                            raise _StreamError(f"Unexpected character {buf[start]!r}")
+                    except _StreamError as e:
+                        raise _StreamError(f"{e} at {where(start)}")
+                    pos = m.end()
+
+                # Drop consumed text, carry line bookkeeping forward
+                consumed = buf[:pos]
+                n = consumed.count('\n')
+                if n:
+                    line += n
+                    line_start = base + len(consumed[:consumed.rindex('\n') + 1].encode('utf-8'))
+                base += len(consumed.encode('utf-8'))
+                buf = buf[pos:]
+
+        if not v.done:
+            raise _StreamError(f"Unexpected end of data at {where(len(buf))}")
+    except _StreamError as e:
+        v.error(f"JSON parse error: {e}")
+    except UnicodeDecodeError as e:
+        v.error(f"Cannot decode file as UTF-8: {e}")
+
+    errors = v.errors
+    if v.hex_count:
+        errors.append("  → Convert to decimal: 0x228b22 = 2263842")
+        errors.append("  → Run: python3 fix-hex-colors.py " + str(filepath))
+    if v.suppressed:
+        errors.append(f"... {v.suppressed} more errors not shown")
+    return errors
+
+
+# ----------------------------------------------------------------------
+# Batch mode
+# ----------------------------------------------------------------------
+
+def _validator_version():
+    """Hash of this script - cached passes are invalid once the rules change."""
+    with open(__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _content_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _validate_worker(filepath, stream=False):
+    """Process-pool entry point: (filepath, content hash, errors)."""
+    try:
+        sha = _content_hash(filepath)
+        stream = stream or os.path.getsize(filepath) > STREAM_THRESHOLD
+    except OSError as e:
+        return filepath, None, [f"Cannot read file: {e}"]
+    if stream:
+        return filepath, sha, validate_json_stream(filepath)
+    return filepath, sha, validate_json_file(filepath)
+
+
+def _is_store_object(path):
+    """A file in story-geometry/store/objects (validated through its ref links instead)."""
+    return path.parent.name == 'objects' and path.parent.parent.name == 'store'
+
+
+def expand_paths(args):
+    """
+    Files as given; directories expand to their *.json files (recursive),
+    minus asset-store objects. Paths resolving to the same file (links to
+    one store object) are kept once.
+    """
+    paths = []
+    for arg in args:
+        path = Path(arg)
+        if path.is_dir():
+            paths.extend(sorted(str(p) for p in path.rglob('*.json') if not _is_store_object(p)))
+        else:
+            paths.append(arg)
+    seen = set()
+    unique = []
+    for path in paths:
+        real = os.path.realpath(path)
+        if real not in seen:
+            seen.add(real)
+            unique.append(path)
+    return unique
+
+
+def load_cache(version):
+    """{path: {'sha', 'mtime_ns', 'size'}} of files that passed last time."""
+    try:
+        with open(CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('version') != version:
+        return {}
+    return cache.get('files', {})
+
+
+def save_cache(version, files):
+    tmp = CACHE_FILE.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump({'version': version, 'files': files}, f)
+    os.replace(tmp, CACHE_FILE)
+
+
+def is_cached(filepath, entry):
+    """Unchanged since its last passing run? Checks stat first, then content."""
+    if not entry:
+        return False
+    st = os.stat(filepath)
+    if st.st_mtime_ns == entry['mtime_ns'] and st.st_size == entry['size']:
+        return True
+    if st.st_size != entry['size']:
+        return False
+    if _content_hash(filepath) == entry['sha']:
+        entry['mtime_ns'] = st.st_mtime_ns
+        return True
+    return False
+
+
+def write_json_report(path, results, elapsed):
+    summary = {
+        'total': len(results),
+        'valid': sum(1 for r in results if r['status'] in ('pass', 'cached')),
+        'cached': sum(1 for r in results if r['status'] == 'cached'),
+        'failed': sum(1 for r in results if r['status'] in ('fail', 'missing')),
+        'seconds': round(elapsed, 3),
+    }
+    with open(path, 'w') as f:
+        json.dump({'summary': summary, 'files': results}, f, indent=2)
+
+
+def write_junit_report(path, results, elapsed):
+    suite = ElementTree.Element('testsuite', {
+        'name': 'validate-test-json',
+        'tests': str(len(results)),
+        'failures': str(sum(1 for r in results if r['status'] in ('fail', 'missing'))),
+        'skipped': str(sum(1 for r in results if r['status'] == 'cached')),
+        'time': f"{elapsed:.3f}",
+    })
+    for r in results:
+        case = ElementTree.SubElement(suite, 'testcase', {
+            'classname': 'validate-test-json',
+            'name': r['path'],
+        })
+        if r['status'] in ('fail', 'missing'):
+            failure = ElementTree.SubElement(case, 'failure', {
+                'message': r['errors'][0] if r['errors'] else r['status'],
+            })
+            failure.text = '\n'.join(r['errors'])
+        elif r['status'] == 'cached':
+            ElementTree.SubElement(case, 'skipped', {'message': 'unchanged since last pass'})
+    ElementTree.ElementTree(suite).write(path, encoding='utf-8', xml_declaration=True)
+
+
+def _option(args, name):
+    if name not in args:
+        return None
+    i = args.index(name)
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
+
+
+def batch_main(args):
+    """Validate across a process pool, reporting each file as it finishes."""
+    start = time.time()
+    use_cache = '--no-cache' not in args
+    stream = '--stream' in args
+    args = [a for a in args if a not in ('--batch', '--no-cache', '--stream')]
+    jobs = _option(args, '--jobs')
+    report_path = _option(args, '--report')
+    junit_path = _option(args, '--junit')
+
+    version = _validator_version()
+    cache = load_cache(version) if use_cache else {}
+    new_cache = dict(cache)  # keep entries for files outside this run
+    results = []
+    todo = []
+
+    for filepath in expand_paths(args):
+        if not Path(filepath).exists():
+            print(f"❌ {filepath}: File not found")
+            results.append({'path': filepath, 'status': 'missing', 'errors': ['File not found']})
+        elif use_cache and is_cached(filepath, cache.get(filepath)):
+            results.append({'path': filepath, 'status': 'cached', 'errors': []})
+        else:
+            todo.append(filepath)
+
+    if todo:
+        workers = int(jobs) if jobs else min(len(todo), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_validate_worker, fp, stream) for fp in todo]
+            for future in as_completed(futures):
+                filepath, sha, errors = future.result()
+                if errors:
+                    new_cache.pop(filepath, None)
+                    print(f"❌ {filepath}:")
+                    for error in errors:
+                        print(f"   {error}")
+                    results.append({'path': filepath, 'status': 'fail', 'errors': errors})
+                else:
+                    print(f"✓ {filepath}")
+                    st = os.stat(filepath)
+                    new_cache[filepath] = {'sha': sha, 'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+                    results.append({'path': filepath, 'status': 'pass', 'errors': []})
+
+    if use_cache:
+        save_cache(version, new_cache)
+
+    elapsed = time.time() - start
+    if report_path:
+        write_json_report(report_path, results, elapsed)
+    if junit_path:
+        write_junit_report(junit_path, results, elapsed)
+
+    valid = sum(1 for r in results if r['status'] in ('pass', 'cached'))
+    cached = sum(1 for r in results if r['status'] == 'cached')
+    print(f"\n{valid}/{len(results)} files valid ({cached} unchanged, {elapsed:.2f}s)")
+    sys.exit(0 if valid == len(results) else 1)
+
+
 def main():
+    if '--batch' in sys.argv:
+        batch_main(sys.argv[1:])
+
+    stream = '--stream' in sys.argv
+    if stream:
+        sys.argv.remove('--stream')
+
     if len(sys.argv) < 2:
         print("Usage: python3 validate-test-json.py <json-files>")
         print("\nExample:")
         print("  python3 validate-test-json.py test-maps/*.json")
         print("  python3 validate-test-json.py test-maps/my-test.json")
+        print("  python3 validate-test-json.py --batch --report out.json --junit out.xml test-maps")
+        print("  python3 validate-test-json.py --stream huge-world.json")
         sys.exit(1)
 
     all_valid = True
@@ -72,7 +697,7 @@ def main():
             continue
 
         total_files += 1
-        errors = validate_json_file(path)
+        errors = validate_json_stream(path) if stream else validate_json_file(path)
 
         if errors:
             print(f"❌ {filepath}:")